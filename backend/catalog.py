@@ -0,0 +1,61 @@
+"""In-process catalog read model.
+
+Hot read paths (the catalog version behind every cache key and the unfiltered
+listings) are answered from this copy instead of Mongo. Single-tool reads are
+not: they go to the store, or to the mapped snapshot in multi-worker mode. The
+copy is loaded once at startup and then only changes with the catalog: local
+tool writes and ``catalog`` invalidation events re-read the affected tool and
+the store's version, review events patch the rating in place, flushed view
+and click counts are added, and a bus reset reloads everything. A request
+therefore never waits on the database to learn the catalog version.
+"""
+from typing import Dict, Iterator, List
+
+from storage import Document
+
+
+class CatalogCache:
+    def __init__(self):
+        self.version = 0
+        self._tools: Dict[str, Document] = {}
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return tool_id in self._tools
+
+    def __iter__(self) -> Iterator[Document]:
+        return iter(list(self._tools.values()))
+
+    def load(self, version: int, tools: List[Document]):
+        """Replace the contents; ``version`` must have been read before ``tools``."""
+        self._tools = {tool["id"]: tool for tool in tools}
+        self.version = version
+
+    def head(self, limit: int) -> List[Document]:
+        """The first ``limit`` tools in catalog (insertion) order, like an unfiltered find."""
+        tools = []
+        for tool in self._tools.values():
+            if len(tools) >= limit:
+                break
+            tools.append(dict(tool))
+        return tools
+
+    def put(self, tool: Document):
+        self._tools[tool["id"]] = tool
+
+    def remove(self, tool_id: str):
+        self._tools.pop(tool_id, None)
+
+    def update(self, tool_id: str, fields: Document):
+        tool = self._tools.get(tool_id)
+        if tool is not None:
+            # Copy-on-write: documents handed out by ``head`` are never mutated
+            self._tools[tool_id] = dict(tool, **fields)
+
+    def add_counts(self, counts: Dict[str, Dict[str, int]]):
+        for tool_id, fields in counts.items():
+            tool = self._tools.get(tool_id)
+            if tool is not None:
+                self.update(tool_id, {field: tool.get(field, 0) + n for field, n in fields.items()})
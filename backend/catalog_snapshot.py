@@ -0,0 +1,236 @@
+"""Memory-mapped catalog snapshot shared by the workers of one host.
+
+With several uvicorn/gunicorn workers, one of them (elected with a
+non-blocking ``flock``) serializes the catalog into a snapshot file; every
+worker maps that file read-only, so the page cache holds a single copy no
+matter how many workers there are. New versions are written to a temporary
+file and moved into place with ``os.replace``: workers that still map the
+old file keep reading the old inode until they swap.
+
+Catalog reads (single tools, the unfiltered listing) are served straight from
+the map, and the derived indexes are built by streaming its records, so no
+worker holds a copy of the catalog documents. The indexes themselves (suggest,
+fuzzy, similar tools) remain per worker. Ratings are not taken from the
+snapshot once known: reviews do not bump the catalog version, so the scores
+applied from review events are carried across swaps.
+
+File layout (little-endian)::
+
+    header   magic, catalog version, record count, section offsets
+    hashes   uint64[count]   8-byte blake2b of each tool id, sorted
+    slots    uint32[count]   record index for each sorted hash
+    offsets  uint64[count+1] start of each record in the data section
+    data     UTF-8 JSON records in catalog order
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+import numpy as np
+
+from metrics import metrics
+from storage import Document
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AITSNAP1"
+HEADER = struct.Struct("<8sQQQQQQ")
+
+
+def id_hash(tool_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(tool_id.encode(), digest_size=8).digest(), "little")
+
+
+def _encode(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path: Path, tools: List[Document], catalog_version: int):
+    """Serialize ``tools`` and atomically replace the snapshot at ``path``."""
+    path = Path(path)
+    records = [json.dumps(tool, default=_encode, separators=(",", ":")).encode() for tool in tools]
+    count = len(records)
+    hashes = np.fromiter((id_hash(tool["id"]) for tool in tools), dtype="<u8", count=count)
+    order = np.argsort(hashes, kind="stable")
+    offsets = np.zeros(count + 1, dtype="<u8")
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+
+    hashes_at = _align(HEADER.size)
+    slots_at = hashes_at + 8 * count
+    offsets_at = _align(slots_at + 4 * count)
+    data_at = offsets_at + 8 * (count + 1)
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, catalog_version, count, hashes_at, slots_at, offsets_at, data_at))
+        f.write(b"\0" * (hashes_at - HEADER.size))
+        f.write(hashes[order].tobytes())
+        f.write(order.astype("<u4").tobytes())
+        f.write(b"\0" * (offsets_at - slots_at - 4 * count))
+        f.write(offsets.tobytes())
+        for record in records:
+            f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot_version(path: Path) -> Optional[int]:
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size or header[:8] != MAGIC:
+        return None
+    return HEADER.unpack(header)[1]
+
+
+class CatalogSnapshot:
+    """Read-only view over one mapped snapshot file."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, count, hashes_at, slots_at, offsets_at, self._data_at = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        # numpy views straight over the mapping, nothing is copied
+        self._hashes = np.frombuffer(self._map, dtype="<u8", count=count, offset=hashes_at)
+        self._slots = np.frombuffer(self._map, dtype="<u4", count=count, offset=slots_at)
+        self._offsets = np.frombuffer(self._map, dtype="<u8", count=count + 1, offset=offsets_at)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _record(self, index: int) -> Document:
+        start = self._data_at + int(self._offsets[index])
+        end = self._data_at + int(self._offsets[index + 1])
+        return json.loads(self._map[start:end])
+
+    def get(self, tool_id: str) -> Optional[Document]:
+        key = np.uint64(id_hash(tool_id))
+        position = int(np.searchsorted(self._hashes, key))
+        while position < len(self._hashes) and self._hashes[position] == key:
+            tool = self._record(int(self._slots[position]))
+            if tool["id"] == tool_id:
+                return tool
+            position += 1
+        return None
+
+    def __iter__(self) -> Iterator[Document]:
+        for index in range(len(self)):
+            yield self._record(index)
+
+    def head(self, limit: int) -> List[Document]:
+        """The first ``limit`` tools in catalog order; only those records are decoded."""
+        return [self._record(index) for index in range(min(limit, len(self)))]
+
+
+class CatalogSnapshotManager:
+    def __init__(self, path: Path, fetch_version: Callable[[], Awaitable[int]],
+                 fetch_tools: Callable[[], Awaitable[List[Document]]], poll_interval: float = 2.0,
+                 on_swap: Optional[Callable[[CatalogSnapshot], Awaitable[None]]] = None):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.fetch_version = fetch_version
+        self.fetch_tools = fetch_tools
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._wake = asyncio.Event()
+
+    def request_sync(self):
+        """Check for a new catalog version now rather than at the next poll."""
+        self._wake.set()
+
+    def _try_lock(self) -> Optional[int]:
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _unlock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    async def _rebuild(self, catalog_version: int) -> bool:
+        """Write a new snapshot if this worker wins the election; False if another worker holds the lock."""
+        fd = await asyncio.to_thread(self._try_lock)
+        if fd is None:
+            metrics.inc("catalog_snapshot_election_lost_total")
+            return False
+        try:
+            # Another worker may have finished a rebuild between our check and the lock
+            on_disk = await asyncio.to_thread(read_snapshot_version, self.path)
+            if on_disk is None or on_disk < catalog_version:
+                started = time.perf_counter()
+                tools = await self.fetch_tools()
+                await asyncio.to_thread(write_snapshot, self.path, tools, catalog_version)
+                metrics.observe("catalog_snapshot_build_ms", (time.perf_counter() - started) * 1000,
+                                buckets=(10, 50, 100, 500, 1000, 5000, 30000))
+                logger.info("Wrote catalog snapshot v%s (%d tools)", catalog_version, len(tools))
+        finally:
+            await asyncio.to_thread(self._unlock, fd)
+        return True
+
+    async def sync(self) -> bool:
+        """Bring the mapped snapshot up to the store's catalog version; True if a new one was mapped."""
+        catalog_version = await self.fetch_version()
+        if self.snapshot is not None and self.snapshot.version >= catalog_version:
+            return False
+        on_disk = await asyncio.to_thread(read_snapshot_version, self.path)
+        if on_disk is None or on_disk < catalog_version:
+            await self._rebuild(catalog_version)
+            on_disk = await asyncio.to_thread(read_snapshot_version, self.path)
+        if on_disk is None or (self.snapshot is not None and on_disk <= self.snapshot.version):
+            return False
+        snapshot = await asyncio.to_thread(CatalogSnapshot, self.path)
+        self.snapshot = snapshot
+        metrics.inc("catalog_snapshot_swaps_total")
+        metrics.set_gauge("catalog_snapshot_version", snapshot.version)
+        metrics.set_gauge("catalog_snapshot_tools", len(snapshot))
+        if self.on_swap is not None:
+            await self.on_swap(snapshot)
+        return True
+
+    async def load(self) -> CatalogSnapshot:
+        """Map a snapshot at startup, waiting for the elected worker if no file exists yet."""
+        while True:
+            await self.sync()
+            if self.snapshot is not None:
+                return self.snapshot
+            await asyncio.sleep(min(self.poll_interval, 0.1))
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Catalog snapshot sync failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,77 @@
+"""Circuit breaker for calls to external services.
+
+The breaker opens after ``failure_threshold`` consecutive failures or
+latency-SLO breaches. While open, callers are expected to use their local
+fallback. After ``reset_timeout`` seconds a single probe call is let through
+(half-open); its outcome closes or re-opens the circuit.
+"""
+import logging
+import time
+from typing import Callable
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_ms: float = 10000,
+                 reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_ms = slow_call_ms
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, new_state: str):
+        if new_state == self.state:
+            return
+        metrics.inc("circuit_breaker_transitions_total", breaker=self.name, from_state=self.state, to_state=new_state)
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[new_state], breaker=self.name)
+        logger.warning("Circuit breaker '%s' %s -> %s", self.name, self.state, new_state)
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = self.clock()
+
+    def allow_request(self) -> bool:
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+            self._probe_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        metrics.inc("circuit_breaker_rejections_total", breaker=self.name)
+        return False
+
+    def record_success(self, latency_ms: float):
+        if latency_ms > self.slow_call_ms:
+            metrics.inc("circuit_breaker_slow_calls_total", breaker=self.name)
+            self.record_failure()
+            return
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self._transition(CLOSED)
+
+    def record_abandoned(self):
+        # The caller went away before the outcome was known; let another probe through
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+            self.opened_at = self.clock()
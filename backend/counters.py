@@ -0,0 +1,116 @@
+"""Write-behind view and click counters for tools.
+
+``GET /api/tools/{id}`` and ``POST /api/tools/{id}/click`` only bump an
+in-memory count (one dict update per event). A background loop flushes the
+aggregated counts every ``interval`` seconds as a single unordered
+``bulk_write`` of ``$inc`` operations, one per tool, so write volume follows
+the number of distinct tools touched rather than the request rate.
+
+The buffer is bounded: once ``max_pending`` tools are waiting, the flush runs
+early and events for further tools are dropped (and counted) until it has
+drained. Counts from a failed flush, or from the operations of a partially
+failed one, are merged back for the next attempt, and shutdown flushes
+whatever is left.
+
+Counts only live in memory until they are flushed, so a worker that is killed
+without a graceful shutdown (SIGKILL, OOM) loses whatever is buffered. The
+loss is bounded by flushing often (``interval``, two seconds by default) and
+early, as soon as ``flush_events`` events are waiting: at most one interval of
+events and no more than about ``flush_events`` of them, as long as flushes
+succeed. The ``tool_counter_pending_events`` gauge shows the exposure.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from metrics import metrics
+from storage import ToolStore
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("views", "clicks")
+
+
+class ToolCounters:
+    def __init__(self, store: ToolStore, interval: float = 2.0, max_pending: int = 10000, flush_events: int = 1000,
+                 on_flush: Optional[Callable[[Dict[str, Dict[str, int]]], None]] = None):
+        self.store = store
+        # Told about the counts each flush wrote, so in-process copies of the catalog can follow
+        self.on_flush = on_flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self.flush_events = flush_events
+        self._pending: Dict[str, Dict[str, int]] = {}
+        # Events buffered since the last flush started, which a hard kill would lose
+        self.pending_events = 0
+        self._wake = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, tool_id: str, field: str, count: int = 1) -> bool:
+        """Add ``count`` to a tool's ``views`` or ``clicks``; False when the buffer is full."""
+        entry = self._pending.get(tool_id)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                metrics.inc("tool_counter_events_dropped_total", count, field=field)
+                self._wake.set()
+                return False
+            entry = self._pending[tool_id] = dict.fromkeys(COUNTER_FIELDS, 0)
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+        entry[field] += count
+        self.pending_events += count
+        if self.pending_events >= self.flush_events:
+            self._wake.set()
+        return True
+
+    def _merge(self, counts: Dict[str, Dict[str, int]]):
+        # Merged back regardless of max_pending: these events were already accepted
+        for tool_id, fields in counts.items():
+            entry = self._pending.setdefault(tool_id, dict.fromkeys(COUNTER_FIELDS, 0))
+            for field, count in fields.items():
+                entry[field] += count
+                self.pending_events += count
+
+    async def flush(self) -> int:
+        """Write pending counts in one bulk write; returns how many tools were flushed."""
+        pending, self._pending = self._pending, {}
+        self.pending_events = 0
+        if not pending:
+            return 0
+        started = time.perf_counter()
+        try:
+            failed = await self.store.increment_counters(pending)
+        except Exception:
+            self._merge(pending)
+            metrics.inc("tool_counter_flushes_total", status="failed")
+            raise
+        if failed:
+            self._merge({tool_id: pending[tool_id] for tool_id in failed})
+            logger.warning("%d of %d tool counter updates failed and will be retried", len(failed), len(pending))
+        if self.on_flush is not None:
+            failed_ids = set(failed)
+            self.on_flush({tool_id: fields for tool_id, fields in pending.items() if tool_id not in failed_ids})
+        metrics.observe("tool_counter_flush_ms", (time.perf_counter() - started) * 1000,
+                        buckets=(1, 5, 10, 50, 100, 500, 1000, 5000))
+        metrics.inc("tool_counter_flushes_total", status="partial" if failed else "ok")
+        metrics.inc("tool_counter_tools_flushed_total", len(pending) - len(failed))
+        return len(pending) - len(failed)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Tool counter flush failed: %s", e)
+            metrics.set_gauge("tool_counter_pending_tools", len(self._pending))
+            metrics.set_gauge("tool_counter_pending_events", self.pending_events)
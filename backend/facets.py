@@ -0,0 +1,83 @@
+"""Facet counts for the tool filter panel.
+
+Tools carry a free-text ``pricing`` field, so the price tier facet is derived
+from it with the same rules in Python (memory backend) and in an aggregation
+expression (MongoDB). ``FacetCache`` keeps the unfiltered facet counts for
+the current catalog version, so the filter panel and ``/api/categories`` do
+not aggregate the catalog on every request.
+"""
+import asyncio
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from metrics import metrics
+
+FACET_FIELDS = ("category", "platforms", "tags", "price_tier")
+PRICE_TIERS = ("free", "freemium", "paid")
+
+_FREE_PATTERN = "free"
+_PAID_PATTERN = r"\$|[0-9]|premium|\bpro\b|paid|subscription"
+_FREE = re.compile(_FREE_PATTERN, re.IGNORECASE)
+_PAID = re.compile(_PAID_PATTERN, re.IGNORECASE)
+
+
+def price_tier(pricing: str) -> str:
+    if _FREE.search(pricing or ""):
+        return "freemium" if _PAID.search(pricing) else "free"
+    return "paid"
+
+
+def price_tier_expression(field: str = "$pricing") -> Dict[str, Any]:
+    """Aggregation expression computing ``price_tier`` for a document."""
+    pricing = {"$ifNull": [field, ""]}
+    is_free = {"$regexMatch": {"input": pricing, "regex": _FREE_PATTERN, "options": "i"}}
+    is_paid = {"$regexMatch": {"input": pricing, "regex": _PAID_PATTERN, "options": "i"}}
+    return {"$switch": {
+        "branches": [
+            {"case": {"$and": [is_free, is_paid]}, "then": "freemium"},
+            {"case": is_free, "then": "free"},
+        ],
+        "default": "paid",
+    }}
+
+
+def sorted_counts(counts: Dict[Any, int]) -> List[Dict[str, Any]]:
+    """Facet buckets ordered by count, then value."""
+    buckets = [{"value": value, "count": count} for value, count in counts.items() if value is not None]
+    buckets.sort(key=lambda bucket: (-bucket["count"], str(bucket["value"])))
+    return buckets
+
+
+def count_facets(tools: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    counters = {field: Counter() for field in FACET_FIELDS}
+    for tool in tools:
+        counters["category"][tool.get("category")] += 1
+        counters["platforms"].update(set(tool.get("platforms", [])))
+        counters["tags"].update(set(tool.get("tags", [])))
+        counters["price_tier"][price_tier(tool.get("pricing", ""))] += 1
+    return {field: sorted_counts(counter) for field, counter in counters.items()}
+
+
+class FacetCache:
+    """Unfiltered facet counts for one catalog version; concurrent misses share one aggregation."""
+
+    def __init__(self, compute: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.compute = compute
+        self.version: Optional[int] = None
+        self.facets: Optional[Dict[str, Any]] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    async def get(self, catalog_version: int) -> Dict[str, Any]:
+        if self.facets is not None and self.version == catalog_version:
+            metrics.inc("facet_cache_lookups_total", result="hit")
+            return self.facets
+        metrics.inc("facet_cache_lookups_total", result="miss")
+        task = self._pending.get(catalog_version)
+        if task is None:
+            task = self._pending[catalog_version] = asyncio.ensure_future(self.compute())
+            task.add_done_callback(lambda _: self._pending.pop(catalog_version, None))
+        facets = await asyncio.shield(task)
+        if self.version is None or catalog_version >= self.version:
+            self.version, self.facets = catalog_version, facets
+        return facets
@@ -0,0 +1,149 @@
+"""Typo-tolerant search over tool names and tags.
+
+Every name word, tag and the whole name (with separators removed, so
+"co-pilot" meets "copilot") is a term. A character-trigram inverted index
+maps each trigram to the ids of the terms containing it. A query token is
+matched in two steps: candidate terms are ranked by trigram overlap (counted
+with numpy over the posting lists), then the best few are verified with an
+edit distance that gives up as soon as it exceeds the allowed number of typos.
+"""
+import time
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from metrics import metrics
+from ranking import WORD_PATTERN
+from storage import Document
+
+
+def trigrams(term: str) -> List[str]:
+    padded = f"  {term} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+def max_typos(length: int) -> int:
+    if length <= 4:
+        return 1
+    return 2 if length <= 8 else 3
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def tool_terms(tool: Document) -> List[str]:
+    terms = []
+    for value in [tool.get("name", ""), *tool.get("tags", [])]:
+        words = WORD_PATTERN.findall(value.lower())
+        terms.extend(words)
+        if len(words) > 1:
+            terms.append("".join(words))
+    return list(dict.fromkeys(term for term in terms if len(term) >= 3))
+
+
+class FuzzyIndex:
+    def __init__(self, min_overlap: float = 0.3, max_candidates: int = 64):
+        self.min_overlap = min_overlap
+        self.max_candidates = max_candidates
+        self._reset()
+
+    def _reset(self):
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._term_tools: List[Dict[str, None]] = []
+        self._gram_counts = array("i")
+        # Posting lists are append-only int32 arrays, viewed by numpy without copying
+        self._postings: Dict[str, array] = {}
+        self._terms_by_tool: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms_by_tool)
+
+    def build(self, tools: Iterable[Document]):
+        self._reset()
+        for tool in tools:
+            self.add(tool)
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._terms)
+            self._terms.append(term)
+            self._term_tools.append({})
+            grams = trigrams(term)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, array("i")).append(term_id)
+        return term_id
+
+    def add(self, tool: Document):
+        if tool["id"] in self._terms_by_tool:
+            self.remove(tool["id"])
+        terms = tool_terms(tool)
+        self._terms_by_tool[tool["id"]] = terms
+        for term in terms:
+            self._term_tools[self._term_id(term)][tool["id"]] = None
+
+    def remove(self, tool_id: str):
+        # Terms stay in the trigram index; a term without tools simply matches nothing
+        for term in self._terms_by_tool.pop(tool_id, []):
+            self._term_tools[self._term_ids[term]].pop(tool_id, None)
+
+    def _candidates(self, token: str) -> List[int]:
+        grams = trigrams(token)
+        lists = [np.frombuffer(self._postings[g], dtype=np.int32) for g in grams if g in self._postings]
+        if not lists:
+            return []
+        term_ids, shared = np.unique(np.concatenate(lists), return_counts=True)
+        gram_counts = np.frombuffer(self._gram_counts, dtype=np.int32)[term_ids]
+        overlap = shared / (len(grams) + gram_counts - shared)
+        keep = overlap >= self.min_overlap
+        term_ids, overlap = term_ids[keep], overlap[keep]
+        if len(term_ids) > self.max_candidates:
+            best = np.argpartition(-overlap, self.max_candidates)[:self.max_candidates]
+            term_ids, overlap = term_ids[best], overlap[best]
+        return term_ids[np.argsort(-overlap, kind="stable")].tolist()
+
+    def search(self, query: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """Return ``(tool_id, similarity)`` pairs for tools matching the query despite typos."""
+        started = time.perf_counter()
+        words = WORD_PATTERN.findall(query.lower())
+        tokens = [word for word in words if len(word) >= 3]
+        if len(words) > 1:
+            tokens.append("".join(words))
+        verified: List[Tuple[float, int]] = []
+        for token in dict.fromkeys(tokens):
+            limit_typos = max_typos(len(token))
+            for term_id in self._candidates(token):
+                if not self._term_tools[term_id]:
+                    continue
+                term = self._terms[term_id]
+                distance = bounded_edit_distance(token, term, limit_typos)
+                if distance <= limit_typos:
+                    verified.append((1 - distance / max(len(token), len(term)), term_id))
+        # Best terms first, so each tool keeps its highest similarity and a popular
+        # tag never walks more than ``limit`` tools
+        verified.sort(key=lambda item: item[0], reverse=True)
+        scores: Dict[str, float] = {}
+        for similarity, term_id in verified:
+            for tool_id in self._term_tools[term_id]:
+                if len(scores) >= limit:
+                    break
+                scores.setdefault(tool_id, similarity)
+        ranked = list(scores.items())
+        metrics.observe("fuzzy_search_ms", (time.perf_counter() - started) * 1000,
+                        buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+        return ranked
@@ -0,0 +1,40 @@
+"""Dependency checks behind the readiness probe.
+
+Load balancers poll ``/readyz`` every few seconds from every node; the Mongo
+ping result is cached for ``ttl`` seconds so probes do not add a steady
+stream of round trips, and concurrent probes share one ping.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import metrics
+
+
+class CachedPing:
+    def __init__(self, name: str, ping: Callable[[], Awaitable[Any]], ttl: float = 5.0, timeout: float = 2.0):
+        self.name = name
+        self.ping = ping
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def _run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.ping(), self.timeout)
+            result = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}" if str(e) else type(e).__name__}
+        metrics.set_gauge("dependency_up", 1 if result["ok"] else 0, dependency=self.name)
+        self._result, self._checked_at = result, time.monotonic()
+        return result
+
+    async def check(self) -> Dict[str, Any]:
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return dict(self._result, cached=True)
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._run())
+        return dict(await asyncio.shield(self._inflight), cached=False)
@@ -0,0 +1,275 @@
+"""Cross-worker invalidation bus.
+
+Writes that make in-process state stale on other workers (catalog changes,
+new reviews, favorites) publish a small event to a shared, versioned log.
+Every worker follows the log: through a Mongo change stream when the
+deployment supports one (replica sets), otherwise by polling a version
+document every ``poll_interval`` seconds and reading only the newer events.
+
+Events carry a monotonically increasing version. A worker applies each
+version once, skips its own events (it already updated its local state), and
+tracks gaps: a version allocated by a publisher that crashed before writing
+its event, or events that expired while the worker was unreachable. A gap
+that does not fill within ``gap_timeout`` triggers the reset handlers, which
+rebuild local state from the store. The gap is checked on a timer as well as
+on arrival, so a change stream that goes quiet after a gap still resets.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from pymongo import ReturnDocument
+
+from metrics import metrics
+from storage import Document
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Optional[str], Document], Union[None, Awaitable[None]]]
+
+
+class InvalidationLog(ABC):
+    # Whether ``watch`` can stream new events; the bus polls otherwise
+    supports_change_streams = False
+
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def append(self, topic: str, key: Optional[str], origin: str) -> Document:
+        """Allocate the next version and store the event; returns the stored event."""
+
+    @abstractmethod
+    async def read_after(self, version: int, limit: int = 1000) -> List[Document]: ...
+
+    @abstractmethod
+    async def latest_version(self) -> int: ...
+
+    def watch(self):
+        """Async context manager yielding new events as they are written, or None when unsupported."""
+        return None
+
+
+class MongoInvalidationLog(InvalidationLog):
+    supports_change_streams = True
+
+    def __init__(self, db, retention_seconds: int = 3600):
+        self.events = db.invalidations
+        self.meta = db.meta
+        self.retention_seconds = retention_seconds
+
+    async def setup(self):
+        await self.events.create_index("published_at", expireAfterSeconds=self.retention_seconds)
+
+    @staticmethod
+    def _event(doc: Document) -> Document:
+        return {"version": doc["_id"], "topic": doc["topic"], "key": doc.get("key"),
+                "origin": doc["origin"], "published_at": doc["published_at"]}
+
+    async def append(self, topic: str, key: Optional[str], origin: str) -> Document:
+        counter = await self.meta.find_one_and_update(
+            {"_id": "invalidation"}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        doc = {"_id": counter["version"], "topic": topic, "key": key, "origin": origin,
+               "published_at": datetime.utcnow()}
+        await self.events.insert_one(doc)
+        return self._event(doc)
+
+    async def read_after(self, version: int, limit: int = 1000) -> List[Document]:
+        docs = await self.events.find({"_id": {"$gt": version}}).sort("_id", 1).to_list(limit)
+        return [self._event(doc) for doc in docs]
+
+    async def latest_version(self) -> int:
+        doc = await self.meta.find_one({"_id": "invalidation"})
+        return doc["version"] if doc else 0
+
+    def watch(self):
+        return _MongoEventStream(self.events.watch([{"$match": {"operationType": "insert"}}]))
+
+
+class _MongoEventStream:
+    def __init__(self, change_stream):
+        self.change_stream = change_stream
+
+    async def __aenter__(self):
+        await self.change_stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.change_stream.__aexit__(*exc_info)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Document:
+        change = await self.change_stream.__anext__()
+        return MongoInvalidationLog._event(change["fullDocument"])
+
+
+class MemoryInvalidationLog(InvalidationLog):
+    """Single-process log; several buses sharing one instance behave like separate workers."""
+
+    def __init__(self):
+        self.version = 0
+        self.events: List[Document] = []
+
+    def allocate(self) -> int:
+        self.version += 1
+        return self.version
+
+    async def append(self, topic: str, key: Optional[str], origin: str) -> Document:
+        event = {"version": self.allocate(), "topic": topic, "key": key, "origin": origin,
+                 "published_at": datetime.utcnow()}
+        self.events.append(event)
+        return dict(event)
+
+    async def read_after(self, version: int, limit: int = 1000) -> List[Document]:
+        return [dict(event) for event in self.events if event["version"] > version][:limit]
+
+    async def latest_version(self) -> int:
+        return self.version
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class InvalidationBus:
+    def __init__(self, log: InvalidationLog, worker_id: Optional[str] = None, poll_interval: float = 1.0,
+                 gap_timeout: float = 5.0, use_change_streams: bool = True):
+        self.log = log
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.use_change_streams = use_change_streams
+        self.version = 0
+        self.mode = "stopped"
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._reset_handlers: List[Callable[[], Awaitable[None]]] = []
+        # Versions applied above ``self.version`` while an earlier one is still missing
+        self._seen: Set[int] = set()
+        self._gap_since: Optional[float] = None
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def on_reset(self, handler: Callable[[], Awaitable[None]]):
+        self._reset_handlers.append(handler)
+
+    async def setup(self):
+        await self.log.setup()
+
+    async def start(self):
+        """Follow the log from its current end; call before loading the state it invalidates."""
+        self.version = await self.log.latest_version()
+        self._seen.clear()
+        self._gap_since = None
+        metrics.set_gauge("invalidation_version", self.version)
+
+    async def publish(self, topic: str, key: Optional[str] = None) -> Document:
+        event = await self.log.append(topic, key, self.worker_id)
+        metrics.inc("invalidations_published_total", topic=topic)
+        return event
+
+    async def _apply(self, event: Document):
+        version = event["version"]
+        if version <= self.version or version in self._seen:
+            return
+        self._seen.add(version)
+        if event["origin"] == self.worker_id:
+            return
+        lag_ms = (datetime.utcnow() - event["published_at"]).total_seconds() * 1000
+        metrics.observe("invalidation_lag_ms", max(lag_ms, 0.0), buckets=(5, 25, 100, 250, 1000, 2500, 5000, 10000),
+                        topic=event["topic"])
+        metrics.inc("invalidations_applied_total", topic=event["topic"])
+        for handler in self._handlers.get(event["topic"], []):
+            try:
+                result = handler(event["key"], event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                metrics.inc("invalidation_handler_errors_total", topic=event["topic"])
+                logger.warning("Invalidation handler for %s failed: %s", event["topic"], e)
+
+    async def _advance(self):
+        while self.version + 1 in self._seen:
+            self.version += 1
+            self._seen.remove(self.version)
+        if not self._seen:
+            self._gap_since = None
+        elif self._gap_since is None:
+            self._gap_since = time.monotonic()
+        elif time.monotonic() - self._gap_since >= self.gap_timeout:
+            # The missing versions are not coming; rebuild rather than stay stale
+            metrics.inc("invalidation_gaps_total")
+            logger.warning("Invalidation versions %s..%s missing, resetting local state",
+                           self.version + 1, min(self._seen) - 1)
+            self.version = max(self._seen)
+            self._seen.clear()
+            self._gap_since = None
+            for handler in self._reset_handlers:
+                await handler()
+        metrics.set_gauge("invalidation_version", self.version)
+
+    async def receive(self, events: List[Document]):
+        for event in sorted(events, key=lambda event: event["version"]):
+            await self._apply(event)
+        await self._advance()
+
+    async def poll_once(self):
+        # One point read on the version document; events are only read when it moved
+        if await self.log.latest_version() <= self.version and not self._seen:
+            return
+        await self.receive(await self.log.read_after(self.version))
+
+    async def _check_gaps(self):
+        # A pending gap is otherwise only re-checked when the next event arrives
+        while True:
+            await asyncio.sleep(min(self.poll_interval, self.gap_timeout))
+            if not self._seen:
+                continue
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Invalidation gap check failed: %s", e)
+
+    async def _follow_change_stream(self):
+        async with self.log.watch() as stream:
+            self.mode = "change_stream"
+            metrics.set_gauge("invalidation_change_stream", 1)
+            # Anything published before the stream opened
+            await self.poll_once()
+            gap_timer = asyncio.create_task(self._check_gaps())
+            try:
+                async for event in stream:
+                    await self.receive([event])
+            finally:
+                gap_timer.cancel()
+
+    async def run(self):
+        if self.use_change_streams and self.log.supports_change_streams:
+            try:
+                await self._follow_change_stream()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info("Invalidation change stream unavailable (%s); polling every %ss", e, self.poll_interval)
+        self.mode = "polling"
+        metrics.set_gauge("invalidation_change_stream", 0)
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Invalidation poll failed: %s", e)
+            await asyncio.sleep(self.poll_interval)
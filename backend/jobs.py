@@ -0,0 +1,103 @@
+"""Background recommendation jobs.
+
+``POST /api/recommendations/jobs`` stores a job record and puts its id on a
+bounded in-process queue; a fixed pool of worker coroutines runs the jobs and
+writes status and result back to the ``JobStore``, where any worker can serve
+``GET /api/recommendations/jobs/{id}`` until the record expires. A full queue
+rejects new jobs instead of letting latency grow without bound.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional
+
+from metrics import metrics
+from storage import Document, JobStore
+
+logger = logging.getLogger(__name__)
+
+JOB_BUCKETS = (10, 50, 100, 500, 1000, 5000, 15000, 30000, 60000)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, run: Callable[[Document], Awaitable[Any]], workers: int = 4,
+                 max_queued: int = 100, ttl_seconds: int = 3600):
+        self.store = store
+        self.run_job = run
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    async def submit(self, owner_id: str, request: Document) -> Document:
+        if self.queue.full():
+            metrics.inc("recommendation_jobs_total", status="rejected")
+            raise JobQueueFull()
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": owner_id,
+            "status": "queued",
+            "request": request,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        await self.store.insert(job)
+        # Checked again after the insert: another submit may have filled the queue meanwhile
+        try:
+            self.queue.put_nowait((job, time.perf_counter()))
+        except asyncio.QueueFull:
+            await self.store.update(job["id"], {"status": "failed", "error": "Job queue is full",
+                                                "finished_at": datetime.utcnow()})
+            metrics.inc("recommendation_jobs_total", status="rejected")
+            raise JobQueueFull()
+        metrics.set_gauge("recommendation_job_queue_depth", self.queue.qsize())
+        return job
+
+    async def _execute(self, job: Document, enqueued: float):
+        started = time.perf_counter()
+        metrics.observe("recommendation_job_wait_ms", (started - enqueued) * 1000, buckets=JOB_BUCKETS)
+        await self.store.update(job["id"], {"status": "running", "started_at": datetime.utcnow()})
+        try:
+            result = await self.run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, fields = "failed", {"error": getattr(e, "detail", None) or str(e) or type(e).__name__}
+        else:
+            status, fields = "succeeded", {"result": result}
+        metrics.observe("recommendation_job_run_ms", (time.perf_counter() - started) * 1000,
+                        buckets=JOB_BUCKETS, status=status)
+        metrics.inc("recommendation_jobs_total", status=status)
+        await self.store.update(job["id"], dict(fields, status=status, finished_at=datetime.utcnow()))
+
+    async def _worker(self):
+        while True:
+            job, enqueued = await self.queue.get()
+            metrics.set_gauge("recommendation_job_queue_depth", self.queue.qsize())
+            try:
+                await self._execute(job, enqueued)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Recommendation job %s could not be recorded: %s", job["id"], e)
+            finally:
+                self.queue.task_done()
+
+    def start(self) -> List[asyncio.Task]:
+        return [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def get(self, job_id: str, owner_id: Optional[str] = None) -> Optional[Document]:
+        job = await self.store.get(job_id)
+        if job is None or (owner_id is not None and job["user_id"] != owner_id):
+            return None
+        return job
@@ -0,0 +1,32 @@
+"""Deferred construction of expensive process-wide dependencies.
+
+``Lazy`` wraps a factory that runs on the first ``get()``; the time it took
+is recorded in ``lazy_init_ms`` so cold-path costs stay visible after they
+move out of import and startup.
+"""
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from metrics import metrics
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._built = False
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def get(self) -> T:
+        if not self._built:
+            started = time.perf_counter()
+            self._value = self.factory()
+            self._built = True
+            metrics.set_gauge("lazy_init_ms", (time.perf_counter() - started) * 1000, dependency=self.name)
+        return self._value
@@ -0,0 +1,191 @@
+"""Two-tier cache for LLM recommendation results.
+
+A small in-memory LRU sits in front of a persistent backend (a Mongo
+collection with a TTL index, or a local SQLite file), so cached answers
+survive deploys and worker restarts. Keys hash the normalized request inputs
+together with the catalog version, so catalog changes never serve stale
+rankings.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_requirements(requirements: str) -> str:
+    return _WHITESPACE.sub(" ", requirements.strip().lower()).strip(" .!?")
+
+
+def recommendation_cache_key(requirements: str, platforms: List[str], catalog_version: int, model: str) -> str:
+    payload = json.dumps({
+        "requirements": normalize_requirements(requirements),
+        "platforms": sorted(p.lower() for p in platforms),
+        "catalog_version": catalog_version,
+        "model": model,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCacheBackend(ABC):
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any]): ...
+
+
+class MongoResultCache(ResultCacheBackend):
+    def __init__(self, collection, ttl_seconds: int):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    async def setup(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        # The TTL monitor only runs once a minute, so expiry is also checked on read
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        doc = await self.collection.find_one({"_id": key, "created_at": {"$gt": cutoff}})
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+class DiskResultCache(ResultCacheBackend):
+    def __init__(self, path: Path, ttl_seconds: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _setup(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created_at REAL)")
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, value: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+
+    async def setup(self):
+        await asyncio.to_thread(self._setup)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        await asyncio.to_thread(self._set, key, value)
+
+
+class RecommendationCache:
+    def __init__(self, backend: Optional[ResultCacheBackend], ttl_seconds: int, memory_entries: int = 1024):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = {"memory": 0, "persistent": 0}
+        self.misses = 0
+
+    async def setup(self):
+        if self.backend is not None:
+            await self.backend.setup()
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record(self, result: str):
+        metrics.inc("llm_cache_lookups_total", result=result)
+        total = sum(self.hits.values()) + self.misses
+        metrics.set_gauge("llm_cache_hit_rate", sum(self.hits.values()) / total if total else 0.0)
+
+    async def get(self, key: str, record: bool = True) -> Optional[Dict[str, Any]]:
+        """Look up a result; ``record=False`` keeps internal lookups (warming) out of the hit rate."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._memory.move_to_end(key)
+                if record:
+                    self.hits["memory"] += 1
+                    self._record("memory_hit")
+                return value
+            del self._memory[key]
+
+        if self.backend is not None:
+            try:
+                value = await self.backend.get(key)
+            except Exception as e:
+                metrics.inc("llm_cache_backend_errors_total")
+                logger.warning("LLM cache read error: %s", e)
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                if record:
+                    self.hits["persistent"] += 1
+                    self._record("persistent_hit")
+                return value
+
+        if record:
+            self.misses += 1
+            self._record("miss")
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        self._remember(key, value)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value)
+            except Exception as e:
+                metrics.inc("llm_cache_backend_errors_total")
+                logger.warning("LLM cache write error: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "memory_entries": len(self._memory),
+            "memory_hits": self.hits["memory"],
+            "persistent_hits": self.hits["persistent"],
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
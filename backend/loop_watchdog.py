@@ -0,0 +1,97 @@
+"""Event-loop stall detection.
+
+A heartbeat coroutine wakes every ``interval`` seconds and records how late it
+woke (``event_loop_lag_ms``). A daemon thread watches the heartbeat: when the
+loop has not come back for ``threshold_ms``, something is running on it
+without yielding, so the thread grabs that code's stack with
+``sys._current_frames()`` while it is still blocking. When the loop recovers
+the stall is logged with its duration and stack and counted in the metrics.
+
+The same class backs the test suite, which fails any test whose requests block
+the loop longer than the configured limit.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = 100.0, interval: float = 0.05, history: int = 50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._current: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1.0)
+
+    async def __aenter__(self) -> "LoopWatchdog":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            metrics.observe("event_loop_lag_ms", lag * 1000, buckets=(1, 5, 10, 25, 50, 100, 250, 1000, 5000))
+            with self._lock:
+                self._beat = now
+                stall, self._current = self._current, None
+            if stall is not None:
+                stall["duration_ms"] = round(lag * 1000, 1)
+                metrics.observe("event_loop_stall_ms", stall["duration_ms"], buckets=(100, 250, 500, 1000, 5000, 30000))
+                logger.warning("Event loop blocked for %.0f ms (task %s):\n%s", stall["duration_ms"], stall["task"],
+                               stall["stack"])
+
+    def _watch(self):
+        while not self._stop.wait(min(self.threshold / 4, self.interval)):
+            with self._lock:
+                blocked = time.monotonic() - self._beat - self.interval
+                if blocked < self.threshold or self._current is not None:
+                    continue
+                # The loop thread is still inside the blocking call: its frame is the culprit
+                frame = sys._current_frames().get(self._loop_thread)
+                task = asyncio.current_task(self._loop)
+                self._current = {
+                    "started_at": time.time() - blocked,
+                    "task": task.get_name() if task is not None else None,
+                    "stack": "".join(traceback.format_stack(frame)) if frame is not None else "",
+                    "duration_ms": None,
+                }
+                self.stalls.append(self._current)
+            metrics.inc("event_loop_stalls_total")
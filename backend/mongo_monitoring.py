@@ -0,0 +1,136 @@
+"""PyMongo event listeners used for request profiling and driver metrics."""
+import contextvars
+import threading
+import time
+from typing import Optional
+
+from pymongo import monitoring
+
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.failures = 0
+
+
+# Motor runs driver calls in an executor with a copy of the caller's context,
+# so the stats object installed by the request is visible from the listener.
+_current_stats: contextvars.ContextVar[Optional[CommandStats]] = contextvars.ContextVar(
+    "mongo_command_stats", default=None
+)
+
+
+def begin_command_tracking() -> contextvars.Token:
+    return _current_stats.set(CommandStats())
+
+
+def current_command_stats() -> Optional[CommandStats]:
+    return _current_stats.get()
+
+
+def end_command_tracking(token: contextvars.Token):
+    _current_stats.reset(token)
+
+
+class CommandCounter(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration_ms += event.duration_micros / 1000.0
+
+    def failed(self, event):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.failures += 1
+            stats.duration_ms += event.duration_micros / 1000.0
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds connection pool size, wait-queue depth and checkout latency."""
+
+    def __init__(self, registry):
+        self.metrics = registry
+        self._checkout_started = threading.local()
+
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        self.metrics.set_gauge("mongo_pool_max_size", event.options.get("maxPoolSize", 100), address=self._address(event))
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.metrics.inc("mongo_pool_cleared_total", address=self._address(event))
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.metrics.add_gauge("mongo_pool_connections", 1, address=self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.metrics.add_gauge("mongo_pool_connections", -1, address=self._address(event))
+        self.metrics.inc("mongo_pool_connections_closed_total", reason=event.reason)
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+        self.metrics.add_gauge("mongo_pool_wait_queue", 1, address=self._address(event))
+
+    def _checkout_finished(self, event) -> float:
+        started = getattr(self._checkout_started, "value", None)
+        self._checkout_started.value = None
+        self.metrics.add_gauge("mongo_pool_wait_queue", -1, address=self._address(event))
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._checkout_finished(event)
+        self.metrics.inc("mongo_pool_checkout_failures_total", reason=event.reason)
+        self.metrics.observe("mongo_pool_checkout_wait_ms", wait_ms)
+
+    def connection_checked_out(self, event):
+        wait_ms = self._checkout_finished(event)
+        self.metrics.observe("mongo_pool_checkout_wait_ms", wait_ms)
+        self.metrics.add_gauge("mongo_pool_in_use", 1, address=self._address(event))
+
+    def connection_checked_in(self, event):
+        self.metrics.add_gauge("mongo_pool_in_use", -1, address=self._address(event))
+
+
+class ServerMetricsListener(monitoring.ServerListener, monitoring.ServerHeartbeatListener):
+    """Records server description changes and heartbeat round-trip times."""
+
+    def __init__(self, registry):
+        self.metrics = registry
+
+    def opened(self, event):
+        pass
+
+    def closed(self, event):
+        pass
+
+    def description_changed(self, event):
+        previous = event.previous_description.server_type_name
+        new = event.new_description.server_type_name
+        if previous != new:
+            self.metrics.inc("mongo_server_type_changes_total", new_type=new)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.observe("mongo_heartbeat_ms", event.duration * 1000)
+
+    def failed(self, event):
+        self.metrics.inc("mongo_heartbeat_failures_total")
@@ -0,0 +1,169 @@
+"""Personalized recommendations from item-item co-occurrence.
+
+Favorites and reviews rated 4 or more are binary user-tool interactions. Two
+tools co-occur when one user interacted with both, and their similarity is
+the cosine ``c_ij / sqrt(n_i * n_j)`` over those counts. The model is rebuilt
+in one vectorized numpy pass (pairs are generated per chunk of users, so
+memory stays bounded) and keeps the ``neighbors`` most similar tools of each
+tool as CSR arrays. Scoring a user only reads the neighbour rows of the tools
+they already like.
+"""
+import asyncio
+import logging
+import time
+from array import array
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ItemSimilarity:
+    def __init__(self, item_ids: List[str], indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+                 user_index: Dict[str, int], user_indptr: np.ndarray, user_items: np.ndarray):
+        self.item_ids = item_ids
+        self._item_index = {tool_id: index for index, tool_id in enumerate(item_ids)}
+        # Row i of the neighbour matrix: indices[indptr[i]:indptr[i + 1]], best first
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._user_index = user_index
+        self._user_indptr = user_indptr
+        self._user_items = user_items
+
+    @property
+    def interactions(self) -> int:
+        return len(self._user_items)
+
+    def neighbors(self, tool_id: str) -> List[Tuple[str, float]]:
+        row = self._item_index.get(tool_id)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return [(self.item_ids[i], float(w)) for i, w in zip(self.indices[start:end], self.weights[start:end])]
+
+    def recommend(self, user_id: str, extra_tool_ids: Iterable[str] = (), limit: int = 10) -> List[Tuple[str, float]]:
+        """Rank tools the user has not interacted with; scores are mean similarity to their liked tools."""
+        liked = set()
+        user = self._user_index.get(user_id)
+        if user is not None:
+            liked.update(self._user_items[self._user_indptr[user]:self._user_indptr[user + 1]].tolist())
+        liked.update(self._item_index[tool_id] for tool_id in extra_tool_ids if tool_id in self._item_index)
+        if not liked or limit <= 0:
+            return []
+        rows = np.fromiter(liked, dtype=np.int64, count=len(liked))
+        spans = [(self.indptr[row], self.indptr[row + 1]) for row in rows]
+        neighbours = np.concatenate([self.indices[start:end] for start, end in spans])
+        weights = np.concatenate([self.weights[start:end] for start, end in spans])
+        candidates, inverse = np.unique(neighbours, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights, minlength=len(candidates))
+        unseen = ~np.isin(candidates, rows)
+        candidates, scores = candidates[unseen], scores[unseen]
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [(self.item_ids[candidates[i]], float(scores[i]) / len(rows)) for i in best]
+
+
+def build_item_similarity(pairs: Iterable[Tuple[str, str]], neighbors: int = 50, max_items_per_user: int = 200,
+                          chunk_pairs: int = 4_000_000) -> ItemSimilarity:
+    user_index: Dict[str, int] = {}
+    item_index: Dict[str, int] = {}
+    user_codes, item_codes = array("q"), array("q")
+    for user_id, tool_id in pairs:
+        user_codes.append(user_index.setdefault(user_id, len(user_index)))
+        item_codes.append(item_index.setdefault(tool_id, len(item_index)))
+    item_ids = list(item_index)
+    n_users, n_items = len(user_index), len(item_ids)
+
+    # Sorted by user, then tool; a favorite that was also reviewed counts once
+    codes = np.unique(np.frombuffer(user_codes, dtype=np.int64) * max(n_items, 1)
+                      + np.frombuffer(item_codes, dtype=np.int64))
+    users, items = codes // max(n_items, 1), codes % max(n_items, 1)
+    counts = np.bincount(users, minlength=n_users)
+    starts = np.cumsum(counts) - counts
+    # Very heavy users add k^2 pairs and little signal; keep their first items only
+    keep = np.arange(len(users)) - starts[users] < max_items_per_user
+    users, items = users[keep], items[keep]
+    counts = np.minimum(counts, max_items_per_user)
+    starts = np.cumsum(counts) - counts
+    user_indptr = np.append(starts, len(items))
+    popularity = np.bincount(items, minlength=n_items)
+
+    chunk_keys, chunk_counts = [], []
+    pair_totals = np.cumsum(counts * counts)
+    first_user = 0
+    while first_user < n_users:
+        budget = (pair_totals[first_user - 1] if first_user else 0) + chunk_pairs
+        last_user = max(int(np.searchsorted(pair_totals, budget, side="right")), first_user + 1)
+        start, end = user_indptr[first_user], user_indptr[last_user]
+        chunk_items = items[start:end]
+        repeat = counts[users[start:end]]
+        left = np.repeat(chunk_items, repeat)
+        position = np.arange(len(left)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        right = chunk_items[np.repeat(starts[users[start:end]] - start, repeat) + position]
+        distinct = left != right
+        keys, key_counts = np.unique(left[distinct] * n_items + right[distinct], return_counts=True)
+        chunk_keys.append(keys)
+        chunk_counts.append(key_counts)
+        first_user = last_user
+
+    if chunk_keys:
+        keys, inverse = np.unique(np.concatenate(chunk_keys), return_inverse=True)
+        co_counts = np.bincount(inverse, weights=np.concatenate(chunk_counts))
+    else:
+        keys, co_counts = np.zeros(0, dtype=np.int64), np.zeros(0)
+    rows, cols = keys // max(n_items, 1), keys % max(n_items, 1)
+    similarity = co_counts / np.sqrt(popularity[rows] * popularity[cols])
+
+    # Top ``neighbors`` per row: sort by row, then similarity descending
+    order = np.lexsort((-similarity, rows))
+    rows, cols, similarity = rows[order], cols[order], similarity[order]
+    row_starts = np.searchsorted(rows, np.arange(n_items))
+    top = np.arange(len(rows)) - row_starts[rows] < neighbors
+    rows, cols, similarity = rows[top], cols[top], similarity[top]
+    indptr = np.searchsorted(rows, np.arange(n_items + 1))
+    return ItemSimilarity(item_ids, indptr, cols.astype(np.int32), similarity.astype(np.float32),
+                          user_index, user_indptr, items.astype(np.int32))
+
+
+class ItemSimilarityRefresher:
+    """Rebuilds the model every ``interval`` seconds when interactions changed since the last build."""
+
+    def __init__(self, fetch_pairs: Callable[[], Awaitable[List[Tuple[str, str]]]], interval: float = 300.0,
+                 neighbors: int = 50, max_items_per_user: int = 200):
+        self.fetch_pairs = fetch_pairs
+        self.interval = interval
+        self.neighbors = neighbors
+        self.max_items_per_user = max_items_per_user
+        self.model: Optional[ItemSimilarity] = None
+        self._dirty = True
+
+    def interactions_changed(self, *_):
+        self._dirty = True
+
+    async def rebuild(self) -> ItemSimilarity:
+        started = time.perf_counter()
+        pairs = await self.fetch_pairs()
+        model = await asyncio.to_thread(build_item_similarity, pairs, self.neighbors, self.max_items_per_user)
+        self.model = model
+        metrics.observe("item_similarity_build_ms", (time.perf_counter() - started) * 1000,
+                        buckets=(10, 100, 500, 1000, 5000, 30000, 120000))
+        metrics.set_gauge("item_similarity_tools", len(model.item_ids))
+        metrics.set_gauge("item_similarity_interactions", model.interactions)
+        return model
+
+    async def run(self):
+        while True:
+            if self._dirty:
+                # Cleared first, so writes during the build trigger the next one
+                self._dirty = False
+                try:
+                    await self.rebuild()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._dirty = True
+                    logger.warning("Item similarity rebuild failed: %s", e)
+            await asyncio.sleep(self.interval)
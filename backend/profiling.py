@@ -0,0 +1,168 @@
+"""Opt-in per-request profiling.
+
+The middleware is only installed when profiling is enabled, so there is no
+per-request cost otherwise. A request is profiled when it carries
+``X-Profile: true`` together with a valid ``X-Admin-Token`` header, or when it
+is picked by the configured sampling rate. Each profile is written as a
+``.prof`` file (loadable with ``pstats``/snakeviz) plus a ``.json`` sidecar with
+the route, timings and Mongo command count.
+
+cProfile hooks the whole event-loop thread, not the request: while the
+profiled request awaits, every other request the loop runs is recorded too,
+and its CPU time shows up in ``cpu_ms``. Profiles are most readable on an
+otherwise idle worker; on a busy one, read them as a sample of the loop.
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import logging
+import pstats
+import random
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from metrics import metrics
+from mongo_monitoring import begin_command_tracking, current_command_stats, end_command_tracking
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FLAG_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, output_dir: Path, admin_token: Optional[str] = None,
+                 sample_rate: float = 0.0, max_profiles: int = 200):
+        self.app = app
+        self.output_dir = Path(output_dir)
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        # cProfile hooks the whole thread, so only one request is profiled at a time
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        await self._profile_request(scope, receive, send)
+
+    def _should_profile(self, scope) -> bool:
+        if self.admin_token:
+            headers = dict(scope.get("headers") or [])
+            flag = headers.get(PROFILE_FLAG_HEADER, b"").lower()
+            token = headers.get(ADMIN_TOKEN_HEADER)
+            if flag in (b"1", b"true") and token is not None and hmac.compare_digest(
+                token, self.admin_token.encode()
+            ):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def _profile_request(self, scope, receive, send):
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        stats_token = begin_command_tracking()
+        started_at = datetime.utcnow()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.process_time() - cpu_start) * 1000
+            command_stats = current_command_stats()
+            end_command_tracking(stats_token)
+            self._active = False
+
+            endpoint = scope.get("endpoint")
+            record = {
+                "id": f"{started_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}",
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "route": getattr(endpoint, "__name__", None),
+                "status_code": status_code,
+                "started_at": started_at.isoformat(),
+                "wall_ms": round(wall_ms, 3),
+                "cpu_ms": round(cpu_ms, 3),
+                "mongo_commands": command_stats.count if command_stats else 0,
+                "mongo_failures": command_stats.failures if command_stats else 0,
+                "mongo_ms": round(command_stats.duration_ms, 3) if command_stats else 0.0,
+            }
+            metrics.inc("profiles_captured_total", route=record["route"] or "unknown")
+            try:
+                await asyncio.to_thread(self._write_profile, profiler, record)
+            except OSError as e:
+                logger.warning("Failed to write request profile: %s", e)
+
+    def _write_profile(self, profiler: cProfile.Profile, record: Dict[str, Any]):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(self.output_dir / f"{record['id']}.prof"))
+        record["top_functions"] = _top_functions(profiler, limit=15)
+        with open(self.output_dir / f"{record['id']}.json", "w") as f:
+            json.dump(record, f, indent=2)
+        self._prune()
+
+    def _prune(self):
+        sidecars = sorted(self.output_dir.glob("*.json"))
+        for sidecar in sidecars[:max(0, len(sidecars) - self.max_profiles)]:
+            sidecar.unlink(missing_ok=True)
+            sidecar.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def list_profiles(output_dir: Path) -> List[Dict[str, Any]]:
+    output_dir = Path(output_dir)
+    if not output_dir.exists():
+        return []
+    profiles = []
+    for sidecar in sorted(output_dir.glob("*.json"), reverse=True):
+        try:
+            with open(sidecar) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record.pop("top_functions", None)
+        profiles.append(record)
+    return profiles
+
+
+def load_profile(output_dir: Path, profile_id: str, limit: int = 40) -> Optional[Dict[str, Any]]:
+    output_dir = Path(output_dir)
+    sidecar = output_dir / f"{profile_id}.json"
+    # Reject anything that would resolve outside the profile directory
+    if sidecar.parent.resolve() != output_dir.resolve() or not sidecar.exists():
+        return None
+    with open(sidecar) as f:
+        record = json.load(f)
+    stream = io.StringIO()
+    pstats.Stats(str(sidecar.with_suffix(".prof")), stream=stream).sort_stats("cumulative").print_stats(limit)
+    record["stats"] = stream.getvalue()
+    return record
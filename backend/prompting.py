@@ -0,0 +1,115 @@
+"""Compact prompt encoding for the recommendation LLM.
+
+Tools are rendered as a pipe-separated table with a single header row instead
+of indented JSON, and the number of rows is chosen from a token budget using
+a local token estimate (no tokenizer download or API call needed). Batched
+requests put several requirements in front of one shared table; how many fit
+in a prompt is decided from the same estimate.
+"""
+import math
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+TOOL_COLUMNS = ("name", "category", "platforms", "pricing", "rating", "features", "description")
+MAX_DESCRIPTION_CHARS = 200
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    # BPE vocabularies keep common words whole and split long ones into ~4 char pieces;
+    # digits group in threes and punctuation is usually one token per character.
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece.isalpha():
+            tokens += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        value = ";".join(str(v) for v in value)
+    text = str(value).replace("|", "/").replace("\n", " ").strip()
+    return text
+
+
+def encode_tool_row(tool: Dict[str, Any], columns: Sequence[str] = TOOL_COLUMNS) -> str:
+    cells = []
+    for column in columns:
+        value = tool.get(column, "")
+        if column == "description" and len(value) > MAX_DESCRIPTION_CHARS:
+            value = value[:MAX_DESCRIPTION_CHARS].rsplit(" ", 1)[0] + "…"
+        cells.append(_cell(value))
+    return "|".join(cells)
+
+
+def encode_tools_table(tools: List[Dict[str, Any]], budget_tokens: int,
+                       columns: Sequence[str] = TOOL_COLUMNS) -> Tuple[str, List[Dict[str, Any]], int]:
+    """Encode as many tools as fit in ``budget_tokens``.
+
+    Returns the table text, the tools that were included and the estimated
+    token count of the table.
+    """
+    header = "|".join(columns)
+    lines = [header]
+    used = estimate_tokens(header) + 1
+    included = []
+    for tool in tools:
+        row = encode_tool_row(tool, columns)
+        row_tokens = estimate_tokens(row) + 1
+        if used + row_tokens > budget_tokens:
+            break
+        lines.append(row)
+        used += row_tokens
+        included.append(tool)
+    return "\n".join(lines), included, used
+
+
+def build_recommendation_prompt(requirements: str, tools_table: str) -> str:
+    return f"""User requirements: "{requirements}"
+
+Available AI tools (one per line, columns separated by "|", list values separated by ";"):
+{tools_table}
+
+Recommend the most suitable tools considering use case alignment, platform compatibility, features and value for money.
+Respond with a JSON object:
+{{"recommended_tools": [tool names ranked by relevance], "reasoning": "why these tools match", "match_scores": {{"tool_name": score_out_of_100}}}}"""
+
+
+def build_batch_recommendation_prompt(requirements: Sequence[str], tools_table: str) -> str:
+    numbered = "\n".join(f'{i}. "{text}"' for i, text in enumerate(requirements, 1))
+    return f"""User requirements (answer each one separately):
+{numbered}
+
+Available AI tools (one per line, columns separated by "|", list values separated by ";"):
+{tools_table}
+
+For each numbered requirement, recommend the most suitable tools considering use case alignment, platform compatibility, features and value for money.
+Respond with a JSON object:
+{{"results": [{{"requirement": number, "recommended_tools": [tool names ranked by relevance], "reasoning": "why these tools match", "match_scores": {{"tool_name": score_out_of_100}}}}]}}"""
+
+
+def pack_requirements(requirements: Sequence[str], table_tokens: int, budget_tokens: int,
+                      completion_tokens_per_item: int, max_per_prompt: int) -> List[List[int]]:
+    """Greedily group requirement indices into prompts that share one tools table.
+
+    A group's cost is the table plus each requirement and the completion it
+    needs; groups never exceed ``budget_tokens`` or ``max_per_prompt`` items.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = table_tokens
+    for index, text in enumerate(requirements):
+        cost = estimate_tokens(text) + 4 + completion_tokens_per_item
+        if current and (len(current) >= max_per_prompt or used + cost > budget_tokens):
+            groups.append(current)
+            current, used = [], table_tokens
+        current.append(index)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,138 @@
+"""Ranking helpers used around the recommendation LLM.
+
+Catalogs that do not fit in a single prompt are split into prompt-sized
+shards, each shard is scored by the LLM independently, and the per-shard
+``match_scores`` are merged into one ranking. Shards are stratified by rating
+so every shard sees a similar mix of tools, which makes a per-shard median
+shift a reasonable calibration. The number of shards follows the size of the
+candidate list up to a cap; past the cap the lowest-rated candidates are cut
+before sharding rather than silently truncated inside each prompt.
+
+``rank_locally`` is the keyword ranker used when the LLM is unavailable,
+too slow, or short-circuited by the circuit breaker.
+"""
+import heapq
+import re
+import statistics
+from typing import Any, Dict, List, Optional
+
+from prompting import TOOL_COLUMNS, encode_tool_row, estimate_tokens
+
+
+def shard_by_budget(tools: List[Dict[str, Any]], budget_tokens: int, max_shards: int) -> List[List[Dict[str, Any]]]:
+    """Split tools into shards whose tables each fit ``budget_tokens``, as many as needed up to ``max_shards``.
+
+    Tools are dealt best-rated first to the least-filled shard. When even
+    ``max_shards`` shards cannot hold them all, the remaining lowest-rated
+    tools are left out; callers compare the shard sizes with the input.
+    """
+    if not tools:
+        return []
+    ordered = sorted(tools, key=lambda t: t.get("rating", 0), reverse=True)
+    row_tokens = [estimate_tokens(encode_tool_row(tool)) + 1 for tool in ordered]
+    capacity = budget_tokens - estimate_tokens("|".join(TOOL_COLUMNS)) - 1
+    # Headroom for uneven row sizes, so dealing rarely runs out of room before the last shard is full
+    shard_count = min(max_shards, max(1, -(-sum(row_tokens) // max(int(capacity * 0.9), 1))))
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(shard_count)]
+    fill = [(0, index) for index in range(shard_count)]
+    for tool, tokens in zip(ordered, row_tokens):
+        used, index = fill[0]
+        if used + tokens > capacity:
+            break
+        shards[index].append(tool)
+        heapq.heapreplace(fill, (used + tokens, index))
+    return [shard for shard in shards if shard]
+
+
+def _shard_scores(result: Dict[str, Any], shard: List[Dict[str, Any]]) -> Dict[str, float]:
+    names = {tool["name"] for tool in shard}
+    scores: Dict[str, float] = {}
+    for name, score in (result.get("match_scores") or {}).items():
+        try:
+            if name in names:
+                scores[name] = float(score)
+        except (TypeError, ValueError):
+            continue
+    # Recommended tools without an explicit score sit just below the shard's lowest score
+    floor = min(scores.values(), default=50.0)
+    for name in result.get("recommended_tools") or []:
+        if name in names and name not in scores:
+            scores[name] = max(floor - 1.0, 0.0)
+    return scores
+
+
+def merge_shard_results(results: List[Optional[Dict[str, Any]]],
+                        shards: List[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Merge per-shard LLM results into one calibrated ranking.
+
+    Shards whose call failed are passed as ``None`` and skipped. Returns None
+    when no shard produced a usable result.
+    """
+    per_shard = []
+    for result, shard in zip(results, shards):
+        if result:
+            scores = _shard_scores(result, shard)
+            if scores:
+                per_shard.append((result, scores))
+    if not per_shard:
+        return None
+
+    global_median = statistics.median(s for _, scores in per_shard for s in scores.values())
+    merged: Dict[str, float] = {}
+    best_reasoning, best_score = "", float("-inf")
+    for result, scores in per_shard:
+        shift = global_median - statistics.median(scores.values())
+        for name, score in scores.items():
+            calibrated = min(100.0, max(0.0, score + shift))
+            merged[name] = round(calibrated, 1)
+            if calibrated > best_score:
+                best_score, best_reasoning = calibrated, result.get("reasoning", "")
+
+    ranked = sorted(merged, key=merged.get, reverse=True)
+    return {
+        "recommended_tools": ranked,
+        "reasoning": best_reasoning,
+        "match_scores": merged,
+    }
+
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from help i in is it me my need of on or so that the this to tool tools "
+    "use using want we with without you your ai".split()
+)
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ation", "ing", "ers", "ion", "ate", "er", "ed", "es", "s", "e")
+FIELD_WEIGHTS = (("name", 3.0), ("tags", 2.5), ("category", 2.0), ("features", 1.5), ("description", 1.0))
+
+
+def stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if len(word) - len(suffix) >= 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def keyword_stems(text: str) -> set:
+    return {stem(word) for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS}
+
+
+def rank_locally(requirements: str, tools: List[Dict[str, Any]], limit: int = 5) -> Dict[str, Any]:
+    """Score tools by weighted keyword overlap with the requirements, breaking ties by rating."""
+    query = keyword_stems(requirements)
+    max_weight = sum(weight for _, weight in FIELD_WEIGHTS)
+    scores: Dict[str, float] = {}
+    for tool in tools:
+        match = 0.0
+        if query:
+            for field, weight in FIELD_WEIGHTS:
+                value = tool.get(field) or ""
+                text = " ".join(value) if isinstance(value, list) else str(value)
+                match += weight * len(query & keyword_stems(text)) / len(query)
+        score = 100 * (0.85 * min(match / max_weight * 2, 1.0) + 0.15 * float(tool.get("rating") or 0) / 5)
+        scores[tool["name"]] = round(score, 1)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return {
+        "recommended_tools": ranked,
+        "reasoning": "Tools ranked by keyword match with your requirements and community rating",
+        "match_scores": {name: scores[name] for name in ranked},
+    }
@@ -1,4 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, status
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -12,27 +16,169 @@ import uuid
 from datetime import datetime, timedelta
 import jwt
 from passlib.context import CryptContext
-from openai import OpenAI
 import json
 import asyncio
+import hmac
+from metrics import metrics
+from mongo_monitoring import CommandCounter, PoolMetricsListener, ServerMetricsListener
+from profiling import ProfilingMiddleware, list_profiles, load_profile
+from storage import DuplicateReviewError, create_stores
+from prompting import (
+    build_batch_recommendation_prompt, build_recommendation_prompt, encode_tools_table, estimate_tokens,
+    pack_requirements
+)
+from ranking import merge_shard_results, rank_locally, shard_by_budget
+from circuit_breaker import CircuitBreaker
+from warmup import QueryStats, RecommendationWarmer
+from semantic_cache import SemanticCache
+from facets import PRICE_TIERS, FacetCache
+from suggest import SuggestIndex
+from fuzzy import FuzzyIndex
+from lazy import Lazy
+from loop_watchdog import LoopWatchdog
+from catalog import CatalogCache
+from catalog_snapshot import CatalogSnapshotManager
+from health import CachedPing
+from jobs import JobQueue, JobQueueFull
+from personalization import ItemSimilarityRefresher
+from similar import SimilarToolsRefresher
+from counters import ToolCounters
+from trending import TrendingTools
+from invalidation import InvalidationBus, MemoryInvalidationLog, MongoInvalidationLog
+from llm_cache import DiskResultCache, MongoResultCache, RecommendationCache, recommendation_cache_key
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+logger = logging.getLogger(__name__)
+
+# Admin access (admin endpoints are disabled unless a token is configured)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Per-request profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true' or PROFILE_SAMPLE_RATE > 0
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', ROOT_DIR / 'profiles'))
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+
+def mongo_client_options() -> Dict[str, Any]:
+    # Pool sizing should follow the worker count: each worker gets its own pool
+    options: Dict[str, Any] = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000')),
+    }
+    if os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'):
+        options["waitQueueTimeoutMS"] = int(os.environ['MONGO_WAIT_QUEUE_TIMEOUT_MS'])
+    if os.environ.get('MONGO_COMPRESSORS'):
+        options["compressors"] = os.environ['MONGO_COMPRESSORS']
+    listeners = [PoolMetricsListener(metrics), ServerMetricsListener(metrics)]
+    if PROFILING_ENABLED:
+        listeners.append(CommandCounter())
+    options["event_listeners"] = listeners
+    return options
+
+# Storage backend: "mongo" (default) or "memory" for tests, benchmarks and single-node runs
+STORAGE = os.environ.get('STORAGE', 'mongo').lower()
+if STORAGE == 'mongo':
+    # connect=False: monitors, pool and connections start with the first operation
+    client = AsyncIOMotorClient(mongo_url, connect=False, **mongo_client_options())
+    db = client[os.environ['DB_NAME']]
+else:
+    client = None
+    db = None
+stores = create_stores(STORAGE, db)
+# Wrap review writes in a Mongo transaction (requires a replica set)
+REVIEW_WRITE_TRANSACTIONS = os.environ.get('REVIEW_WRITE_TRANSACTIONS', 'false').lower() == 'true'
 
 # OpenAI setup
-openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+# Hard deadline for one recommendation (all shards included)
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+
+def create_openai_client():
+    # Imported on first use: the SDK import alone is a large share of server import time
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'), timeout=LLM_TIMEOUT_SECONDS, max_retries=1)
+
+openai_client = Lazy("openai", create_openai_client)
+RECOMMENDATION_SYSTEM_PROMPT = "You are an AI tools expert who provides intelligent recommendations based on user requirements. Always respond with valid JSON."
+# Token budget for the tool table in the recommendation prompt; decides how many tools fit
+LLM_PROMPT_TOKEN_BUDGET = int(os.environ.get('LLM_PROMPT_TOKEN_BUDGET', '3000'))
+# Catalogs larger than one prompt are split into as many shards as they need, up to LLM_MAX_SHARDS,
+# scored at most LLM_SHARD_CONCURRENCY at a time so one request cannot take every LLM slot
+LLM_SHARDED_RANKING = os.environ.get('LLM_SHARDED_RANKING', 'true').lower() == 'true'
+LLM_MAX_SHARDS = int(os.environ.get('LLM_MAX_SHARDS', '8'))
+LLM_SHARD_CONCURRENCY = int(os.environ.get('LLM_SHARD_CONCURRENCY', '2'))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '4'))
+# Optional final pass over the merged top-N (0 disables it)
+LLM_RERANK_TOP_N = int(os.environ.get('LLM_RERANK_TOP_N', '0'))
+RECOMMENDATION_CANDIDATE_LIMIT = int(os.environ.get('RECOMMENDATION_CANDIDATE_LIMIT', '500'))
+# Batched recommendations: requirements sharing one candidate list are packed into a prompt
+RECOMMENDATION_BATCH_MAX_ITEMS = int(os.environ.get('RECOMMENDATION_BATCH_MAX_ITEMS', '25'))
+LLM_BATCH_MAX_REQUIREMENTS = int(os.environ.get('LLM_BATCH_MAX_REQUIREMENTS', '4'))
+LLM_BATCH_TOKEN_BUDGET = int(os.environ.get('LLM_BATCH_TOKEN_BUDGET', '7000'))
+LLM_BATCH_COMPLETION_TOKENS = int(os.environ.get('LLM_BATCH_COMPLETION_TOKENS', '700'))
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+LLM_MODEL = "gpt-4"
+
+# Circuit breaker: opens after consecutive failures or calls slower than the latency SLO
+llm_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=int(os.environ.get('LLM_BREAKER_FAILURE_THRESHOLD', '5')),
+    slow_call_ms=float(os.environ.get('LLM_LATENCY_SLO_MS', '10000')),
+    reset_timeout=float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30'))
+)
+# Hedged mode: answer with the local ranking if the LLM is slower than this (0 disables it)
+LLM_HEDGE_DEADLINE_SECONDS = float(os.environ.get('LLM_HEDGE_DEADLINE_SECONDS', '0'))
+background_tasks = set()
+# Summary updates and publishes of acknowledged reviews; drained, not cancelled, at shutdown
+review_followups = set()
+
+# Recommendation cache: warm in-memory tier in front of a persistent backend (mongo, disk or none)
+LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'mongo' if STORAGE == 'mongo' else 'none').lower()
+LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', str(24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', '1024'))
+LLM_CACHE_PATH = Path(os.environ.get('LLM_CACHE_PATH', ROOT_DIR / 'cache' / 'llm_cache.sqlite3'))
+
+def create_recommendation_cache() -> RecommendationCache:
+    if LLM_CACHE_BACKEND == 'mongo' and db is not None:
+        backend = MongoResultCache(db.llm_cache, LLM_CACHE_TTL_SECONDS)
+    elif LLM_CACHE_BACKEND == 'disk':
+        backend = DiskResultCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS)
+    else:
+        backend = None
+    return RecommendationCache(backend, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MEMORY_ENTRIES)
+
+recommendation_cache = create_recommendation_cache()
+
+# Near-duplicate query cache in front of the LLM (per worker, in memory)
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+semantic_cache = SemanticCache(
+    capacity=int(os.environ.get('SEMANTIC_CACHE_CAPACITY', '10000')),
+    dim=int(os.environ.get('SEMANTIC_CACHE_DIM', '256')),
+    threshold=float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.85'))
+) if SEMANTIC_CACHE_ENABLED else None
+
+# Cache warming for the most frequent recommendation queries (WARM_TOP_N=0 disables it)
+WARM_TOP_N = int(os.environ.get('WARM_TOP_N', '50'))
+WARM_INTERVAL_SECONDS = float(os.environ.get('WARM_INTERVAL_SECONDS', '900'))
+QUERY_STATS_FLUSH_SECONDS = float(os.environ.get('QUERY_STATS_FLUSH_SECONDS', '60'))
+
+# Event-loop watchdog: logs the stack of code that blocks the loop longer than this (0 disables it)
+LOOP_WATCHDOG_THRESHOLD_MS = float(os.environ.get('LOOP_WATCHDOG_THRESHOLD_MS', '100'))
+loop_watchdog = LoopWatchdog(threshold_ms=LOOP_WATCHDOG_THRESHOLD_MS) if LOOP_WATCHDOG_THRESHOLD_MS > 0 else None
+
+# Typo-tolerant matches appended to /api/tools?search= results
+FUZZY_SEARCH_ENABLED = os.environ.get('FUZZY_SEARCH_ENABLED', 'true').lower() == 'true'
 
 # Security setup
 SECRET_KEY = "your-secret-key-here"  # In production, use a secure random key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = Lazy("passlib", lambda: CryptContext(schemes=["bcrypt"], deprecated="auto"))
 security = HTTPBearer()
 
 # Create the main app without a prefix
@@ -75,6 +221,8 @@ class AITool(BaseModel):
     url: str
     rating: float = 0.0
     review_count: int = 0
+    views: int = 0
+    clicks: int = 0
     tags: List[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -88,6 +236,18 @@ class AIToolCreate(BaseModel):
     url: str
     tags: List[str] = []
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class ToolSearchResult(BaseModel):
+    tools: List[AITool]
+    total: int
+    facets: Dict[str, List[FacetCount]]
+
+class SimilarTool(AITool):
+    similarity: float
+
 class ToolRecommendationRequest(BaseModel):
     requirements: str
     preferred_platforms: List[str] = []
@@ -99,6 +259,28 @@ class ToolRecommendation(BaseModel):
     reasoning: str
     match_scores: Dict[str, float]
 
+class RecommendationBatchRequest(BaseModel):
+    items: List[ToolRecommendationRequest] = Field(..., min_length=1, max_length=RECOMMENDATION_BATCH_MAX_ITEMS)
+
+class FavoritesUpdate(BaseModel):
+    # Either the full set or an add/remove diff; ``version`` is the last one the client saw
+    favorites: Optional[List[str]] = Field(None, max_length=1000)
+    add: List[str] = Field([], max_length=1000)
+    remove: List[str] = Field([], max_length=1000)
+    version: Optional[int] = None
+
+class TrendingTool(AITool):
+    trend_score: float
+
+class RecommendationJob(BaseModel):
+    id: str
+    status: str  # queued, running, succeeded or failed
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ToolRecommendation] = None
+    error: Optional[str] = None
+
 class UserReview(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -109,15 +291,22 @@ class UserReview(BaseModel):
 
 class ReviewCreate(BaseModel):
     tool_id: str
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comment: str
 
+class ReviewSummary(BaseModel):
+    tool_id: str
+    count: int = 0
+    mean: float = 0.0
+    histogram: Dict[str, int] = Field(default_factory=lambda: {str(star): 0 for star in range(1, 6)})
+    latest_review_at: Optional[datetime] = None
+
 # Authentication functions
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.get().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return pwd_context.get().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -138,14 +327,20 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = await db.users.find_one({"email": user_email})
+    user = await stores.users.get_by_email(user_email)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return User(**user)
 
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 # Initialize sample AI tools data
 async def init_sample_data():
-    existing_tools = await db.ai_tools.count_documents({})
+    existing_tools = await stores.tools.count()
     if existing_tools == 0:
         sample_tools = [
             {
@@ -219,70 +414,441 @@ async def init_sample_data():
                 "created_at": datetime.utcnow()
             }
         ]
-        await db.ai_tools.insert_many(sample_tools)
-        print("Sample AI tools data initialized")
+        await stores.tools.insert_many(sample_tools)
+        logger.info("Sample AI tools data initialized")
 
 # OpenAI recommendation function
-async def get_ai_recommendations(requirements: str, available_tools: List[dict]) -> Dict[str, Any]:
-    tools_summary = []
-    for tool in available_tools[:20]:  # Limit to avoid token limits
-        tools_summary.append({
-            "name": tool["name"],
-            "description": tool["description"],
-            "category": tool["category"],
-            "platforms": tool["platforms"],
-            "features": tool["features"],
-            "pricing": tool["pricing"],
-            "rating": tool["rating"]
-        })
-    
-    prompt = f"""
-    Based on the user requirements: "{requirements}"
-    
-    Here are the available AI tools:
-    {json.dumps(tools_summary, indent=2)}
-    
-    Please analyze the requirements and recommend the most suitable tools. 
-    Respond with a JSON object containing:
-    {{
-        "recommended_tools": [list of tool names ranked by relevance],
-        "reasoning": "explanation of why these tools match the requirements",
-        "match_scores": {{"tool_name": score_out_of_100, ...}}
-    }}
-    
-    Consider factors like use case alignment, platform compatibility, features matching, and value for money.
-    """
+async def complete_recommendation_prompt(prompt: str, max_tokens: int = 1500) -> Dict[str, Any]:
+    metrics.observe("llm_prompt_chars", len(prompt), buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000))
+    metrics.observe("llm_prompt_tokens_estimated", estimate_tokens(RECOMMENDATION_SYSTEM_PROMPT) + estimate_tokens(prompt),
+                    buckets=(250, 500, 1000, 2000, 4000, 8000))
     
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
+    async with llm_semaphore:
+        started = time.perf_counter()
+        response = await openai_client.get().chat.completions.create(
+            model=LLM_MODEL,
             messages=[
-                {"role": "system", "content": "You are an AI tools expert who provides intelligent recommendations based on user requirements. Always respond with valid JSON."},
+                {"role": "system", "content": RECOMMENDATION_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=1500,
+            max_tokens=max_tokens,
             temperature=0.3
         )
-        
-        result = json.loads(response.choices[0].message.content)
-        return result
-    except Exception as e:
-        print(f"OpenAI API error: {e}")
-        # Fallback to simple keyword matching
+        metrics.observe("llm_call_ms", (time.perf_counter() - started) * 1000)
+    
+    if response.usage is not None:
+        metrics.inc("llm_prompt_tokens_total", response.usage.prompt_tokens)
+        metrics.inc("llm_completion_tokens_total", response.usage.completion_tokens)
+    return json.loads(response.choices[0].message.content)
+
+async def call_recommendation_llm(requirements: str, tools: List[dict]) -> Dict[str, Any]:
+    tools_table, included_tools, _ = encode_tools_table(tools, LLM_PROMPT_TOKEN_BUDGET)
+    metrics.observe("llm_prompt_tools", len(included_tools), buckets=(5, 10, 20, 40, 80, 160))
+    if len(included_tools) < len(tools):
+        metrics.inc("llm_prompt_tools_truncated_total")
+    return await complete_recommendation_prompt(build_recommendation_prompt(requirements, tools_table))
+
+async def call_batch_recommendation_llm(requirements: List[str], tools_table: str) -> List[Optional[Dict[str, Any]]]:
+    """Score several requirements against one tools table; unusable answers come back as None."""
+    metrics.observe("llm_batch_prompt_requirements", len(requirements), buckets=(1, 2, 4, 8))
+    data = await complete_recommendation_prompt(build_batch_recommendation_prompt(requirements, tools_table),
+                                                max_tokens=LLM_BATCH_COMPLETION_TOKENS * len(requirements))
+    answers: List[Optional[Dict[str, Any]]] = [None] * len(requirements)
+    for position, entry in enumerate(data.get("results") or []):
+        if not isinstance(entry, dict) or not isinstance(entry.get("match_scores"), dict):
+            continue
+        number = entry.get("requirement", position + 1)
+        if isinstance(number, int) and 1 <= number <= len(requirements) and answers[number - 1] is None:
+            answers[number - 1] = {
+                "recommended_tools": list(entry.get("recommended_tools") or []),
+                "reasoning": entry.get("reasoning") or "Tools recommended based on your requirements",
+                "match_scores": entry["match_scores"]
+            }
+    return answers
+
+async def get_sharded_recommendations(requirements: str, shards: List[List[dict]]) -> Dict[str, Any]:
+    metrics.observe("llm_ranking_shards", len(shards), buckets=(1, 2, 4, 8, 16, 32))
+    # Shards beyond the per-request limit run in later waves
+    wave = asyncio.Semaphore(llm_shard_concurrency())
+
+    async def score(shard: List[dict]) -> Dict[str, Any]:
+        async with wave:
+            return await call_recommendation_llm(requirements, shard)
+
+    results = await asyncio.gather(*(score(shard) for shard in shards), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        metrics.inc("llm_shard_failures_total", len(failures))
+    merged = merge_shard_results([None if isinstance(r, Exception) else r for r in results], shards)
+    if merged is None:
+        raise failures[0] if failures else ValueError("No shard returned usable match scores")
+    
+    if LLM_RERANK_TOP_N > 0:
+        tools_by_name = {tool["name"]: tool for shard in shards for tool in shard}
+        finalists = [tools_by_name[name] for name in merged["recommended_tools"][:LLM_RERANK_TOP_N]]
+        try:
+            reranked = await call_recommendation_llm(requirements, finalists)
+        except Exception as e:
+            logger.warning("OpenAI re-rank error: %s", e)
+            return merged
+        finalist_names = {tool["name"] for tool in finalists}
+        order = [name for name in reranked.get("recommended_tools", []) if name in finalist_names]
+        order += [name for name in merged["recommended_tools"] if name not in order]
+        scores = dict(merged["match_scores"])
+        for name, score in (reranked.get("match_scores") or {}).items():
+            if name in finalist_names:
+                scores[name] = score
         return {
-            "recommended_tools": [tool["name"] for tool in available_tools[:5]],
-            "reasoning": "Showing top-rated tools due to AI service unavailability",
-            "match_scores": {tool["name"]: 80.0 for tool in available_tools[:5]}
+            "recommended_tools": order,
+            "reasoning": reranked.get("reasoning") or merged["reasoning"],
+            "match_scores": scores
         }
+    return merged
+
+def llm_shard_concurrency() -> int:
+    # Never more than the worker-wide LLM limit, so a sharded request leaves slots for others
+    return max(1, min(LLM_SHARD_CONCURRENCY, LLM_MAX_CONCURRENCY))
+
+def shard_candidates(tools: List[dict]) -> List[List[dict]]:
+    shards = shard_by_budget(tools, LLM_PROMPT_TOKEN_BUDGET, max(1, LLM_MAX_SHARDS))
+    dropped = len(tools) - sum(len(shard) for shard in shards)
+    if dropped:
+        metrics.inc("llm_shard_tools_dropped_total", dropped)
+        logger.warning("%d of %d candidates do not fit in %d shards of %d tokens; the lowest-rated are not scored",
+                       dropped, len(tools), LLM_MAX_SHARDS, LLM_PROMPT_TOKEN_BUDGET)
+    return shards
+
+def get_fallback_recommendations(requirements: str, available_tools: List[dict], reason: str) -> Dict[str, Any]:
+    metrics.inc("llm_fallbacks_total", reason=reason)
+    result = rank_locally(requirements, available_tools)
+    result["fallback"] = True
+    return result
+
+async def get_ai_recommendations(requirements: str, available_tools: List[dict]) -> Dict[str, Any]:
+    if not llm_breaker.allow_request():
+        return get_fallback_recommendations(requirements, available_tools, "circuit_open")
+    
+    started = time.perf_counter()
+    try:
+        shards = shard_candidates(available_tools) if LLM_SHARDED_RANKING else []
+        if len(shards) > 1:
+            call = get_sharded_recommendations(requirements, shards)
+        else:
+            call = call_recommendation_llm(requirements, shards[0] if shards else available_tools)
+        result = await asyncio.wait_for(call, LLM_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        llm_breaker.record_abandoned()
+        raise
+    except Exception as e:
+        llm_breaker.record_failure()
+        logger.warning("OpenAI API error: %s", e)
+        # Fallback to local keyword matching
+        return get_fallback_recommendations(requirements, available_tools, "error")
+    llm_breaker.record_success((time.perf_counter() - started) * 1000)
+    return result
+
+async def get_packed_recommendations(requirements: List[str], tools_table: str) -> List[Optional[Dict[str, Any]]]:
+    # Same breaker and deadline as a single call; None entries are answered one by one
+    if not llm_breaker.allow_request():
+        return [None] * len(requirements)
+    started = time.perf_counter()
+    try:
+        answers = await asyncio.wait_for(call_batch_recommendation_llm(requirements, tools_table), LLM_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        llm_breaker.record_abandoned()
+        raise
+    except Exception as e:
+        llm_breaker.record_failure()
+        logger.warning("OpenAI batch error: %s", e)
+        return [None] * len(requirements)
+    llm_breaker.record_success((time.perf_counter() - started) * 1000)
+    return answers
+
+async def remember_recommendation(cache_key: str, requirements: str, scope: int, result: Dict[str, Any]):
+    # Fallback rankings are not worth remembering once the LLM is back
+    if result.get("fallback"):
+        return
+    if semantic_cache is not None:
+        semantic_cache.add(requirements, scope, result)
+    await recommendation_cache.set(cache_key, result)
+
+def _remember_when_done(cache_key: str, requirements: str, scope: int, task: asyncio.Task):
+    if task.cancelled() or task.exception() is not None:
+        return
+    background = asyncio.ensure_future(remember_recommendation(cache_key, requirements, scope, task.result()))
+    background_tasks.add(background)
+    background.add_done_callback(background_tasks.discard)
+
+async def lookup_cached_recommendation(cache_key: str, requirements: str, scope: int) -> Optional[Dict[str, Any]]:
+    cached = await recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    if semantic_cache is not None:
+        match = semantic_cache.lookup(requirements, scope)
+        if match is not None:
+            return match[0]
+    return None
+
+async def get_cached_ai_recommendations(requirements: str, platforms: List[str],
+                                        available_tools: List[dict], catalog_version: int) -> Dict[str, Any]:
+    cache_key = recommendation_cache_key(requirements, platforms, catalog_version, LLM_MODEL)
+    scope = SemanticCache.scope_id(platforms, catalog_version)
+    cached = await lookup_cached_recommendation(cache_key, requirements, scope)
+    if cached is not None:
+        return cached
+    
+    llm_task = asyncio.ensure_future(get_ai_recommendations(requirements, available_tools))
+    if LLM_HEDGE_DEADLINE_SECONDS > 0:
+        done, _ = await asyncio.wait({llm_task}, timeout=LLM_HEDGE_DEADLINE_SECONDS)
+        if not done:
+            # Let the LLM finish in the background so the next identical request is a cache hit
+            background_tasks.add(llm_task)
+            llm_task.add_done_callback(background_tasks.discard)
+            llm_task.add_done_callback(lambda task: _remember_when_done(cache_key, requirements, scope, task))
+            return get_fallback_recommendations(requirements, available_tools, "hedged")
+    
+    result = await llm_task
+    await remember_recommendation(cache_key, requirements, scope, result)
+    return result
+
+async def warm_recommendation(requirements: str, platforms: List[str]) -> bool:
+    catalog_version = current_catalog_version()
+    all_tools = await stores.tools.find(platforms=platforms or None, limit=RECOMMENDATION_CANDIDATE_LIMIT)
+    if not all_tools:
+        return False
+    cache_key = recommendation_cache_key(requirements, platforms, catalog_version, LLM_MODEL)
+    # A persistent hit is pulled into the in-memory tier, which is all warming needs
+    if await recommendation_cache.get(cache_key, record=False) is not None:
+        return False
+    result = await get_ai_recommendations(requirements, all_tools)
+    if result.get("fallback"):
+        return False
+    await remember_recommendation(cache_key, requirements, SemanticCache.scope_id(platforms, catalog_version), result)
+    return True
+
+query_stats = QueryStats(stores.query_stats)
+recommendation_warmer = RecommendationWarmer(
+    query_stats,
+    warm_recommendation,
+    top_n=WARM_TOP_N,
+    interval=WARM_INTERVAL_SECONDS,
+    flush_interval=QUERY_STATS_FLUSH_SECONDS
+)
+
+async def compute_catalog_facets() -> Dict[str, Any]:
+    return (await stores.tools.facet_search(limit=0))["facets"]
+
+# Unfiltered facet counts only change with the catalog version
+facet_cache = FacetCache(compute_catalog_facets)
+
+async def get_catalog_facets() -> Dict[str, Any]:
+    return await facet_cache.get(current_catalog_version())
+
+# In-process copy of the catalog and its version; requests never ask Mongo for either
+catalog_cache = CatalogCache()
+
+def catalog_view():
+    """The catalog copy requests read from: the mapped snapshot in multi-worker mode, else the cache."""
+    if catalog_snapshots is not None and catalog_snapshots.snapshot is not None:
+        return catalog_snapshots.snapshot
+    return catalog_cache
+
+def current_catalog_version() -> int:
+    return catalog_view().version
+
+async def refresh_catalog_version():
+    # Once per catalog change (local write or invalidation event), not per request
+    catalog_cache.version = max(catalog_cache.version, await stores.tools.catalog_version())
+
+async def reload_catalog_cache():
+    # Version first: a write landing in between makes the copy newer than its version, never older
+    version = await stores.tools.catalog_version()
+    catalog_cache.load(version, await stores.tools.all())
+
+# Multi-worker mode: one elected worker writes a memory-mapped catalog snapshot that all
+# workers map read-only and poll for new versions (disabled when no path is configured)
+CATALOG_SNAPSHOT_PATH = os.environ.get('CATALOG_SNAPSHOT_PATH', '')
+CATALOG_SNAPSHOT_POLL_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_POLL_SECONDS', '2'))
+
+async def rebuild_catalog_indexes(tools, score_of=None) -> int:
+    """Rebuild the in-process search indexes off the event loop and swap them in.
+
+    ``tools`` (the catalog cache or the mapped snapshot) is streamed once per
+    index, so the catalog is never copied into a list first.
+    """
+    global suggest_index, fuzzy_index
+    new_suggest_index, new_fuzzy_index = SuggestIndex(), FuzzyIndex()
+    await asyncio.to_thread(new_suggest_index.build, tools, score_of)
+    await asyncio.to_thread(new_fuzzy_index.build, tools)
+    suggest_index, fuzzy_index = new_suggest_index, new_fuzzy_index
+    # Too slow for the readiness path on large catalogs; the refresher rebuilds it in the background
+    similar_tools.catalog_changed()
+    return len(new_suggest_index)
+
+async def on_snapshot_swap(snapshot):
+    # Picks up tools written by other workers, since each worker only updates its own indexes.
+    # Reviews do not bump the catalog version, so the snapshot's ratings may be older than the
+    # scores review events have already applied: those are kept.
+    await rebuild_catalog_indexes(snapshot, score_of=suggest_index.score)
+
+def with_live_rating(tool: Dict[str, Any]) -> Dict[str, Any]:
+    score = suggest_index.score(tool["id"])
+    if score is not None:
+        tool["rating"], tool["review_count"] = score
+    return tool
+
+async def catalog_source():
+    return catalog_view()
+
+catalog_snapshots = CatalogSnapshotManager(
+    CATALOG_SNAPSHOT_PATH,
+    fetch_version=lambda: stores.tools.catalog_version(),
+    fetch_tools=lambda: stores.tools.all(),
+    poll_interval=CATALOG_SNAPSHOT_POLL_SECONDS,
+    on_swap=on_snapshot_swap
+) if CATALOG_SNAPSHOT_PATH else None
+
+# "Similar tools" table: k nearest neighbours per tool, recomputed shortly after catalog changes
+SIMILAR_TOOLS_K = int(os.environ.get('SIMILAR_TOOLS_K', '10'))
+SIMILAR_TOOLS_DEBOUNCE_SECONDS = float(os.environ.get('SIMILAR_TOOLS_DEBOUNCE_SECONDS', '5'))
+similar_tools = SimilarToolsRefresher(catalog_source, k=SIMILAR_TOOLS_K,
+                                      debounce=SIMILAR_TOOLS_DEBOUNCE_SECONDS)
+
+# Tool view and click counters, buffered in memory and flushed as one bulk write per interval
+TOOL_COUNTERS_FLUSH_SECONDS = float(os.environ.get('TOOL_COUNTERS_FLUSH_SECONDS', '2'))
+TOOL_COUNTERS_MAX_PENDING = int(os.environ.get('TOOL_COUNTERS_MAX_PENDING', '10000'))
+TOOL_COUNTERS_FLUSH_EVENTS = int(os.environ.get('TOOL_COUNTERS_FLUSH_EVENTS', '1000'))
+def apply_flushed_counts(counts: Dict[str, Dict[str, int]]):
+    # Keeps the in-process listing in step with the store; snapshot reads stay as of the last snapshot
+    catalog_cache.add_counts(counts)
+
+tool_counters = ToolCounters(stores.tools, interval=TOOL_COUNTERS_FLUSH_SECONDS,
+                             max_pending=TOOL_COUNTERS_MAX_PENDING, flush_events=TOOL_COUNTERS_FLUSH_EVENTS,
+                             on_flush=apply_flushed_counts)
+
+# Trending tools: views, clicks, favorites and reviews with exponentially decaying weight
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_K = int(os.environ.get('TRENDING_K', '50'))
+trending_tools = TrendingTools(half_life=TRENDING_HALF_LIFE_HOURS * 3600, k=TRENDING_K)
+
+def record_trending(tool_ids: List[str], event: str):
+    # Only catalog tools: favorites accept arbitrary ids and must not grow the score table
+    for tool_id in tool_ids:
+        if tool_id in suggest_index:
+            trending_tools.record(tool_id, event)
+
+# Typeahead prefix index, built at startup and kept current by tool and review writes
+suggest_index = SuggestIndex()
+# Trigram index for typo-tolerant search, maintained the same way
+fuzzy_index = FuzzyIndex()
+
+async def find_fuzzy_matches(search: str, category: Optional[str], platform: Optional[str],
+                             exclude: set, limit: int) -> List[dict]:
+    ranked = [tool_id for tool_id, _ in fuzzy_index.search(search, limit + len(exclude)) if tool_id not in exclude]
+    if not ranked:
+        return []
+    found = {tool["id"]: tool for tool in await stores.tools.find_by_ids(ranked, limit=len(ranked))}
+    matches = []
+    for tool_id in ranked:
+        tool = found.get(tool_id)
+        if tool is None or (category and tool.get("category") != category):
+            continue
+        if platform and platform not in tool.get("platforms", []):
+            continue
+        matches.append(tool)
+    return matches[:limit]
+
+# Personalized recommendations: item-item co-occurrence over favorites and positive reviews,
+# rebuilt in the background when interactions changed
+PERSONALIZATION_REBUILD_SECONDS = float(os.environ.get('PERSONALIZATION_REBUILD_SECONDS', '300'))
+PERSONALIZATION_NEIGHBORS = int(os.environ.get('PERSONALIZATION_NEIGHBORS', '50'))
+PERSONALIZATION_MIN_RATING = int(os.environ.get('PERSONALIZATION_MIN_RATING', '4'))
+
+async def fetch_interactions() -> List[tuple]:
+    favorites, reviews = await asyncio.gather(
+        stores.users.favorite_pairs(), stores.reviews.rated_pairs(PERSONALIZATION_MIN_RATING)
+    )
+    return favorites + reviews
+
+item_similarity = ItemSimilarityRefresher(fetch_interactions, interval=PERSONALIZATION_REBUILD_SECONDS,
+                                          neighbors=PERSONALIZATION_NEIGHBORS)
+
+# Invalidation bus: writes on one worker publish versioned events so the other workers
+# refresh their in-process state (change stream when available, otherwise polling)
+INVALIDATION_POLL_SECONDS = float(os.environ.get('INVALIDATION_POLL_SECONDS', '1'))
+INVALIDATION_GAP_TIMEOUT_SECONDS = float(os.environ.get('INVALIDATION_GAP_TIMEOUT_SECONDS', '5'))
+INVALIDATION_RETENTION_SECONDS = int(os.environ.get('INVALIDATION_RETENTION_SECONDS', '3600'))
+INVALIDATION_CHANGE_STREAMS = os.environ.get('INVALIDATION_CHANGE_STREAMS', 'true').lower() == 'true'
+
+async def refresh_catalog_tool(tool_id: Optional[str], event: Dict[str, Any]):
+    recommendation_warmer.catalog_changed()
+    tool = await stores.tools.get(tool_id)
+    if tool is None:
+        # Trending counts are kept per worker, snapshots or not; free the slot of a remote delete
+        trending_tools.remove(tool_id)
+    if catalog_snapshots is not None:
+        # The snapshot swap rebuilds the indexes
+        catalog_snapshots.request_sync()
+        return
+    similar_tools.catalog_changed()
+    if tool is None:
+        catalog_cache.remove(tool_id)
+        suggest_index.remove(tool_id)
+        fuzzy_index.remove(tool_id)
+    else:
+        catalog_cache.put(tool)
+        suggest_index.add(tool)
+        fuzzy_index.add(tool)
+    await refresh_catalog_version()
+
+async def refresh_tool_rating(tool_id: Optional[str], event: Dict[str, Any]):
+    tool = await stores.tools.get(tool_id)
+    if tool is not None:
+        catalog_cache.update(tool_id, {"rating": tool.get("rating", 0.0), "review_count": tool.get("review_count", 0)})
+        suggest_index.update_score(tool_id, tool.get("rating", 0.0), tool.get("review_count", 0))
+
+async def reset_invalidated_state():
+    if catalog_snapshots is not None:
+        # Missed events may include reviews: ratings come from the store, everything else from the snapshot
+        catalog_snapshots.request_sync()
+        ratings = await stores.tools.ratings()
+        await rebuild_catalog_indexes(catalog_view(), score_of=ratings.get)
+        return
+    await reload_catalog_cache()
+    await rebuild_catalog_indexes(catalog_cache)
+
+def create_invalidation_bus() -> InvalidationBus:
+    log = MongoInvalidationLog(db, INVALIDATION_RETENTION_SECONDS) if db is not None else MemoryInvalidationLog()
+    bus = InvalidationBus(log, poll_interval=INVALIDATION_POLL_SECONDS,
+                          gap_timeout=INVALIDATION_GAP_TIMEOUT_SECONDS,
+                          use_change_streams=INVALIDATION_CHANGE_STREAMS)
+    bus.subscribe("catalog", refresh_catalog_tool)
+    bus.subscribe("reviews", refresh_tool_rating)
+    bus.subscribe("reviews", lambda key, event: item_similarity.interactions_changed())
+    bus.subscribe("reviews", lambda key, event: record_trending([key], "review"))
+    bus.subscribe("user", lambda key, event: item_similarity.interactions_changed())
+    bus.on_reset(reset_invalidated_state)
+    return bus
+
+invalidation_bus = create_invalidation_bus()
+
+async def publish_invalidation(topic: str, key: Optional[str] = None):
+    # The write already succeeded; other workers converge at the next reset instead
+    try:
+        await invalidation_bus.publish(topic, key)
+    except Exception:
+        metrics.inc("invalidation_publish_errors_total", topic=topic)
+        logger.exception("Failed to publish %s invalidation", topic)
 
 # Authentication routes
 @api_router.post("/register", response_model=Token)
 async def register_user(user: UserRegister):
-    existing_user = await db.users.find_one({"email": user.email})
+    existing_user = await stores.users.get_by_email(user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    # bcrypt takes hundreds of milliseconds by design; keep it off the event loop
+    hashed_password = await asyncio.to_thread(get_password_hash, user.password)
     user_obj = User(
         email=user.email,
         username=user.username,
@@ -290,7 +856,7 @@ async def register_user(user: UserRegister):
         preferences=user.preferences or {}
     )
     
-    await db.users.insert_one(user_obj.dict())
+    await stores.users.insert(user_obj.dict())
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -300,8 +866,8 @@ async def register_user(user: UserRegister):
 
 @api_router.post("/login", response_model=Token)
 async def login_user(user: UserLogin):
-    db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    db_user = await stores.users.get_by_email(user.email)
+    if not db_user or not await asyncio.to_thread(verify_password, user.password, db_user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -322,57 +888,158 @@ async def get_tools(
     search: Optional[str] = None,
     limit: int = 50
 ):
-    query = {}
-    if category:
-        query["category"] = category
-    if platform:
-        query["platforms"] = {"$in": [platform]}
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$in": [search.lower()]}}
-        ]
-    
-    tools = await db.ai_tools.find(query).limit(limit).to_list(limit)
+    if not (category or platform or search):
+        # The unfiltered listing (homepage, browse) is served from memory
+        return [AITool(**with_live_rating(tool)) for tool in catalog_view().head(max(limit, 0))]
+    tools = await stores.tools.find(
+        category=category,
+        platforms=[platform] if platform else None,
+        search=search,
+        limit=limit
+    )
+    if search and FUZZY_SEARCH_ENABLED and len(tools) < limit:
+        # Substring matches come first, then tools matching despite typos
+        exclude = {tool["id"] for tool in tools}
+        tools += await find_fuzzy_matches(search, category, platform, exclude, limit - len(tools))
     return [AITool(**tool) for tool in tools]
 
+@api_router.get("/tools/search", response_model=ToolSearchResult)
+async def search_tools(
+    category: Optional[str] = None,
+    platform: Optional[str] = None,
+    tag: Optional[str] = None,
+    price_tier: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = 50
+):
+    if price_tier and price_tier not in PRICE_TIERS:
+        raise HTTPException(status_code=400, detail=f"price_tier must be one of {', '.join(PRICE_TIERS)}")
+    if not (category or platform or tag or price_tier or search):
+        # Opening the filter panel: facets come from the per-version cache
+        facets = await get_catalog_facets()
+        tools = [with_live_rating(tool) for tool in catalog_view().head(limit)] if limit > 0 else []
+        total = sum(bucket["count"] for bucket in facets["price_tier"])
+        return ToolSearchResult(tools=[AITool(**tool) for tool in tools], total=total, facets=facets)
+    result = await stores.tools.facet_search(
+        category=category,
+        platforms=[platform] if platform else None,
+        search=search,
+        tag=tag,
+        price_tier=price_tier,
+        limit=max(limit, 0)
+    )
+    return ToolSearchResult(tools=[AITool(**tool) for tool in result["tools"]], total=result["total"],
+                            facets=result["facets"])
+
+@api_router.get("/tools/suggest")
+async def suggest_tools(q: str, limit: int = 8):
+    # Served entirely from the in-process prefix index, cheap enough for every keystroke
+    return {"query": q, "suggestions": suggest_index.suggest(q, max(limit, 0))}
+
+@api_router.get("/tools/trending", response_model=List[TrendingTool])
+async def get_trending_tools(limit: int = 10):
+    limit = min(max(limit, 0), TRENDING_K)
+    # Ranked entirely from the in-memory top-K set; one read fetches the tool documents
+    ranked = trending_tools.top(limit)
+    found = {tool["id"]: tool for tool in await stores.tools.find_by_ids([tool_id for tool_id, _ in ranked],
+                                                                          limit=len(ranked))} if ranked else {}
+    trending = [TrendingTool(**found[tool_id], trend_score=round(score, 3)) for tool_id, score in ranked
+                if tool_id in found]
+    if len(trending) < limit:
+        # Not enough recent activity yet: fill up with the best-rated tools
+        seen = {tool.id for tool in trending}
+        candidates = await stores.tools.find(limit=RECOMMENDATION_CANDIDATE_LIMIT)
+        candidates.sort(key=lambda tool: (tool.get("rating", 0.0), tool.get("review_count", 0)), reverse=True)
+        trending += [TrendingTool(**tool, trend_score=0.0) for tool in candidates if tool["id"] not in seen]
+    return trending[:limit]
+
 @api_router.post("/tools", response_model=AITool)
 async def create_tool(tool: AIToolCreate, current_user: User = Depends(get_current_user)):
     tool_obj = AITool(**tool.dict())
-    await db.ai_tools.insert_one(tool_obj.dict())
+    await stores.tools.insert(tool_obj.dict())
+    catalog_cache.put(tool_obj.dict())
+    await refresh_catalog_version()
+    suggest_index.add(tool_obj.dict())
+    fuzzy_index.add(tool_obj.dict())
+    similar_tools.catalog_changed()
+    recommendation_warmer.catalog_changed()
+    if catalog_snapshots is not None:
+        catalog_snapshots.request_sync()
+    await publish_invalidation("catalog", tool_obj.id)
     return tool_obj
 
 @api_router.delete("/tools/{tool_id}")
 async def delete_tool(tool_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.ai_tools.delete_one({"id": tool_id})
-    if result.deleted_count == 0:
+    deleted = await stores.tools.delete(tool_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Tool not found")
+    catalog_cache.remove(tool_id)
+    await refresh_catalog_version()
+    suggest_index.remove(tool_id)
+    fuzzy_index.remove(tool_id)
+    trending_tools.remove(tool_id)
+    similar_tools.catalog_changed()
+    recommendation_warmer.catalog_changed()
+    if catalog_snapshots is not None:
+        catalog_snapshots.request_sync()
+    await publish_invalidation("catalog", tool_id)
     return {"message": "Tool deleted successfully"}
 
 @api_router.get("/tools/{tool_id}", response_model=AITool)
 async def get_tool(tool_id: str):
-    tool = await db.ai_tools.find_one({"id": tool_id})
+    snapshot = catalog_snapshots.snapshot if catalog_snapshots is not None else None
+    # Multi-worker mode reads the mapped snapshot (views and clicks as of its last rebuild); tools
+    # newer than the snapshot fall through to the store
+    tool = snapshot.get(tool_id) if snapshot is not None else None
+    if tool is not None:
+        tool = with_live_rating(tool)
+    else:
+        tool = await stores.tools.get(tool_id)
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
+    tool_counters.record(tool_id, "views")
+    trending_tools.record(tool_id, "view")
     return AITool(**tool)
 
-# Smart recommendation endpoint
-@api_router.post("/recommendations", response_model=ToolRecommendation)
-async def get_recommendations(request: ToolRecommendationRequest, current_user: User = Depends(get_current_user)):
+@api_router.post("/tools/{tool_id}/click", status_code=204)
+async def record_tool_click(tool_id: str):
+    # The suggest index holds every catalog tool, so known ids cost no database read
+    if tool_id not in suggest_index and not await stores.tools.get(tool_id):
+        raise HTTPException(status_code=404, detail="Tool not found")
+    tool_counters.record(tool_id, "clicks")
+    trending_tools.record(tool_id, "click")
+
+@api_router.get("/tools/{tool_id}/similar", response_model=List[SimilarTool])
+async def get_similar_tools(tool_id: str, limit: int = 10):
+    ranked = similar_tools.table.similar(tool_id, min(max(limit, 0), SIMILAR_TOOLS_K))
+    if ranked is None:
+        # Created after the last build (the next one picks it up) or unknown
+        if not await stores.tools.get(tool_id):
+            raise HTTPException(status_code=404, detail="Tool not found")
+        similar_tools.catalog_changed()
+        return []
+    found = {tool["id"]: tool for tool in await stores.tools.find_by_ids([tool_id for tool_id, _ in ranked],
+                                                                          limit=len(ranked))}
+    return [SimilarTool(**found[tool_id], similarity=round(score, 4)) for tool_id, score in ranked if tool_id in found]
+
+async def build_recommendations(request: ToolRecommendationRequest) -> ToolRecommendation:
     # Get all available tools
-    query = {}
-    if request.preferred_platforms:
-        query["platforms"] = {"$in": request.preferred_platforms}
-    
-    all_tools = await db.ai_tools.find(query).to_list(100)
+    catalog_version = current_catalog_version()
+    all_tools = await stores.tools.find(platforms=request.preferred_platforms or None,
+                                        limit=RECOMMENDATION_CANDIDATE_LIMIT)
     
     if not all_tools:
         raise HTTPException(status_code=404, detail="No tools found matching criteria")
     
-    # Get AI-powered recommendations
-    ai_result = await get_ai_recommendations(request.requirements, all_tools)
+    query_stats.record(request.requirements, request.preferred_platforms)
     
+    # Get AI-powered recommendations
+    ai_result = await get_cached_ai_recommendations(
+        request.requirements, request.preferred_platforms, all_tools, catalog_version
+    )
+    return recommendation_from_result(ai_result, all_tools)
+
+def recommendation_from_result(ai_result: Dict[str, Any], all_tools: List[dict]) -> ToolRecommendation:
     # Filter and sort tools based on AI recommendations
     recommended_tool_names = ai_result.get("recommended_tools", [])
     tools_dict = {tool["name"]: AITool(**tool) for tool in all_tools}
@@ -395,19 +1062,160 @@ async def get_recommendations(request: ToolRecommendationRequest, current_user:
         match_scores=ai_result.get("match_scores", {})
     )
 
+async def build_batch_recommendations(items: List[ToolRecommendationRequest]) -> List[ToolRecommendation]:
+    """Answer many requests with one candidate fetch per platform filter and as few LLM calls as fit."""
+    metrics.observe("recommendation_batch_items", len(items), buckets=(1, 2, 5, 10, 25, 50))
+    groups: Dict[frozenset, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(frozenset(item.preferred_platforms), []).append(index)
+    platform_sets = list(groups)
+    catalog_version = current_catalog_version()
+    fetched = await asyncio.gather(
+        *(stores.tools.find(platforms=sorted(platform_set) or None, limit=RECOMMENDATION_CANDIDATE_LIMIT)
+          for platform_set in platform_sets)
+    )
+    candidates = dict(zip(platform_sets, fetched))
+
+    # Identical requests (after normalization) share one answer
+    item_keys: List[str] = []
+    lookups: Dict[str, tuple] = {}
+    for item in items:
+        cache_key = recommendation_cache_key(item.requirements, item.preferred_platforms, catalog_version, LLM_MODEL)
+        item_keys.append(cache_key)
+        platform_set = frozenset(item.preferred_platforms)
+        if not candidates[platform_set] or cache_key in lookups:
+            continue
+        query_stats.record(item.requirements, item.preferred_platforms)
+        scope = SemanticCache.scope_id(item.preferred_platforms, catalog_version)
+        lookups[cache_key] = (platform_set, item.requirements, scope)
+
+    # All cache lookups run concurrently; only the misses go on to the LLM
+    cached_answers = await asyncio.gather(
+        *(lookup_cached_recommendation(cache_key, requirements, scope)
+          for cache_key, (_, requirements, scope) in lookups.items())
+    )
+    answers: Dict[str, Dict[str, Any]] = {}
+    misses: Dict[frozenset, Dict[str, tuple]] = {}
+    for (cache_key, (platform_set, requirements, scope)), cached in zip(lookups.items(), cached_answers):
+        if cached is not None:
+            answers[cache_key] = cached
+        else:
+            misses.setdefault(platform_set, {})[cache_key] = (cache_key, requirements, scope)
+
+    async def answer_individually(cache_key: str, requirements: str, scope: int, tools: List[dict]):
+        result = await get_ai_recommendations(requirements, tools)
+        await remember_recommendation(cache_key, requirements, scope, result)
+        answers[cache_key] = result
+
+    async def answer_packed(pending: List[tuple], tools_table: str, tools: List[dict]):
+        results = await get_packed_recommendations([requirements for _, requirements, _ in pending], tools_table)
+        retry = []
+        for (cache_key, requirements, scope), result in zip(pending, results):
+            if result is None:
+                retry.append((cache_key, requirements, scope))
+                continue
+            await remember_recommendation(cache_key, requirements, scope, result)
+            answers[cache_key] = result
+        if retry:
+            metrics.inc("llm_batch_unpacked_total", len(retry))
+            await asyncio.gather(*(answer_individually(*entry, tools) for entry in retry))
+
+    calls = []
+    for platform_set, pending_by_key in misses.items():
+        pending = list(pending_by_key.values())
+        tools = candidates[platform_set]
+        # Packing needs the whole candidate list in one table; sharded catalogs go one by one
+        shards = shard_by_budget(tools, LLM_PROMPT_TOKEN_BUDGET, LLM_MAX_SHARDS) if LLM_SHARDED_RANKING else []
+        if len(pending) > 1 and LLM_BATCH_MAX_REQUIREMENTS > 1 and len(shards) <= 1:
+            tools_table, _, table_tokens = encode_tools_table(tools, LLM_PROMPT_TOKEN_BUDGET)
+            packs = pack_requirements([requirements for _, requirements, _ in pending], table_tokens,
+                                      LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_COMPLETION_TOKENS, LLM_BATCH_MAX_REQUIREMENTS)
+            for pack in packs:
+                chosen = [pending[i] for i in pack]
+                if len(chosen) > 1:
+                    calls.append(answer_packed(chosen, tools_table, tools))
+                else:
+                    calls.append(answer_individually(*chosen[0], tools))
+        else:
+            calls.extend(answer_individually(*entry, tools) for entry in pending)
+    await asyncio.gather(*calls)
+
+    results = []
+    for item, cache_key in zip(items, item_keys):
+        tools = candidates[frozenset(item.preferred_platforms)]
+        if not tools:
+            results.append(ToolRecommendation(tools=[], reasoning="No tools found matching criteria", match_scores={}))
+        else:
+            results.append(recommendation_from_result(answers[cache_key], tools))
+    return results
+
+# Smart recommendation endpoint
+@api_router.post("/recommendations", response_model=ToolRecommendation)
+async def get_recommendations(request: ToolRecommendationRequest, current_user: User = Depends(get_current_user)):
+    return await build_recommendations(request)
+
+@api_router.get("/recommendations/for-me", response_model=ToolRecommendation)
+async def get_personal_recommendations(limit: int = 10, current_user: User = Depends(get_current_user)):
+    limit = min(max(limit, 1), 50)
+    favorites = current_user.preferences.get("favorites", [])
+    model = item_similarity.model
+    ranked = model.recommend(current_user.id, favorites, limit) if model is not None else []
+    if ranked:
+        found = {tool["id"]: tool for tool in await stores.tools.find_by_ids([tool_id for tool_id, _ in ranked],
+                                                                              limit=len(ranked))}
+        ranked = [(found[tool_id], score) for tool_id, score in ranked if tool_id in found]
+        return ToolRecommendation(
+            tools=[AITool(**tool) for tool, _ in ranked],
+            reasoning="Tools often favorited or rated highly by people who liked the same tools as you",
+            match_scores={tool["name"]: round(score * 100, 1) for tool, score in ranked}
+        )
+    # Cold start: nothing to go on yet, so the best-rated tools the user has not favorited
+    candidates = await stores.tools.find(limit=RECOMMENDATION_CANDIDATE_LIMIT)
+    candidates = [tool for tool in candidates if tool["id"] not in favorites]
+    candidates.sort(key=lambda tool: (tool.get("rating", 0.0), tool.get("review_count", 0)), reverse=True)
+    return ToolRecommendation(
+        tools=[AITool(**tool) for tool in candidates[:limit]],
+        reasoning="Top-rated tools; favorite or review tools to get personalized picks",
+        match_scores={}
+    )
+
+@api_router.post("/recommendations/batch", response_model=List[ToolRecommendation])
+async def get_batch_recommendations(request: RecommendationBatchRequest, current_user: User = Depends(get_current_user)):
+    return await build_batch_recommendations(request.items)
+
+# Asynchronous recommendation jobs: the client polls for the result instead of holding the connection
+RECOMMENDATION_JOB_WORKERS = int(os.environ.get('RECOMMENDATION_JOB_WORKERS', '4'))
+RECOMMENDATION_JOB_QUEUE_SIZE = int(os.environ.get('RECOMMENDATION_JOB_QUEUE_SIZE', '100'))
+RECOMMENDATION_JOB_TTL_SECONDS = int(os.environ.get('RECOMMENDATION_JOB_TTL_SECONDS', '3600'))
+
+async def run_recommendation_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return (await build_recommendations(ToolRecommendationRequest(**job["request"]))).dict()
+
+def create_job_queue() -> JobQueue:
+    return JobQueue(stores.jobs, run_recommendation_job, workers=RECOMMENDATION_JOB_WORKERS,
+                    max_queued=RECOMMENDATION_JOB_QUEUE_SIZE, ttl_seconds=RECOMMENDATION_JOB_TTL_SECONDS)
+
+recommendation_jobs = create_job_queue()
+
+@api_router.post("/recommendations/jobs", response_model=RecommendationJob, status_code=202)
+async def create_recommendation_job(request: ToolRecommendationRequest,
+                                    current_user: User = Depends(get_current_user)):
+    try:
+        return await recommendation_jobs.submit(current_user.id, request.dict())
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Recommendation queue is full, try again shortly",
+                            headers={"Retry-After": "5"})
+
+@api_router.get("/recommendations/jobs/{job_id}", response_model=RecommendationJob)
+async def get_recommendation_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await recommendation_jobs.get(job_id, owner_id=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # Reviews routes
 @api_router.post("/reviews", response_model=UserReview)
 async def create_review(review: ReviewCreate, current_user: User = Depends(get_current_user)):
-    # Check if tool exists
-    tool = await db.ai_tools.find_one({"id": review.tool_id})
-    if not tool:
-        raise HTTPException(status_code=404, detail="Tool not found")
-    
-    # Check if user already reviewed this tool
-    existing_review = await db.reviews.find_one({"user_id": current_user.id, "tool_id": review.tool_id})
-    if existing_review:
-        raise HTTPException(status_code=400, detail="You have already reviewed this tool")
-    
     review_obj = UserReview(
         user_id=current_user.id,
         tool_id=review.tool_id,
@@ -415,62 +1223,150 @@ async def create_review(review: ReviewCreate, current_user: User = Depends(get_c
         comment=review.comment
     )
     
-    await db.reviews.insert_one(review_obj.dict())
-    
-    # Update tool rating
-    all_reviews = await db.reviews.find({"tool_id": review.tool_id}).to_list(1000)
-    avg_rating = sum(r["rating"] for r in all_reviews) / len(all_reviews)
-    await db.ai_tools.update_one(
-        {"id": review.tool_id},
-        {"$set": {"rating": round(avg_rating, 1), "review_count": len(all_reviews)}}
-    )
+    # Two round trips on the request path regardless of review volume: the unique (user_id, tool_id)
+    # index rejects duplicates on insert, and the rating is folded in with one atomic update. The
+    # summary (unless it must commit with the transaction) and the invalidation publish follow in
+    # the background.
+    try:
+        async with stores.transaction(REVIEW_WRITE_TRANSACTIONS) as session:
+            await stores.reviews.insert(review_obj.dict(), session=session)
+            try:
+                updated = await stores.tools.apply_review(review.tool_id, review.rating, session=session)
+            except Exception:
+                if session is None:
+                    # No transaction to roll back: drop the review whose rating was never applied
+                    await stores.reviews.delete(review_obj.id)
+                raise
+            if updated is None:
+                if session is None:
+                    await stores.reviews.delete(review_obj.id)
+                raise HTTPException(status_code=404, detail="Tool not found")
+            if session is not None:
+                await stores.reviews.add_to_summary(review_obj.dict(), session=session)
+    except DuplicateReviewError:
+        raise HTTPException(status_code=400, detail="You have already reviewed this tool")
+    catalog_cache.update(review.tool_id, updated)
+    suggest_index.update_score(review.tool_id, updated["rating"], updated["review_count"])
+    item_similarity.interactions_changed()
+    trending_tools.record(review.tool_id, "review")
+    followup = asyncio.ensure_future(finish_review_write(review_obj.dict(), summarize=session is None))
+    review_followups.add(followup)
+    followup.add_done_callback(review_followups.discard)
     
     return review_obj
 
+async def finish_review_write(review: Dict[str, Any], summarize: bool):
+    if summarize:
+        try:
+            await stores.reviews.add_to_summary(review)
+        except Exception:
+            # Review and rating already agree; the summary is derived data and only drifts by one
+            metrics.inc("review_summary_errors_total")
+            logger.exception("Failed to update the review summary of %s", review["tool_id"])
+    await publish_invalidation("reviews", review["tool_id"])
+
+async def drain_review_followups():
+    """Wait for the summary updates and publishes of reviews that were already acknowledged."""
+    while review_followups:
+        await asyncio.gather(*list(review_followups), return_exceptions=True)
+
 @api_router.get("/tools/{tool_id}/reviews")
 async def get_tool_reviews(tool_id: str):
-    reviews = await db.reviews.find({"tool_id": tool_id}).to_list(100)
+    reviews = await stores.reviews.find_by_tool(tool_id, 100)
     return reviews
 
+@api_router.get("/tools/{tool_id}/reviews/summary", response_model=ReviewSummary)
+async def get_tool_review_summary(tool_id: str):
+    # Served from the summary document maintained on every review write
+    summary = await stores.reviews.summary(tool_id)
+    if summary is not None:
+        return summary
+    if not await stores.tools.get(tool_id):
+        raise HTTPException(status_code=404, detail="Tool not found")
+    return ReviewSummary(tool_id=tool_id)
+
 # Categories endpoint
 @api_router.get("/categories")
 async def get_categories():
-    categories = await db.ai_tools.distinct("category")
-    return {"categories": categories}
+    facets = await get_catalog_facets()
+    return {"categories": sorted(bucket["value"] for bucket in facets["category"])}
 
 # User favorites
 @api_router.post("/favorites/{tool_id}")
 async def add_to_favorites(tool_id: str, current_user: User = Depends(get_current_user)):
-    await db.users.update_one(
-        {"id": current_user.id},
-        {"$addToSet": {"preferences.favorites": tool_id}}
-    )
+    await stores.users.add_favorite(current_user.id, tool_id)
+    if tool_id not in current_user.preferences.get("favorites", []):
+        record_trending([tool_id], "favorite")
+    item_similarity.interactions_changed()
+    await publish_invalidation("user", current_user.id)
     return {"message": "Added to favorites"}
 
 @api_router.delete("/favorites/{tool_id}")
 async def remove_from_favorites(tool_id: str, current_user: User = Depends(get_current_user)):
-    await db.users.update_one(
-        {"id": current_user.id},
-        {"$pull": {"preferences.favorites": tool_id}}
-    )
+    await stores.users.remove_favorite(current_user.id, tool_id)
+    item_similarity.interactions_changed()
+    await publish_invalidation("user", current_user.id)
     return {"message": "Removed from favorites"}
 
+@api_router.put("/favorites")
+async def sync_favorites(update: FavoritesUpdate, current_user: User = Depends(get_current_user)):
+    if update.favorites is not None and (update.add or update.remove):
+        raise HTTPException(status_code=400, detail="Send either favorites or add/remove, not both")
+    result = await stores.users.update_favorites(current_user.id, update.favorites, update.add, update.remove,
+                                                 update.version)
+    if result is None:
+        user = await stores.users.get_by_id(current_user.id)
+        preferences = user.get("preferences", {})
+        raise HTTPException(status_code=409, detail={
+            "message": "Favorites were changed elsewhere",
+            "favorites": preferences.get("favorites", []),
+            "version": preferences.get("favorites_version", 0),
+        })
+    previous = set(current_user.preferences.get("favorites", []))
+    record_trending([tool_id for tool_id in result["favorites"] if tool_id not in previous], "favorite")
+    item_similarity.interactions_changed()
+    await publish_invalidation("user", current_user.id)
+    return result
+
 @api_router.get("/favorites")
 async def get_user_favorites(current_user: User = Depends(get_current_user)):
-    user = await db.users.find_one({"id": current_user.id})
-    favorite_ids = user.get("preferences", {}).get("favorites", [])
+    user = await stores.users.get_by_id(current_user.id)
+    preferences = user.get("preferences", {})
+    favorite_ids = preferences.get("favorites", [])
+    version = preferences.get("favorites_version", 0)
     
     if not favorite_ids:
-        return {"tools": []}
+        return {"tools": [], "version": version}
     
-    favorite_tools = await db.ai_tools.find({"id": {"$in": favorite_ids}}).to_list(100)
-    return {"tools": [AITool(**tool) for tool in favorite_tools]}
+    found = {tool["id"]: tool for tool in await stores.tools.find_by_ids(favorite_ids, 100)}
+    # In the order the user favorited them
+    return {"tools": [AITool(**found[tool_id]) for tool_id in favorite_ids if tool_id in found], "version": version}
 
 # Health check endpoint
 @api_router.get("/")
 async def root():
     return {"message": "AI Tools Consulting API is running!", "status": "healthy"}
 
+# Admin endpoints
+@api_router.get("/admin/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    return metrics.snapshot()
+
+@api_router.get("/admin/llm-cache", dependencies=[Depends(require_admin)])
+async def get_llm_cache_stats():
+    return recommendation_cache.stats()
+
+@api_router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    return {"enabled": PROFILING_ENABLED, "profiles": await asyncio.to_thread(list_profiles, PROFILE_DIR)}
+
+@api_router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    profile = await asyncio.to_thread(load_profile, PROFILE_DIR, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -482,18 +1378,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=PROFILE_DIR,
+        admin_token=ADMIN_TOKEN,
+        sample_rate=PROFILE_SAMPLE_RATE,
+    )
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
 
-# Initialize data on startup
+# Health probes: /healthz only says the process is serving, /readyz says it should get traffic
+READINESS_PING_TTL_SECONDS = float(os.environ.get('READINESS_PING_TTL_SECONDS', '5'))
+READINESS_PING_TIMEOUT_SECONDS = float(os.environ.get('READINESS_PING_TIMEOUT_SECONDS', '2'))
+mongo_ping = CachedPing(
+    "mongo",
+    lambda: client.admin.command("ping"),
+    ttl=READINESS_PING_TTL_SECONDS,
+    timeout=READINESS_PING_TIMEOUT_SECONDS
+) if client is not None else None
+startup_state: Dict[str, Any] = {
+    "import_seconds": None,
+    "startup_seconds": None,
+    "catalog_loaded": False,
+    "catalog_tools": 0,
+    "catalog_error": None,
+}
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    checks: Dict[str, Any] = {"catalog": {
+        "ok": startup_state["catalog_loaded"],
+        "tools": startup_state["catalog_tools"],
+        "error": startup_state["catalog_error"],
+    }}
+    if catalog_snapshots is not None:
+        snapshot = catalog_snapshots.snapshot
+        checks["catalog"]["snapshot_version"] = snapshot.version if snapshot is not None else None
+    if mongo_ping is not None:
+        checks["mongo"] = await mongo_ping.check()
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else "not_ready",
+        "checks": checks,
+        "import_seconds": startup_state["import_seconds"],
+        "startup_seconds": startup_state["startup_seconds"],
+    })
+
+async def load_catalog():
+    """Create indexes, seed sample data and build the in-process catalog indexes.
+
+    Runs in the background so the worker answers /healthz immediately; /readyz
+    stays 503 until this finishes. Failures (e.g. Mongo not reachable yet) are
+    retried with backoff.
+    """
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            await stores.setup()
+            await recommendation_cache.setup()
+            await invalidation_bus.setup()
+            await init_sample_data()
+            # Follow the log from before the catalog is read, so no write falls in between
+            await invalidation_bus.start()
+            if catalog_snapshots is not None:
+                # The swap callback builds the indexes from the mapped snapshot
+                snapshot = await catalog_snapshots.load()
+                catalog_tools = len(snapshot)
+            else:
+                await reload_catalog_cache()
+                catalog_tools = await rebuild_catalog_indexes(catalog_cache)
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            attempt += 1
+            startup_state["catalog_error"] = f"{type(e).__name__}: {e}"
+            metrics.inc("startup_catalog_load_failures_total")
+            logger.warning("Catalog load failed (attempt %d): %s", attempt, e)
+            await asyncio.sleep(min(2 ** attempt, 30))
+    startup_state.update(catalog_loaded=True, catalog_tools=catalog_tools, catalog_error=None,
+                         startup_seconds=round(time.perf_counter() - started, 3))
+    metrics.set_gauge("startup_catalog_load_seconds", startup_state["startup_seconds"])
+    background_tasks.add(asyncio.create_task(recommendation_warmer.run()))
+    if catalog_snapshots is not None:
+        background_tasks.add(asyncio.create_task(catalog_snapshots.run()))
+    background_tasks.add(asyncio.create_task(invalidation_bus.run()))
+    background_tasks.update(recommendation_jobs.start())
+    background_tasks.add(asyncio.create_task(item_similarity.run()))
+    background_tasks.add(asyncio.create_task(similar_tools.run()))
+    background_tasks.add(asyncio.create_task(tool_counters.run()))
+
 @app.on_event("startup")
 async def startup_event():
-    await init_sample_data()
+    if loop_watchdog is not None:
+        await loop_watchdog.start()
+    task = asyncio.create_task(load_catalog())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    for task in list(background_tasks):
+        task.cancel()
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+    await drain_review_followups()
+    try:
+        await query_stats.flush()
+    except Exception:
+        logger.exception("Failed to flush query stats")
+    try:
+        await tool_counters.flush()
+    except Exception:
+        logger.exception("Failed to flush tool counters")
+    if client is not None:
+        client.close()
+
+startup_state["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 3)
+metrics.set_gauge("startup_import_seconds", startup_state["import_seconds"])
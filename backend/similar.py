@@ -0,0 +1,212 @@
+"""Precomputed "similar tools" table.
+
+Each tool becomes a sparse TF-IDF vector over its category, tags, platforms
+and feature keywords (field-prefixed, so a "video" tag and a "video" feature
+are different terms). Terms carried by a single tool cannot make two tools
+similar and terms carried by most of the catalog do not discriminate, so both
+are dropped before the rows are L2-normalized.
+
+Cosine similarities come from an inverted index rather than a dense product:
+the candidates of a tool are the tools sharing one of its terms whose posting
+list has at most ``max_postings`` entries, and each candidate pair is then
+scored exactly, common terms included. Pairs that share only common terms
+(say, nothing but a large category) are never scored. Rows are processed in
+chunks of about ``chunk_pairs`` candidate pairs and only the ``k`` best
+neighbours of each tool are kept, so memory follows the size of the output
+rather than the square of the catalog, and a lookup is one dict access plus
+a slice.
+
+The table is built by a background job (``SimilarToolsRefresher.run``); until
+the first build finishes the table is empty and the endpoint answers with no
+alternatives.
+"""
+import asyncio
+import logging
+import time
+from array import array
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import metrics
+from ranking import keyword_stems
+from storage import Document
+
+logger = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = {"category": 2.0, "tag": 1.5, "feature": 1.0, "platform": 0.5}
+
+
+def tool_vector_terms(tool: Document) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+
+    def add(field: str, value: str):
+        terms[f"{field}:{value}"] = FIELD_WEIGHTS[field]
+
+    if tool.get("category"):
+        add("category", tool["category"].lower())
+    for tag in tool.get("tags", []):
+        for word in keyword_stems(tag):
+            add("tag", word)
+    for platform in tool.get("platforms", []):
+        add("platform", platform.lower())
+    for feature in tool.get("features", []):
+        for word in keyword_stems(feature):
+            add("feature", word)
+    return terms
+
+
+class SimilarTools:
+    def __init__(self, k: int = 10, max_df: float = 0.5, max_postings: int = 256, chunk_pairs: int = 2_000_000):
+        self.k = k
+        self.max_df = max_df
+        self.max_postings = max_postings
+        self.chunk_pairs = chunk_pairs
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._neighbors = np.zeros((0, 0), dtype=np.int32)
+        self._scores = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _vectors(self, tools: Iterable[Document]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Tool ids and the L2-normalized rows as sorted ``(row, term, value)`` triples."""
+        ids: List[str] = []
+        vocabulary: Dict[str, int] = {}
+        rows, cols, weights = array("q"), array("q"), array("d")
+        # Streamed: only ids and terms are kept, never the documents
+        for tool in tools:
+            for term, weight in tool_vector_terms(tool).items():
+                rows.append(len(ids))
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                weights.append(weight)
+            ids.append(tool["id"])
+        rows, cols = np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)
+        weights = np.frombuffer(weights, dtype=np.float64)
+        count = len(ids)
+        df = np.bincount(cols, minlength=len(vocabulary))
+        keep = (df[cols] >= 2) & (df[cols] <= max(2, self.max_df * count))
+        rows, cols = rows[keep], cols[keep]
+        values = weights[keep] * (np.log(count / np.maximum(df[cols], 1)) + 1)
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=count))
+        values = values / np.where(norms > 0, norms, 1)[rows]
+        order = np.lexsort((cols, rows))
+        return ids, rows[order], cols[order], values[order]
+
+    def build(self, tools: Iterable[Document]):
+        ids, rows, cols, values = self._vectors(tools)
+        count = len(ids)
+        k = min(self.k, max(count - 1, 0))
+        neighbors = np.zeros((count, k), dtype=np.int32)
+        scores = np.zeros((count, k), dtype=np.float32)
+        if k and len(rows):
+            row_indptr = np.searchsorted(rows, np.arange(count + 1))
+            # Inverted index: postings of each term, sorted by tool
+            by_term = np.lexsort((rows, cols))
+            term_rows, term_values = rows[by_term], values[by_term]
+            term_count = int(cols.max()) + 1
+            term_indptr = np.searchsorted(cols[by_term], np.arange(term_count + 1))
+            postings = np.diff(term_indptr)
+            # Every (row, term) entry as one sorted key, for exact lookups of the remaining terms
+            entry_keys = rows * term_count + cols
+            # Work per row (candidates generated times the terms looked up for each), so chunks stay bounded
+            generated = np.where(postings[cols] <= self.max_postings, postings[cols], 0)
+            work = np.bincount(rows, weights=generated, minlength=count) * np.diff(row_indptr)
+            pair_totals = np.cumsum(work)
+            first = 0
+            while first < count:
+                budget = (pair_totals[first - 1] if first else 0) + self.chunk_pairs
+                last = max(int(np.searchsorted(pair_totals, budget, side="right")), first + 1)
+                self._score_rows(first, min(last, count), row_indptr, cols, values, term_indptr, term_rows,
+                                 term_values, postings, entry_keys, term_count, neighbors, scores)
+                first = last
+        # Swapped together so a concurrent lookup never mixes two builds
+        self._ids, self._rows, self._neighbors, self._scores = ids, {tool_id: i for i, tool_id in enumerate(ids)}, \
+            neighbors, scores
+
+    def _score_rows(self, first, last, row_indptr, cols, values, term_indptr, term_rows, term_values, postings,
+                    entry_keys, term_count, neighbors, scores):
+        count, k = len(row_indptr) - 1, neighbors.shape[1]
+        start, end = row_indptr[first], row_indptr[last]
+        entry_rows = np.repeat(np.arange(first, last), np.diff(row_indptr[first:last + 1]))
+        entry_terms = cols[start:end]
+        # Candidates: tools sharing one of the row's rare terms
+        rare = postings[entry_terms] <= self.max_postings
+        left_rows, left_terms = entry_rows[rare], entry_terms[rare]
+        repeat = postings[left_terms]
+        left = np.repeat(left_rows, repeat)
+        position = np.arange(len(left)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        right = term_rows[np.repeat(term_indptr[left_terms], repeat) + position]
+        distinct = left != right
+        pairs = np.unique(left[distinct] * count + right[distinct])
+        if not len(pairs):
+            return
+        left, right = pairs // count, pairs % count
+        # Exact cosine of each candidate pair: walk the left row's terms and look them up in the right row
+        repeat = np.diff(row_indptr)[left]
+        pair_index = np.repeat(np.arange(len(pairs)), repeat)
+        position = np.arange(len(pair_index)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        entry = np.repeat(row_indptr[left], repeat) + position
+        wanted = right[pair_index] * term_count + cols[entry]
+        found = np.minimum(np.searchsorted(entry_keys, wanted), len(entry_keys) - 1)
+        shared = entry_keys[found] == wanted
+        similarity = np.bincount(pair_index[shared], weights=values[entry[shared]] * values[found[shared]],
+                                 minlength=len(pairs))
+        # Top ``k`` per row: sort by row, then similarity descending
+        order = np.lexsort((-similarity, left))
+        left, right, similarity = left[order], right[order], similarity[order]
+        row_starts = np.searchsorted(left, np.arange(first, last))
+        rank = np.arange(len(left)) - row_starts[left - first]
+        top = rank < k
+        neighbors[left[top], rank[top]] = right[top]
+        scores[left[top], rank[top]] = similarity[top]
+
+    def similar(self, tool_id: str, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """``(tool_id, cosine)`` pairs, best first; None when the tool is not in the table."""
+        ids, rows, neighbors, scores = self._ids, self._rows, self._neighbors, self._scores
+        row = rows.get(tool_id)
+        if row is None:
+            return None
+        return [(ids[j], float(s)) for j, s in zip(neighbors[row, :limit], scores[row, :limit]) if s > 0]
+
+
+class SimilarToolsRefresher:
+    """Builds the table off the event loop on start, then ``debounce`` seconds after the catalog changed.
+
+    The previous table keeps serving while a build runs.
+    """
+
+    def __init__(self, fetch_tools: Callable[[], Awaitable[List[Document]]], k: int = 10, debounce: float = 5.0):
+        self.fetch_tools = fetch_tools
+        self.debounce = debounce
+        self.table = SimilarTools(k=k)
+        self._dirty = True
+
+    def catalog_changed(self, *_):
+        self._dirty = True
+
+    async def rebuild(self, tools: Optional[List[Document]] = None):
+        started = time.perf_counter()
+        if tools is None:
+            tools = await self.fetch_tools()
+        table = SimilarTools(k=self.table.k)
+        await asyncio.to_thread(table.build, tools)
+        self.table = table
+        metrics.observe("similar_tools_build_ms", (time.perf_counter() - started) * 1000,
+                        buckets=(10, 50, 100, 500, 1000, 5000, 30000))
+        metrics.set_gauge("similar_tools_rows", len(table))
+
+    async def run(self):
+        while True:
+            if self._dirty:
+                # Cleared first, so catalog changes during the build trigger the next one
+                self._dirty = False
+                try:
+                    await self.rebuild()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._dirty = True
+                    logger.warning("Similar tools rebuild failed: %s", e)
+            await asyncio.sleep(self.debounce)
@@ -0,0 +1,891 @@
+"""Storage layer for tools, users, reviews, query statistics and background jobs.
+
+Handlers talk to ``ToolStore``, ``UserStore``, ``ReviewStore``,
+``QueryStatStore`` and ``JobStore`` instead of raw collections. ``create_stores`` returns either the Motor-backed
+implementation or an in-memory one (``STORAGE=memory``) that keeps documents
+in dicts with secondary indexes, which is what the tests and the benchmark
+script run against.
+"""
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from facets import FACET_FIELDS, count_facets, price_tier as tool_price_tier, price_tier_expression, sorted_counts
+
+Document = Dict[str, Any]
+
+
+class DuplicateReviewError(Exception):
+    """Raised when a user reviews the same tool twice."""
+
+
+class ToolStore(ABC):
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+    @abstractmethod
+    async def insert(self, tool: Document): ...
+
+    @abstractmethod
+    async def insert_many(self, tools: List[Document]): ...
+
+    @abstractmethod
+    async def get(self, tool_id: str) -> Optional[Document]: ...
+
+    @abstractmethod
+    async def find(self, category: Optional[str] = None, platforms: Optional[List[str]] = None,
+                   search: Optional[str] = None, limit: int = 50) -> List[Document]: ...
+
+    @abstractmethod
+    async def find_by_ids(self, tool_ids: List[str], limit: int = 100) -> List[Document]: ...
+
+    @abstractmethod
+    async def all(self) -> List[Document]:
+        """Every tool in the catalog, for building in-process indexes."""
+
+    @abstractmethod
+    async def facet_search(self, category: Optional[str] = None, platforms: Optional[List[str]] = None,
+                           search: Optional[str] = None, tag: Optional[str] = None,
+                           price_tier: Optional[str] = None, limit: int = 50) -> Document:
+        """Return ``{"tools", "total", "facets"}`` for the filtered catalog in one pass."""
+
+    @abstractmethod
+    async def delete(self, tool_id: str) -> bool: ...
+
+    @abstractmethod
+    async def apply_review(self, tool_id: str, rating: int, session=None) -> Optional[Document]:
+        """Atomically fold one new review into the tool's rating.
+
+        Returns the updated ``rating`` and ``review_count``, or None if the tool does not exist.
+        """
+
+    @abstractmethod
+    async def catalog_version(self) -> int:
+        """Counter bumped whenever tools are added or removed."""
+
+    @abstractmethod
+    async def ratings(self) -> Dict[str, Tuple[float, int]]:
+        """``(rating, review_count)`` of every tool, without the rest of the documents."""
+
+    @abstractmethod
+    async def increment_counters(self, counts: Dict[str, Dict[str, int]]) -> List[str]:
+        """Add ``{tool_id: {field: count}}`` to the tools' counters in one batch.
+
+        Returns the ids whose update failed; tools that no longer exist are skipped.
+        """
+
+
+class UserStore(ABC):
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[Document]: ...
+
+    @abstractmethod
+    async def get_by_id(self, user_id: str) -> Optional[Document]: ...
+
+    @abstractmethod
+    async def insert(self, user: Document): ...
+
+    @abstractmethod
+    async def add_favorite(self, user_id: str, tool_id: str): ...
+
+    @abstractmethod
+    async def remove_favorite(self, user_id: str, tool_id: str): ...
+
+    @abstractmethod
+    async def update_favorites(self, user_id: str, favorites: Optional[List[str]] = None, add: Iterable[str] = (),
+                               remove: Iterable[str] = (), expected_version: Optional[int] = None
+                               ) -> Optional[Document]:
+        """Replace the favorites or apply an add/remove diff in one atomic update.
+
+        Returns ``{"favorites", "version"}`` after the update, or None when
+        ``expected_version`` is given and no longer matches.
+        """
+
+    @abstractmethod
+    async def favorite_pairs(self) -> List[Tuple[str, str]]:
+        """Every ``(user_id, tool_id)`` favorite."""
+
+
+class ReviewStore(ABC):
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def insert(self, review: Document, session=None):
+        """Insert a review, raising DuplicateReviewError if the user already reviewed the tool."""
+
+    @abstractmethod
+    async def delete(self, review_id: str, session=None): ...
+
+    @abstractmethod
+    async def find_by_tool(self, tool_id: str, limit: int = 100) -> List[Document]: ...
+
+    @abstractmethod
+    async def rated_pairs(self, min_rating: int) -> List[Tuple[str, str]]:
+        """``(user_id, tool_id)`` of every review rated ``min_rating`` or higher."""
+
+    @abstractmethod
+    async def add_to_summary(self, review: Document, session=None):
+        """Fold a review into its tool's materialized summary (histogram, count, sum, latest)."""
+
+    @abstractmethod
+    async def summary(self, tool_id: str) -> Optional[Document]:
+        """Return the tool's review summary, or None if it has no reviews."""
+
+
+def summary_document(tool_id: str, histogram: Dict[str, int], rating_sum: int,
+                     latest_review_at: Optional[datetime]) -> Document:
+    count = sum(histogram.values())
+    return {
+        "tool_id": tool_id,
+        "count": count,
+        "mean": round(rating_sum / count, 2) if count else 0.0,
+        "histogram": {str(star): histogram.get(str(star), 0) for star in range(1, 6)},
+        "latest_review_at": latest_review_at,
+    }
+
+
+class QueryStatStore(ABC):
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def increment(self, counts: Dict[str, Document]):
+        """Add ``{"requirements", "platforms", "count"}`` entries keyed by normalized query."""
+
+    @abstractmethod
+    async def top(self, limit: int) -> List[Document]: ...
+
+
+class JobStore(ABC):
+    """Background job records; each carries an ``expires_at`` after which it is dropped."""
+
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def insert(self, job: Document): ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Document]: ...
+
+    @abstractmethod
+    async def update(self, job_id: str, fields: Document): ...
+
+
+class Stores:
+    def __init__(self, tools: ToolStore, users: UserStore, reviews: ReviewStore, query_stats: QueryStatStore,
+                 jobs: JobStore, client=None):
+        self.tools = tools
+        self.users = users
+        self.reviews = reviews
+        self.query_stats = query_stats
+        self.jobs = jobs
+        self.client = client
+
+    @asynccontextmanager
+    async def transaction(self, enabled: bool = True):
+        """Yield a session running a multi-document transaction, or None when unsupported or disabled.
+
+        Mongo transactions need a replica set; the in-memory backend applies each
+        write atomically and has nothing to roll back.
+        """
+        if not enabled or self.client is None:
+            yield None
+            return
+        async with await self.client.start_session() as session:
+            async with session.start_transaction():
+                yield session
+
+    async def setup(self):
+        """Create indexes and other backend state needed before serving."""
+        for store in (self.tools, self.users, self.reviews, self.query_stats, self.jobs):
+            await store.setup()
+
+
+# MongoDB implementation
+NO_ID = {"_id": 0}
+
+
+class MongoToolStore(ToolStore):
+    def __init__(self, db):
+        self.collection = db.ai_tools
+        self.meta = db.meta
+        self.reviews = db.reviews
+
+    async def setup(self):
+        await self.collection.create_index("id", unique=True)
+        if await self.meta.find_one({"_id": "rating_sums"}) is None:
+            await self._backfill_rating_sums()
+            await self.meta.update_one({"_id": "rating_sums"}, {"$set": {"backfilled_at": datetime.utcnow()}},
+                                       upsert=True)
+
+    async def _backfill_rating_sums(self):
+        # One-off for reviews written before ratings were kept as running sums: without it the
+        # next review would take those tools for seed-only and reset their rating and count
+        missing = {"$eq": [{"$type": "$rating_sum"}, "missing"]}
+        await self.reviews.aggregate([
+            {"$group": {"_id": "$tool_id", "rating_sum": {"$sum": "$rating"}, "review_count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "id": "$_id", "rating_sum": 1, "review_count": 1}},
+            {"$merge": {"into": self.collection.name, "on": "id", "whenNotMatched": "discard", "whenMatched": [
+                {"$set": {
+                    "rating_sum": {"$cond": [missing, "$$new.rating_sum", "$rating_sum"]},
+                    "review_count": {"$cond": [missing, "$$new.review_count", "$review_count"]},
+                    "rating": {"$cond": [missing, {"$round": [
+                        {"$divide": ["$$new.rating_sum", "$$new.review_count"]}, 1
+                    ]}, "$rating"]},
+                }},
+            ]}},
+        ]).to_list(None)
+
+    async def _bump_version(self):
+        await self.meta.update_one({"_id": "catalog"}, {"$inc": {"version": 1}}, upsert=True)
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def insert(self, tool: Document):
+        await self.collection.insert_one(dict(tool))
+        await self._bump_version()
+
+    async def insert_many(self, tools: List[Document]):
+        await self.collection.insert_many([dict(tool) for tool in tools])
+        await self._bump_version()
+
+    async def get(self, tool_id: str) -> Optional[Document]:
+        return await self.collection.find_one({"id": tool_id}, NO_ID)
+
+    @staticmethod
+    def _query(category=None, platforms=None, search=None, tag=None) -> Document:
+        query: Document = {}
+        if category:
+            query["category"] = category
+        if platforms:
+            query["platforms"] = {"$in": platforms}
+        if tag:
+            query["tags"] = tag
+        if search:
+            query["$or"] = [
+                {"name": {"$regex": search, "$options": "i"}},
+                {"description": {"$regex": search, "$options": "i"}},
+                {"tags": {"$in": [search.lower()]}}
+            ]
+        return query
+
+    async def find(self, category=None, platforms=None, search=None, limit=50) -> List[Document]:
+        query = self._query(category, platforms, search)
+        return await self.collection.find(query, NO_ID).limit(limit).to_list(limit)
+
+    async def facet_search(self, category=None, platforms=None, search=None, tag=None, price_tier=None,
+                           limit=50) -> Document:
+        def bucket(field: str) -> List[Document]:
+            stages = [{"$unwind": f"${field}"}] if field in ("platforms", "tags") else []
+            return stages + [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+            ]
+
+        facets: Document = {field: bucket(field) for field in FACET_FIELDS}
+        facets["total"] = [{"$count": "n"}]
+        if limit > 0:
+            facets["tools"] = [{"$limit": limit}, {"$project": {"_id": 0, "price_tier": 0}}]
+        pipeline = [
+            {"$match": self._query(category, platforms, search, tag)},
+            {"$addFields": {"price_tier": price_tier_expression()}},
+        ]
+        if price_tier:
+            pipeline.append({"$match": {"price_tier": price_tier}})
+        pipeline.append({"$facet": facets})
+
+        result = (await self.collection.aggregate(pipeline).to_list(1))[0]
+        return {
+            "tools": result.get("tools", []),
+            "total": result["total"][0]["n"] if result["total"] else 0,
+            "facets": {
+                field: sorted_counts({entry["_id"]: entry["count"] for entry in result[field]})
+                for field in FACET_FIELDS
+            },
+        }
+
+    async def find_by_ids(self, tool_ids: List[str], limit: int = 100) -> List[Document]:
+        return await self.collection.find({"id": {"$in": tool_ids}}, NO_ID).to_list(limit)
+
+    async def all(self) -> List[Document]:
+        return await self.collection.find({}, NO_ID).to_list(None)
+
+    async def delete(self, tool_id: str) -> bool:
+        result = await self.collection.delete_one({"id": tool_id})
+        if result.deleted_count == 0:
+            return False
+        await self._bump_version()
+        return True
+
+    async def apply_review(self, tool_id: str, rating: int, session=None) -> Optional[Document]:
+        # Ratings are kept as a running sum so a new review never needs to re-read the
+        # review collection. Tools without a rating_sum have only seed ratings, which are
+        # replaced by the first real review.
+        has_sum = {"$ne": [{"$type": "$rating_sum"}, "missing"]}
+        return await self.collection.find_one_and_update(
+            {"id": tool_id},
+            [
+                {"$set": {
+                    "rating_sum": {"$add": [{"$cond": [has_sum, "$rating_sum", 0]}, rating]},
+                    "review_count": {"$add": [{"$cond": [has_sum, "$review_count", 0]}, 1]},
+                }},
+                {"$set": {"rating": {"$round": [{"$divide": ["$rating_sum", "$review_count"]}, 1]}}},
+            ],
+            projection={"_id": 0, "rating": 1, "review_count": 1},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+
+    async def catalog_version(self) -> int:
+        doc = await self.meta.find_one({"_id": "catalog"})
+        return doc["version"] if doc else 0
+
+    async def ratings(self) -> Dict[str, Tuple[float, int]]:
+        cursor = self.collection.find({}, {"_id": 0, "id": 1, "rating": 1, "review_count": 1}, batch_size=10000)
+        return {tool["id"]: (tool.get("rating", 0.0), tool.get("review_count", 0)) async for tool in cursor}
+
+    async def increment_counters(self, counts: Dict[str, Dict[str, int]]) -> List[str]:
+        tool_ids = list(counts)
+        if not tool_ids:
+            return []
+        try:
+            await self.collection.bulk_write([
+                UpdateOne({"id": tool_id}, {"$inc": {field: n for field, n in counts[tool_id].items() if n}})
+                for tool_id in tool_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything but the reported operations was applied
+            return [tool_ids[error["index"]] for error in e.details.get("writeErrors", [])]
+        return []
+
+
+class MongoUserStore(UserStore):
+    def __init__(self, db):
+        self.collection = db.users
+
+    async def get_by_email(self, email: str) -> Optional[Document]:
+        return await self.collection.find_one({"email": email}, NO_ID)
+
+    async def get_by_id(self, user_id: str) -> Optional[Document]:
+        return await self.collection.find_one({"id": user_id}, NO_ID)
+
+    async def insert(self, user: Document):
+        await self.collection.insert_one(dict(user))
+
+    async def add_favorite(self, user_id: str, tool_id: str):
+        await self.collection.update_one({"id": user_id}, {"$addToSet": {"preferences.favorites": tool_id},
+                                                           "$inc": {"preferences.favorites_version": 1}})
+
+    async def remove_favorite(self, user_id: str, tool_id: str):
+        await self.collection.update_one({"id": user_id}, {"$pull": {"preferences.favorites": tool_id},
+                                                           "$inc": {"preferences.favorites_version": 1}})
+
+    async def update_favorites(self, user_id: str, favorites: Optional[List[str]] = None, add: Iterable[str] = (),
+                               remove: Iterable[str] = (), expected_version: Optional[int] = None
+                               ) -> Optional[Document]:
+        query: Document = {"id": user_id}
+        if expected_version is not None:
+            # Users created before versioning have no counter yet, which reads as version 0
+            query["preferences.favorites_version"] = {"$in": [expected_version, None]} if expected_version == 0 \
+                else expected_version
+        if favorites is not None:
+            value: Any = {"$literal": list(dict.fromkeys(favorites))}
+        else:
+            # Same order as the memory store: current favorites first, then new ones in the order given
+            removed = set(remove)
+            current = {"$ifNull": ["$preferences.favorites", []]}
+            added = [tool_id for tool_id in dict.fromkeys(add) if tool_id not in removed]
+            value = {"$concatArrays": [
+                {"$filter": {"input": current, "cond": {"$not": [{"$in": ["$$this", {"$literal": list(removed)}]}]}}},
+                {"$filter": {"input": {"$literal": added}, "cond": {"$not": [{"$in": ["$$this", current]}]}}},
+            ]}
+        # Pipeline update: the new set and the version bump are computed server-side in one write
+        user = await self.collection.find_one_and_update(query, [{"$set": {
+            "preferences.favorites": value,
+            "preferences.favorites_version": {"$add": [{"$ifNull": ["$preferences.favorites_version", 0]}, 1]},
+        }}], projection={"_id": 0, "preferences.favorites": 1, "preferences.favorites_version": 1},
+            return_document=ReturnDocument.AFTER)
+        if user is None:
+            return None
+        return {"favorites": user["preferences"]["favorites"], "version": user["preferences"]["favorites_version"]}
+
+    async def favorite_pairs(self) -> List[Tuple[str, str]]:
+        cursor = self.collection.find({"preferences.favorites.0": {"$exists": True}},
+                                      {"_id": 0, "id": 1, "preferences.favorites": 1}, batch_size=10000)
+        return [(user["id"], tool_id) async for user in cursor for tool_id in user["preferences"]["favorites"]]
+
+
+class MongoReviewStore(ReviewStore):
+    def __init__(self, db):
+        self.collection = db.reviews
+        self.summaries = db.review_summaries
+
+    async def setup(self):
+        await self.collection.create_index([("user_id", ASCENDING), ("tool_id", ASCENDING)], unique=True)
+        await self.collection.create_index("tool_id")
+        if await self.summaries.estimated_document_count() == 0:
+            await self._rebuild_summaries()
+
+    async def _rebuild_summaries(self):
+        # One-off backfill for reviews written before summaries were maintained
+        await self.collection.aggregate([
+            {"$group": {
+                "_id": {"tool_id": "$tool_id", "rating": "$rating"},
+                "n": {"$sum": 1},
+                "latest": {"$max": "$created_at"},
+            }},
+            {"$group": {
+                "_id": "$_id.tool_id",
+                "buckets": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$n"}},
+                "rating_sum": {"$sum": {"$multiply": ["$_id.rating", "$n"]}},
+                "latest_review_at": {"$max": "$latest"},
+            }},
+            {"$project": {"histogram": {"$arrayToObject": "$buckets"}, "rating_sum": 1, "latest_review_at": 1}},
+            {"$merge": {"into": self.summaries.name, "whenMatched": "replace"}},
+        ]).to_list(None)
+
+    async def insert(self, review: Document, session=None):
+        try:
+            await self.collection.insert_one(dict(review), session=session)
+        except DuplicateKeyError:
+            raise DuplicateReviewError(review["tool_id"])
+
+    async def delete(self, review_id: str, session=None):
+        await self.collection.delete_one({"id": review_id}, session=session)
+
+    async def find_by_tool(self, tool_id: str, limit: int = 100) -> List[Document]:
+        return await self.collection.find({"tool_id": tool_id}, NO_ID).to_list(limit)
+
+    async def rated_pairs(self, min_rating: int) -> List[Tuple[str, str]]:
+        cursor = self.collection.find({"rating": {"$gte": min_rating}}, {"_id": 0, "user_id": 1, "tool_id": 1},
+                                      batch_size=10000)
+        return [(review["user_id"], review["tool_id"]) async for review in cursor]
+
+    async def add_to_summary(self, review: Document, session=None):
+        await self.summaries.update_one(
+            {"_id": review["tool_id"]},
+            {
+                "$inc": {f"histogram.{review['rating']}": 1, "rating_sum": review["rating"]},
+                "$max": {"latest_review_at": review["created_at"]},
+            },
+            upsert=True,
+            session=session
+        )
+
+    async def summary(self, tool_id: str) -> Optional[Document]:
+        doc = await self.summaries.find_one({"_id": tool_id})
+        if doc is None:
+            return None
+        return summary_document(tool_id, doc.get("histogram", {}), doc.get("rating_sum", 0),
+                                doc.get("latest_review_at"))
+
+
+class MongoQueryStatStore(QueryStatStore):
+    def __init__(self, db):
+        self.collection = db.query_stats
+
+    async def setup(self):
+        await self.collection.create_index([("count", DESCENDING)])
+
+    async def increment(self, counts: Dict[str, Document]):
+        if not counts:
+            return
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"_id": key},
+                {
+                    "$inc": {"count": entry["count"]},
+                    "$set": {"requirements": entry["requirements"], "platforms": entry["platforms"], "last_seen": now}
+                },
+                upsert=True
+            )
+            for key, entry in counts.items()
+        ], ordered=False)
+
+    async def top(self, limit: int) -> List[Document]:
+        cursor = self.collection.find({}, {"_id": 0, "requirements": 1, "platforms": 1, "count": 1})
+        return await cursor.sort("count", DESCENDING).limit(limit).to_list(limit)
+
+
+class MongoJobStore(JobStore):
+    def __init__(self, db):
+        self.collection = db.recommendation_jobs
+
+    async def setup(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def insert(self, job: Document):
+        await self.collection.insert_one(dict(job))
+
+    async def get(self, job_id: str) -> Optional[Document]:
+        # The TTL monitor runs about once a minute, so expiry is checked here as well
+        return await self.collection.find_one({"id": job_id, "expires_at": {"$gt": datetime.utcnow()}}, NO_ID)
+
+    async def update(self, job_id: str, fields: Document):
+        await self.collection.update_one({"id": job_id}, {"$set": fields})
+
+
+# In-memory implementation
+def _copy(doc: Document) -> Document:
+    # Shallow copy plus one level of containers, so callers never alias stored state
+    return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v) for k, v in doc.items()}
+
+
+class _OrderedIndex:
+    """Maps a key to the insertion-ordered set of document ids carrying it."""
+
+    def __init__(self):
+        self._entries: Dict[Any, Dict[str, None]] = {}
+
+    def add(self, key, doc_id: str):
+        self._entries.setdefault(key, {})[doc_id] = None
+
+    def discard(self, key, doc_id: str):
+        ids = self._entries.get(key)
+        if ids is not None:
+            ids.pop(doc_id, None)
+            if not ids:
+                del self._entries[key]
+
+    def get(self, key) -> Dict[str, None]:
+        return self._entries.get(key, {})
+
+
+def _compile_search(search: str):
+    try:
+        return re.compile(search, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(search), re.IGNORECASE)
+
+
+class MemoryToolStore(ToolStore):
+    def __init__(self):
+        self._tools: Dict[str, Document] = {}
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._version = 0
+        self._by_category = _OrderedIndex()
+        self._by_platform = _OrderedIndex()
+        self._by_tag = _OrderedIndex()
+
+    def _index(self, tool: Document):
+        tool_id = tool["id"]
+        self._by_category.add(tool.get("category"), tool_id)
+        for platform in tool.get("platforms", []):
+            self._by_platform.add(platform, tool_id)
+        for tag in tool.get("tags", []):
+            self._by_tag.add(tag, tool_id)
+
+    def _unindex(self, tool: Document):
+        tool_id = tool["id"]
+        self._by_category.discard(tool.get("category"), tool_id)
+        for platform in tool.get("platforms", []):
+            self._by_platform.discard(platform, tool_id)
+        for tag in tool.get("tags", []):
+            self._by_tag.discard(tag, tool_id)
+
+    async def count(self) -> int:
+        return len(self._tools)
+
+    async def insert(self, tool: Document):
+        tool = _copy(tool)
+        if tool["id"] in self._tools:
+            self._unindex(self._tools[tool["id"]])
+        self._tools[tool["id"]] = tool
+        self._seq[tool["id"]] = self._next_seq
+        self._next_seq += 1
+        self._index(tool)
+        self._version += 1
+
+    async def insert_many(self, tools: List[Document]):
+        for tool in tools:
+            await self.insert(tool)
+
+    async def get(self, tool_id: str) -> Optional[Document]:
+        tool = self._tools.get(tool_id)
+        return _copy(tool) if tool is not None else None
+
+    def _candidate_ids(self, category, platforms) -> Iterable[str]:
+        candidates: List[Dict[str, None]] = []
+        if category:
+            candidates.append(self._by_category.get(category))
+        if platforms:
+            merged: Dict[str, None] = {}
+            for platform in platforms:
+                merged.update(self._by_platform.get(platform))
+            candidates.append(merged)
+        if not candidates:
+            return self._tools.keys()
+        # Walk the smallest index and check membership in the others
+        candidates.sort(key=len)
+        smallest, rest = candidates[0], candidates[1:]
+        ids = [tool_id for tool_id in smallest if all(tool_id in other for other in rest)]
+        if platforms and len(platforms) > 1:
+            # Merging several platform entries loses catalog order, restore it
+            ids.sort(key=self._seq.__getitem__)
+        return ids
+
+    async def find(self, category=None, platforms=None, search=None, limit=50) -> List[Document]:
+        pattern = _compile_search(search) if search else None
+        tagged = self._by_tag.get(search.lower()) if search else {}
+        results = []
+        for tool_id in self._candidate_ids(category, platforms):
+            if len(results) >= limit:
+                break
+            tool = self._tools[tool_id]
+            if pattern is not None and not (
+                pattern.search(tool.get("name", ""))
+                or pattern.search(tool.get("description", ""))
+                or tool_id in tagged
+            ):
+                continue
+            results.append(_copy(tool))
+        return results
+
+    async def facet_search(self, category=None, platforms=None, search=None, tag=None, price_tier=None,
+                           limit=50) -> Document:
+        pattern = _compile_search(search) if search else None
+        tagged = self._by_tag.get(search.lower()) if search else {}
+        with_tag = self._by_tag.get(tag) if tag else None
+        matched = []
+        for tool_id in self._candidate_ids(category, platforms):
+            tool = self._tools[tool_id]
+            if with_tag is not None and tool_id not in with_tag:
+                continue
+            if pattern is not None and not (
+                pattern.search(tool.get("name", ""))
+                or pattern.search(tool.get("description", ""))
+                or tool_id in tagged
+            ):
+                continue
+            if price_tier and tool_price_tier(tool.get("pricing", "")) != price_tier:
+                continue
+            matched.append(tool)
+        return {
+            "tools": [_copy(tool) for tool in matched[:limit]],
+            "total": len(matched),
+            "facets": count_facets(matched),
+        }
+
+    async def all(self) -> List[Document]:
+        return [_copy(tool) for tool in self._tools.values()]
+
+    async def find_by_ids(self, tool_ids: List[str], limit: int = 100) -> List[Document]:
+        found = sorted({tool_id for tool_id in tool_ids if tool_id in self._tools}, key=self._seq.__getitem__)
+        return [_copy(self._tools[tool_id]) for tool_id in found[:limit]]
+
+    async def delete(self, tool_id: str) -> bool:
+        tool = self._tools.pop(tool_id, None)
+        if tool is None:
+            return False
+        del self._seq[tool_id]
+        self._unindex(tool)
+        self._version += 1
+        return True
+
+    async def apply_review(self, tool_id: str, rating: int, session=None) -> Optional[Document]:
+        tool = self._tools.get(tool_id)
+        if tool is None:
+            return None
+        if "rating_sum" not in tool:
+            tool["rating_sum"] = 0
+            tool["review_count"] = 0
+        tool["rating_sum"] += rating
+        tool["review_count"] += 1
+        tool["rating"] = round(tool["rating_sum"] / tool["review_count"], 1)
+        return {"rating": tool["rating"], "review_count": tool["review_count"]}
+
+    async def catalog_version(self) -> int:
+        return self._version
+
+    async def ratings(self) -> Dict[str, Tuple[float, int]]:
+        return {tool_id: (tool.get("rating", 0.0), tool.get("review_count", 0)) for tool_id, tool in self._tools.items()}
+
+    async def increment_counters(self, counts: Dict[str, Dict[str, int]]) -> List[str]:
+        for tool_id, fields in counts.items():
+            tool = self._tools.get(tool_id)
+            if tool is None:
+                continue
+            for field, n in fields.items():
+                tool[field] = tool.get(field, 0) + n
+        return []
+
+
+class MemoryUserStore(UserStore):
+    def __init__(self):
+        self._users: Dict[str, Document] = {}
+        self._id_by_email: Dict[str, str] = {}
+
+    async def get_by_email(self, email: str) -> Optional[Document]:
+        user_id = self._id_by_email.get(email)
+        return await self.get_by_id(user_id) if user_id else None
+
+    async def get_by_id(self, user_id: str) -> Optional[Document]:
+        user = self._users.get(user_id)
+        if user is None:
+            return None
+        user = _copy(user)
+        user["preferences"] = {k: (list(v) if isinstance(v, list) else v) for k, v in user["preferences"].items()}
+        return user
+
+    async def insert(self, user: Document):
+        user = _copy(user)
+        user.setdefault("preferences", {})
+        self._users[user["id"]] = user
+        self._id_by_email[user["email"]] = user["id"]
+
+    async def add_favorite(self, user_id: str, tool_id: str):
+        user = self._users.get(user_id)
+        if user is not None:
+            favorites = user["preferences"].setdefault("favorites", [])
+            if tool_id not in favorites:
+                favorites.append(tool_id)
+            user["preferences"]["favorites_version"] = user["preferences"].get("favorites_version", 0) + 1
+
+    async def remove_favorite(self, user_id: str, tool_id: str):
+        user = self._users.get(user_id)
+        if user is not None:
+            favorites = user["preferences"].get("favorites", [])
+            user["preferences"]["favorites"] = [f for f in favorites if f != tool_id]
+            user["preferences"]["favorites_version"] = user["preferences"].get("favorites_version", 0) + 1
+
+    async def update_favorites(self, user_id: str, favorites: Optional[List[str]] = None, add: Iterable[str] = (),
+                               remove: Iterable[str] = (), expected_version: Optional[int] = None
+                               ) -> Optional[Document]:
+        user = self._users.get(user_id)
+        if user is None:
+            return None
+        preferences = user["preferences"]
+        version = preferences.get("favorites_version", 0)
+        if expected_version is not None and expected_version != version:
+            return None
+        if favorites is None:
+            removed = set(remove)
+            favorites = [f for f in [*preferences.get("favorites", []), *add] if f not in removed]
+        preferences["favorites"] = list(dict.fromkeys(favorites))
+        preferences["favorites_version"] = version + 1
+        return {"favorites": list(preferences["favorites"]), "version": version + 1}
+
+    async def favorite_pairs(self) -> List[Tuple[str, str]]:
+        return [(user_id, tool_id) for user_id, user in self._users.items()
+                for tool_id in user["preferences"].get("favorites", [])]
+
+
+class MemoryReviewStore(ReviewStore):
+    def __init__(self):
+        self._reviews: Dict[str, Document] = {}
+        self._by_tool = _OrderedIndex()
+        self._by_user_tool: Dict[tuple, str] = {}
+        self._summaries: Dict[str, Document] = {}
+
+    async def insert(self, review: Document, session=None):
+        key = (review["user_id"], review["tool_id"])
+        if key in self._by_user_tool:
+            raise DuplicateReviewError(review["tool_id"])
+        review = _copy(review)
+        self._reviews[review["id"]] = review
+        self._by_tool.add(review["tool_id"], review["id"])
+        self._by_user_tool[key] = review["id"]
+
+    async def delete(self, review_id: str, session=None):
+        review = self._reviews.pop(review_id, None)
+        if review is not None:
+            self._by_tool.discard(review["tool_id"], review_id)
+            self._by_user_tool.pop((review["user_id"], review["tool_id"]), None)
+
+    async def find_by_tool(self, tool_id: str, limit: int = 100) -> List[Document]:
+        review_ids = list(self._by_tool.get(tool_id))[:limit]
+        return [_copy(self._reviews[review_id]) for review_id in review_ids]
+
+    async def rated_pairs(self, min_rating: int) -> List[Tuple[str, str]]:
+        return [(review["user_id"], review["tool_id"]) for review in self._reviews.values()
+                if review["rating"] >= min_rating]
+
+    async def add_to_summary(self, review: Document, session=None):
+        entry = self._summaries.setdefault(review["tool_id"], {
+            "histogram": {}, "rating_sum": 0, "latest_review_at": None
+        })
+        star = str(review["rating"])
+        entry["histogram"][star] = entry["histogram"].get(star, 0) + 1
+        entry["rating_sum"] += review["rating"]
+        if entry["latest_review_at"] is None or review["created_at"] > entry["latest_review_at"]:
+            entry["latest_review_at"] = review["created_at"]
+
+    async def summary(self, tool_id: str) -> Optional[Document]:
+        entry = self._summaries.get(tool_id)
+        if entry is None:
+            return None
+        return summary_document(tool_id, entry["histogram"], entry["rating_sum"], entry["latest_review_at"])
+
+
+class MemoryQueryStatStore(QueryStatStore):
+    def __init__(self):
+        self._stats: Dict[str, Document] = {}
+
+    async def increment(self, counts: Dict[str, Document]):
+        for key, entry in counts.items():
+            stat = self._stats.setdefault(key, {
+                "requirements": entry["requirements"], "platforms": list(entry["platforms"]), "count": 0
+            })
+            stat["count"] += entry["count"]
+
+    async def top(self, limit: int) -> List[Document]:
+        ranked = sorted(self._stats.values(), key=lambda stat: stat["count"], reverse=True)[:limit]
+        return [_copy(stat) for stat in ranked]
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        # Insertion order is expiry order, since every job gets the same TTL
+        self._jobs: "OrderedDict[str, Document]" = OrderedDict()
+
+    def _purge(self, now: datetime):
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job["expires_at"] > now:
+                break
+            self._jobs.popitem(last=False)
+
+    async def insert(self, job: Document):
+        self._purge(datetime.utcnow())
+        self._jobs[job["id"]] = _copy(job)
+
+    async def get(self, job_id: str) -> Optional[Document]:
+        job = self._jobs.get(job_id)
+        if job is None or job["expires_at"] <= datetime.utcnow():
+            return None
+        return _copy(job)
+
+    async def update(self, job_id: str, fields: Document):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+
+def create_stores(backend: str = "mongo", db=None) -> Stores:
+    if backend == "memory":
+        return Stores(MemoryToolStore(), MemoryUserStore(), MemoryReviewStore(), MemoryQueryStatStore(),
+                      MemoryJobStore())
+    if backend == "mongo":
+        if db is None:
+            raise ValueError("A Motor database is required for the mongo storage backend")
+        return Stores(MongoToolStore(db), MongoUserStore(db), MongoReviewStore(db), MongoQueryStatStore(db),
+                      MongoJobStore(db), client=db.client)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,188 @@
+"""In-memory prefix index for typeahead suggestions.
+
+Terms (full tool names, the words in them, tags and categories) are kept in
+a sorted list, so a prefix lookup is one bisect followed by a walk over the
+matching terms. Each term also keeps its top-ranked tools, maintained
+incrementally as tools are added, removed and reviewed, so a keystroke never
+touches more than ``max_terms * max_results`` candidates regardless of
+catalog size.
+"""
+import bisect
+import heapq
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import metrics
+from ranking import WORD_PATTERN
+from storage import Document
+
+# Earlier fields win when a tool matches a prefix through several terms
+FIELD_PRIORITY = {"name": 0, "tag": 1, "category": 2}
+
+
+def normalize_term(text: str) -> str:
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+def _preferred(field: str, current: Optional[str]) -> bool:
+    return current is None or FIELD_PRIORITY[field] < FIELD_PRIORITY[current]
+
+
+def tool_terms(tool: Document) -> Dict[str, str]:
+    """Map each indexed term of a tool to the field it came from."""
+    terms: Dict[str, str] = {}
+
+    def add(term: str, field: str):
+        if term and _preferred(field, terms.get(term)):
+            terms[term] = field
+
+    for field, values in (("name", [tool.get("name", "")]), ("tag", tool.get("tags", [])),
+                          ("category", [tool.get("category") or ""])):
+        for value in values:
+            normalized = normalize_term(value)
+            add(normalized, field)
+            for word in normalized.split():
+                add(word, field)
+    return terms
+
+
+class SuggestIndex:
+    def __init__(self, max_results: int = 20, max_terms: int = 256):
+        self.max_results = max_results
+        self.max_terms = max_terms
+        self._terms: List[str] = []
+        self._postings: Dict[str, Dict[str, str]] = {}
+        self._top: Dict[str, Optional[List[str]]] = {}
+        self._tools: Dict[str, Document] = {}
+        self._terms_by_tool: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return tool_id in self._tools
+
+    def score(self, tool_id: str) -> Optional[Tuple[float, int]]:
+        tool = self._tools.get(tool_id)
+        return (tool["rating"], tool["review_count"]) if tool is not None else None
+
+    def _score(self, tool_id: str) -> Tuple[float, int, str]:
+        tool = self._tools[tool_id]
+        return tool["rating"], tool["review_count"], tool["name"]
+
+    def _summary(self, tool: Document) -> Document:
+        return {
+            "id": tool["id"],
+            "name": tool.get("name", ""),
+            "category": tool.get("category"),
+            "rating": tool.get("rating", 0.0),
+            "review_count": tool.get("review_count", 0),
+        }
+
+    def build(self, tools: Iterable[Document],
+              score_of: Optional[Callable[[str], Optional[Tuple[float, int]]]] = None):
+        """Replace the index contents with ``tools``.
+
+        ``score_of`` supplies fresher ``(rating, review_count)`` pairs than the
+        documents carry, e.g. the live scores of the index being replaced.
+        """
+        self._postings = {}
+        self._tools = {}
+        self._terms_by_tool = {}
+        for tool in tools:
+            summary = self._tools[tool["id"]] = self._summary(tool)
+            score = score_of(tool["id"]) if score_of is not None else None
+            if score is not None:
+                summary["rating"], summary["review_count"] = score
+            terms = tool_terms(tool)
+            self._terms_by_tool[tool["id"]] = list(terms)
+            for term, field in terms.items():
+                self._postings.setdefault(term, {})[tool["id"]] = field
+        self._terms = sorted(self._postings)
+        self._top = {}
+        metrics.set_gauge("suggest_index_terms", len(self._terms))
+
+    def add(self, tool: Document):
+        if tool["id"] in self._tools:
+            self.remove(tool["id"])
+        tool_id = tool["id"]
+        self._tools[tool_id] = self._summary(tool)
+        terms = tool_terms(tool)
+        self._terms_by_tool[tool_id] = list(terms)
+        for term, field in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[tool_id] = field
+            self._offer(term, tool_id)
+        metrics.set_gauge("suggest_index_terms", len(self._terms))
+
+    def remove(self, tool_id: str):
+        if self._tools.pop(tool_id, None) is None:
+            return
+        for term in self._terms_by_tool.pop(tool_id, []):
+            postings = self._postings[term]
+            del postings[tool_id]
+            if not postings:
+                del self._postings[term]
+                self._top.pop(term, None)
+                del self._terms[bisect.bisect_left(self._terms, term)]
+            elif tool_id in (self._top.get(term) or ()):
+                self._top[term] = None
+        metrics.set_gauge("suggest_index_terms", len(self._terms))
+
+    def update_score(self, tool_id: str, rating: float, review_count: int):
+        tool = self._tools.get(tool_id)
+        if tool is None:
+            return
+        lowered = (rating, review_count) < (tool["rating"], tool["review_count"])
+        tool["rating"], tool["review_count"] = rating, review_count
+        for term in self._terms_by_tool[tool_id]:
+            top = self._top.get(term)
+            if top is None:
+                continue
+            if tool_id in top and lowered and len(self._postings[term]) > len(top):
+                # A tool outside the cached top list may now outrank it
+                self._top[term] = None
+            else:
+                self._offer(term, tool_id)
+
+    def _offer(self, term: str, tool_id: str):
+        top = self._top.get(term)
+        if top is None:
+            return
+        if tool_id not in top:
+            if len(top) >= self.max_results and self._score(tool_id) <= self._score(top[-1]):
+                return
+            top.append(tool_id)
+        top.sort(key=self._score, reverse=True)
+        del top[self.max_results:]
+
+    def _top_for(self, term: str) -> List[str]:
+        top = self._top.get(term)
+        if top is None:
+            top = self._top[term] = heapq.nlargest(self.max_results, self._postings[term], key=self._score)
+        return top
+
+    def suggest(self, query: str, limit: int = 8) -> List[Document]:
+        started = time.perf_counter()
+        prefix = normalize_term(query)
+        if query[-1:].isspace() and prefix:
+            prefix += " "
+        matches: Dict[str, str] = {}
+        if prefix:
+            position = bisect.bisect_left(self._terms, prefix)
+            end = min(len(self._terms), position + self.max_terms)
+            while position < end and self._terms[position].startswith(prefix):
+                term = self._terms[position]
+                postings = self._postings[term]
+                for tool_id in self._top_for(term):
+                    field = postings[tool_id]
+                    if _preferred(field, matches.get(tool_id)):
+                        matches[tool_id] = field
+                position += 1
+        ranked = heapq.nlargest(min(limit, self.max_results), matches, key=self._score)
+        metrics.observe("suggest_lookup_ms", (time.perf_counter() - started) * 1000,
+                        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5))
+        return [dict(self._tools[tool_id], matched=matches[tool_id]) for tool_id in ranked]
@@ -0,0 +1,87 @@
+"""Trending tools from exponentially time-decayed popularity.
+
+Each event (a view, click, favorite or review) adds its weight to the tool's
+score, and the score halves every ``half_life`` seconds. Instead of decaying
+every score on a clock, a score is kept as ``log(sum(w * e^(rate * t)))``
+relative to a fixed epoch: an event at time ``t`` is folded in with one
+``logaddexp``, and the decayed value at ``now`` is ``exp(log_score - rate *
+now)``. All scores decay at the same rate, so their order never changes
+between events, which is why a top-K set only needs updating when the tool
+that just received an event may enter it.
+
+Counts are per worker: each one ranks by the traffic it serves, which under
+a load balancer is a sample of the whole. Reviews arrive on every worker
+through the invalidation bus.
+"""
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+EVENT_WEIGHTS = {"view": 1.0, "click": 2.0, "review": 3.0, "favorite": 5.0}
+
+
+class TrendingTools:
+    def __init__(self, half_life: float = 86400.0, k: int = 50, clock: Callable[[], float] = time.time):
+        self.rate = math.log(2) / half_life
+        self.k = k
+        self.clock = clock
+        self.epoch = clock()
+        self._scores: Dict[str, float] = {}
+        self._top: Dict[str, float] = {}
+        self._floor: Optional[Tuple[float, str]] = None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _refresh_floor(self):
+        self._floor = min((score, tool_id) for tool_id, score in self._top.items()) if self._top else None
+
+    def record(self, tool_id: str, event: str, count: int = 1):
+        """Fold ``count`` events of one kind into the tool's score; O(1) unless the top-K changes."""
+        if count <= 0:
+            return
+        # Relative to the epoch, so the exponent grows linearly and never overflows
+        value = math.log(EVENT_WEIGHTS[event] * count) + self.rate * (self.clock() - self.epoch)
+        current = self._scores.get(tool_id)
+        score = value if current is None else max(current, value) + math.log1p(math.exp(-abs(current - value)))
+        self._scores[tool_id] = score
+        if tool_id in self._top:
+            self._top[tool_id] = score
+            if self._floor is not None and self._floor[1] == tool_id:
+                self._refresh_floor()
+        elif len(self._top) < self.k:
+            self._top[tool_id] = score
+            if self._floor is None or score < self._floor[0]:
+                self._floor = (score, tool_id)
+        elif score > self._floor[0]:
+            # Scores only grow, so an evicted tool can only come back through an event of its own
+            del self._top[self._floor[1]]
+            self._top[tool_id] = score
+            self._refresh_floor()
+        metrics.inc("trending_events_total", event=event)
+
+    def remove(self, tool_id: str):
+        self._scores.pop(tool_id, None)
+        if self._top.pop(tool_id, None) is None:
+            return
+        # Rare (tool deletion): refill the vacated slot from everything else
+        outside = [(score, other) for other, score in self._scores.items() if other not in self._top]
+        if outside:
+            score, other = max(outside)
+            self._top[other] = score
+        self._refresh_floor()
+
+    def score(self, tool_id: str) -> float:
+        """The tool's decayed score now, in event-weight units."""
+        log_score = self._scores.get(tool_id)
+        if log_score is None:
+            return 0.0
+        return math.exp(log_score - self.rate * (self.clock() - self.epoch))
+
+    def top(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """``(tool_id, score)`` pairs, highest first, from the top-K set alone."""
+        shift = self.rate * (self.clock() - self.epoch)
+        ranked = sorted(self._top.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(tool_id, math.exp(score - shift)) for tool_id, score in ranked]
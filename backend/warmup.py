@@ -0,0 +1,113 @@
+"""Query frequency tracking and recommendation cache warming.
+
+``/api/recommendations`` records each normalized query in memory (O(1) per
+request). The counts are flushed to the query stats store in batches, and a
+background warmer periodically precomputes recommendations for the top-N
+queries so that head queries are served from the cache. The warmer also runs
+at startup and shortly after catalog changes, when every cached answer is
+keyed to an old catalog version.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from llm_cache import normalize_requirements
+from metrics import metrics
+from storage import Document, QueryStatStore
+
+logger = logging.getLogger(__name__)
+
+
+def query_key(requirements: str, platforms: List[str]) -> str:
+    return normalize_requirements(requirements) + "|" + ",".join(sorted(p.lower() for p in platforms))
+
+
+class QueryStats:
+    def __init__(self, store: QueryStatStore):
+        self.store = store
+        self._pending: Dict[str, Document] = {}
+
+    def record(self, requirements: str, platforms: List[str]):
+        key = query_key(requirements, platforms)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {
+                "requirements": normalize_requirements(requirements),
+                "platforms": sorted(platforms),
+                "count": 0,
+            }
+        entry["count"] += 1
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await self.store.increment(pending)
+        except Exception:
+            # Keep the counts for the next flush rather than losing them
+            for key, entry in pending.items():
+                current = self._pending.setdefault(key, dict(entry, count=0))
+                current["count"] += entry["count"]
+            raise
+
+    async def top(self, limit: int) -> List[Document]:
+        await self.flush()
+        return await self.store.top(limit)
+
+
+class RecommendationWarmer:
+    def __init__(self, query_stats: QueryStats, warm_one: Callable[[str, List[str]], Awaitable[bool]],
+                 top_n: int = 50, interval: float = 900.0, flush_interval: float = 60.0,
+                 catalog_debounce: float = 5.0):
+        self.query_stats = query_stats
+        self.warm_one = warm_one
+        self.top_n = top_n
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.catalog_debounce = catalog_debounce
+        self._wake = asyncio.Event()
+        self._catalog_changed = False
+
+    def catalog_changed(self):
+        self._catalog_changed = True
+        self._wake.set()
+
+    async def warm(self) -> int:
+        """Precompute recommendations for the current top queries; returns how many were computed."""
+        if self.top_n <= 0:
+            return 0
+        computed = 0
+        for query in await self.query_stats.top(self.top_n):
+            try:
+                if await self.warm_one(query["requirements"], query["platforms"]):
+                    computed += 1
+            except Exception as e:
+                logger.warning("Warming %r failed: %s", query["requirements"], e)
+        metrics.inc("recommendation_warm_runs_total")
+        metrics.inc("recommendation_warm_computed_total", computed)
+        return computed
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_warm = loop.time()
+        while True:
+            self._wake.clear()
+            try:
+                if self._catalog_changed:
+                    # Catalog writes tend to come in bursts; wait for them to settle
+                    await asyncio.sleep(self.catalog_debounce)
+                    self._catalog_changed = False
+                    next_warm = loop.time()
+                await self.query_stats.flush()
+                if loop.time() >= next_warm:
+                    await self.warm()
+                    next_warm = loop.time() + self.interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Recommendation warmer error: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(self.flush_interval, max(next_warm - loop.time(), 0.1)))
+            except asyncio.TimeoutError:
+                pass
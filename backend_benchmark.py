@@ -0,0 +1,142 @@
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Benchmarks run in-process against the in-memory storage backend, no MongoDB needed
+os.environ.setdefault("STORAGE", "memory")
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+
+
+class APIBenchmark:
+    def __init__(self, iterations=500, catalog_size=1000):
+        self.iterations = iterations
+        self.catalog_size = catalog_size
+        self.results = []
+
+    async def seed_catalog(self):
+        """Add synthetic tools on top of the sample data"""
+        categories = ["Development", "General AI", "Image Generation", "Writing", "Audio"]
+        platforms = ["Web", "Desktop", "Mobile", "API"]
+        await server.stores.tools.insert_many([
+            server.AITool(
+                name=f"Tool {i}",
+                description=f"Synthetic tool number {i} for benchmarking",
+                category=categories[i % len(categories)],
+                platforms=[platforms[i % len(platforms)], platforms[(i + 1) % len(platforms)]],
+                features=["Feature A", "Feature B"],
+                pricing="Free",
+                url=f"https://example.com/{i}",
+                rating=round(3 + (i % 20) / 10, 1),
+                tags=["ai", categories[i % len(categories)].lower()]
+            ).dict()
+            for i in range(self.catalog_size)
+        ])
+
+    async def measure(self, name, make_request):
+        """Time a request repeatedly and record latency percentiles"""
+        timings = []
+        for i in range(self.iterations):
+            start = time.perf_counter()
+            response = await make_request(i)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                print(f"❌ {name} - status {response.status_code}")
+                return
+        timings.sort()
+        result = {
+            "name": name,
+            "p50_ms": statistics.median(timings),
+            "p95_ms": timings[int(len(timings) * 0.95) - 1],
+            "rps": 1000 / statistics.mean(timings),
+        }
+        self.results.append(result)
+        print(f"⏱  {name:<32} p50 {result['p50_ms']:7.3f} ms  p95 {result['p95_ms']:7.3f} ms  {result['rps']:8.0f} req/s")
+
+    def measure_semantic_cache(self, entries=100_000):
+        """Time near-duplicate lookups against a full semantic cache"""
+        from semantic_cache import SemanticCache
+
+        # Realistic requirements are a sentence, 30-40 non-zero dimensions once embedded
+        rnd = random.Random(1)
+        words = ("write code blog post marketing social media captions small business transcribe podcast audio text "
+                 "video edit image logo design generate summarize research papers email sales customer support chat "
+                 "legal contract review music voice presentation slides spreadsheet data analysis translate meeting "
+                 "notes schedule resume seo keywords product description website").split()
+
+        def requirements():
+            return "I need a tool to " + " ".join(rnd.sample(words, rnd.randint(4, 10)))
+
+        cache = SemanticCache(capacity=entries)
+        for i in range(entries):
+            cache.add(requirements(), 1, {"i": i})
+        queries = [requirements() for _ in range(self.iterations)]
+        dims = statistics.median(len(cache.vectorizer.sparse(query)[0]) for query in queries)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            cache.lookup(query, 1)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"⏱  {'semantic cache lookup (' + str(entries) + ')':<32} p50 {statistics.median(timings):7.3f} ms  "
+              f"p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms  ({dims:.0f} query dims)")
+
+    async def run_all(self):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await server.init_sample_data()
+            await self.seed_catalog()
+            # The ASGI transport skips startup events, so load the in-process catalog and indexes here
+            await server.reload_catalog_cache()
+            await server.rebuild_catalog_indexes(server.catalog_cache)
+
+            email = f"bench_{uuid.uuid4().hex[:8]}@example.com"
+            token = (await client.post("/api/register", json={
+                "email": email, "username": "bench", "password": "BenchPass123!"
+            })).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            tool_ids = [t["id"] for t in (await client.get("/api/tools", params={"limit": 200})).json()]
+
+            print(f"🚀 Benchmarking {self.iterations} iterations over {self.catalog_size + 5} tools")
+            await self.measure("GET /api/tools", lambda i: client.get("/api/tools"))
+            await self.measure("GET /api/tools?category&platform", lambda i: client.get(
+                "/api/tools", params={"category": "Development", "platform": "Web"}))
+            await self.measure("GET /api/tools?search", lambda i: client.get("/api/tools", params={"search": "tool 9"}))
+            await self.measure("GET /api/tools?search (typo)", lambda i: client.get(
+                "/api/tools", params={"search": "synthetc"}))
+            if tool_ids:
+                await self.measure("GET /api/tools/{id}", lambda i: client.get(
+                    f"/api/tools/{tool_ids[i % len(tool_ids)]}"))
+            else:
+                print("⚠️  GET /api/tools returned no tools; skipping per-tool benchmarks")
+            await self.measure("GET /api/categories", lambda i: client.get("/api/categories"))
+            await self.measure("GET /api/tools/search?limit=0", lambda i: client.get(
+                "/api/tools/search", params={"limit": 0}))
+            await self.measure("GET /api/tools/search?category", lambda i: client.get(
+                "/api/tools/search", params={"category": "Writing"}))
+            await self.measure("GET /api/tools/suggest", lambda i: client.get(
+                "/api/tools/suggest", params={"q": ["t", "to", "too", "tool 1", "dev", "wri"][i % 6]}))
+            if tool_ids:
+                await self.measure("POST /api/favorites/{id}", lambda i: client.post(
+                    f"/api/favorites/{tool_ids[i % len(tool_ids)]}", headers=headers))
+            await self.measure("GET /api/favorites", lambda i: client.get("/api/favorites", headers=headers))
+
+        self.measure_semantic_cache()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    benchmark = APIBenchmark(iterations=iterations)
+    asyncio.run(benchmark.run_all())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { BrowserRouter as Router, Routes, Route, Navigate } from 'react-router-dom';
 import axios from 'axios';
 import { Button } from './components/ui/button';
@@ -18,6 +18,12 @@ import './App.css';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Open a tool's site and report the click; the counter is best-effort
+const openTool = (tool) => {
+  axios.post(`${API}/tools/${tool.id}/click`).catch(() => {});
+  window.open(tool.url, '_blank');
+};
+
 // Auth context
 const AuthContext = React.createContext();
 
@@ -143,7 +149,7 @@ const LandingPage = () => {
       console.error('Quick search failed:', error);
       // Fallback: try to get some sample tools
       try {
-        const response = await axios.get(`${API}/tools?limit=3`);
+        const response = await axios.get(`${API}/tools/trending?limit=3`);
         setQuickRecommendations(response.data || []);
       } catch (fallbackError) {
         console.error('Fallback search also failed:', fallbackError);
@@ -259,7 +265,7 @@ const LandingPage = () => {
                       <Button
                         variant="outline"
                         size="sm"
-                        onClick={() => window.open(tool.url, '_blank')}
+                        onClick={() => openTool(tool)}
                       >
                         <ExternalLinkIcon className="w-4 h-4" />
                       </Button>
@@ -703,7 +709,7 @@ const Dashboard = () => {
                           <Button
                             size="sm"
                             className="w-full"
-                            onClick={() => window.open(tool.url, '_blank')}
+                            onClick={() => openTool(tool)}
                           >
                             <ExternalLinkIcon className="w-4 h-4 mr-2" />
                             Visit Tool
@@ -766,7 +772,7 @@ const Dashboard = () => {
                         <Button
                           size="sm"
                           variant="ghost"
-                          onClick={() => window.open(tool.url, '_blank')}
+                          onClick={() => openTool(tool)}
                         >
                           <ExternalLinkIcon className="w-3 h-3" />
                         </Button>
@@ -794,6 +800,36 @@ const ToolsPage = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [favorites, setFavorites] = useState(new Set());
+  const [favoritesNotice, setFavoritesNotice] = useState('');
+  // Toggles made since the last sync, sent together as one diff
+  const favoritesVersion = useRef(0);
+  const pendingFavorites = useRef(new Map());
+  const favoritesTimer = useRef(null);
+
+  useEffect(() => {
+    // Closing the tab: send what is pending with a request that outlives the page
+    const flushOnUnload = () => {
+      const body = takeFavoritesDiff();
+      if (!body) return;
+      fetch(`${API}/favorites`, {
+        method: 'PUT',
+        keepalive: true,
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: axios.defaults.headers.common['Authorization'],
+        },
+        // No version: a diff applies safely on top of whatever the server has by now
+        body: JSON.stringify(body),
+      });
+    };
+    window.addEventListener('beforeunload', flushOnUnload);
+    return () => {
+      window.removeEventListener('beforeunload', flushOnUnload);
+      // Navigating away within the debounce window: send the pending toggles now
+      clearTimeout(favoritesTimer.current);
+      syncFavorites();
+    };
+  }, []);
 
   useEffect(() => {
     const initializePage = async () => {
@@ -845,6 +881,7 @@ const ToolsPage = () => {
     try {
       const response = await axios.get(`${API}/favorites`);
       const favoriteIds = new Set(response.data.tools.map(tool => tool.id));
+      favoritesVersion.current = response.data.version || 0;
       setFavorites(favoriteIds);
     } catch (error) {
       console.error('Failed to fetch favorites:', error);
@@ -852,27 +889,72 @@ const ToolsPage = () => {
     }
   };
 
-  const toggleFavorite = async (toolId) => {
-    if (!user) {
-      window.location.href = '/login';
-      return;
-    }
+  const applyPendingFavorites = (favoriteIds) => {
+    const merged = new Set(favoriteIds);
+    pendingFavorites.current.forEach((favorited, toolId) => {
+      if (favorited) merged.add(toolId);
+      else merged.delete(toolId);
+    });
+    return merged;
+  };
+
+  const takeFavoritesDiff = () => {
+    const diff = pendingFavorites.current;
+    pendingFavorites.current = new Map();
+    if (diff.size === 0) return null;
+    return {
+      add: [...diff].filter(([, favorited]) => favorited).map(([toolId]) => toolId),
+      remove: [...diff].filter(([, favorited]) => !favorited).map(([toolId]) => toolId),
+    };
+  };
+
+  const syncFavorites = async () => {
+    clearTimeout(favoritesTimer.current);
+    const body = takeFavoritesDiff();
+    if (!body) return;
 
     try {
-      if (favorites.has(toolId)) {
-        await axios.delete(`${API}/favorites/${toolId}`);
-        setFavorites(prev => {
-          const newSet = new Set(prev);
-          newSet.delete(toolId);
-          return newSet;
-        });
-      } else {
-        await axios.post(`${API}/favorites/${toolId}`);
-        setFavorites(prev => new Set(prev).add(toolId));
+      let response;
+      try {
+        response = await axios.put(`${API}/favorites`, { ...body, version: favoritesVersion.current });
+      } catch (error) {
+        if (error.response?.status !== 409) throw error;
+        // Changed in another tab: show the newer list first, then apply only the toggles it does not already have
+        const { favorites: current, version } = error.response.data.detail;
+        favoritesVersion.current = version;
+        setFavorites(applyPendingFavorites(current));
+        setFavoritesNotice('Your favorites were changed in another window; the list has been updated.');
+        const retry = {
+          add: body.add.filter(toolId => !current.includes(toolId)),
+          remove: body.remove.filter(toolId => current.includes(toolId)),
+        };
+        if (retry.add.length === 0 && retry.remove.length === 0) return;
+        response = await axios.put(`${API}/favorites`, { ...retry, version });
       }
+      favoritesVersion.current = response.data.version;
+      setFavorites(applyPendingFavorites(response.data.favorites));
     } catch (error) {
-      console.error('Failed to toggle favorite:', error);
+      console.error('Failed to sync favorites:', error);
+      await fetchUserFavorites();
+    }
+  };
+
+  const toggleFavorite = (toolId) => {
+    if (!user) {
+      window.location.href = '/login';
+      return;
     }
+
+    const favorited = !favorites.has(toolId);
+    pendingFavorites.current.set(toolId, favorited);
+    setFavorites(prev => {
+      const newSet = new Set(prev);
+      if (favorited) newSet.add(toolId);
+      else newSet.delete(toolId);
+      return newSet;
+    });
+    clearTimeout(favoritesTimer.current);
+    favoritesTimer.current = setTimeout(syncFavorites, 500);
   };
 
   return (
@@ -953,6 +1035,11 @@ const ToolsPage = () => {
               <p className="text-red-600 text-sm">{error}</p>
             </div>
           )}
+          {favoritesNotice && (
+            <div className="mt-4 p-3 bg-blue-50 border border-blue-200 rounded-md">
+              <p className="text-blue-700 text-sm">{favoritesNotice}</p>
+            </div>
+          )}
         </div>
 
         {/* Tools Grid */}
@@ -1057,7 +1144,7 @@ const ToolsPage = () => {
                 <CardFooter className="pt-4">
                   <Button
                     className="w-full"
-                    onClick={() => window.open(tool.url, '_blank')}
+                    onClick={() => openTool(tool)}
                   >
                     <ExternalLinkIcon className="w-4 h-4 mr-2" />
                     Visit Tool
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Run the API against the in-memory storage backend
+os.environ["STORAGE"] = "memory"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from catalog import CatalogCache  # noqa: E402
+from circuit_breaker import CircuitBreaker  # noqa: E402
+from counters import ToolCounters  # noqa: E402
+from facets import FacetCache  # noqa: E402
+from fuzzy import FuzzyIndex  # noqa: E402
+from lazy import Lazy  # noqa: E402
+from llm_cache import RecommendationCache  # noqa: E402
+from loop_watchdog import LoopWatchdog  # noqa: E402
+from personalization import ItemSimilarityRefresher  # noqa: E402
+from semantic_cache import SemanticCache  # noqa: E402
+from similar import SimilarToolsRefresher  # noqa: E402
+from storage import create_stores  # noqa: E402
+from suggest import SuggestIndex  # noqa: E402
+from trending import TrendingTools  # noqa: E402
+from warmup import QueryStats, RecommendationWarmer  # noqa: E402
+
+# A request that blocks the event loop longer than this fails the test using the api fixture
+LOOP_STALL_LIMIT_MS = float(os.environ.get("LOOP_STALL_LIMIT_MS", "250"))
+
+
+def assert_no_loop_stalls(watchdog: LoopWatchdog):
+    if watchdog.stalls:
+        stall = watchdog.stalls[0]
+        pytest.fail(f"Event loop blocked for {stall['duration_ms'] or 'over ' + str(LOOP_STALL_LIMIT_MS)} ms "
+                    f"in task {stall['task']}:\n{stall['stack']}")
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    fresh = create_stores("memory")
+    monkeypatch.setattr(server, "stores", fresh)
+    monkeypatch.setattr(server, "recommendation_cache", RecommendationCache(None, ttl_seconds=3600))
+    monkeypatch.setattr(server, "semantic_cache", SemanticCache(capacity=1000))
+    monkeypatch.setattr(server, "facet_cache", FacetCache(server.compute_catalog_facets))
+    monkeypatch.setattr(server, "suggest_index", SuggestIndex())
+    monkeypatch.setattr(server, "fuzzy_index", FuzzyIndex())
+    monkeypatch.setattr(server, "recommendation_jobs", server.create_job_queue())
+    monkeypatch.setattr(server, "item_similarity", ItemSimilarityRefresher(server.fetch_interactions))
+    monkeypatch.setattr(server, "similar_tools", SimilarToolsRefresher(server.catalog_source))
+    monkeypatch.setattr(server, "catalog_cache", CatalogCache())
+    monkeypatch.setattr(server, "tool_counters", ToolCounters(fresh.tools, on_flush=server.apply_flushed_counts))
+    monkeypatch.setattr(server, "trending_tools", TrendingTools())
+    bus = server.create_invalidation_bus()
+    bus.poll_interval = 0.05
+    monkeypatch.setattr(server, "invalidation_bus", bus)
+    monkeypatch.setattr(server, "loop_watchdog", LoopWatchdog(threshold_ms=LOOP_STALL_LIMIT_MS))
+    monkeypatch.setattr(server, "startup_state", dict(server.startup_state, catalog_loaded=False, catalog_tools=0))
+    query_stats = QueryStats(fresh.query_stats)
+    monkeypatch.setattr(server, "query_stats", query_stats)
+    monkeypatch.setattr(server, "recommendation_warmer", RecommendationWarmer(
+        query_stats, server.warm_recommendation, top_n=server.WARM_TOP_N
+    ))
+    return fresh
+
+
+@pytest.fixture
+def api(stores):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        # The catalog loads in the background after startup
+        deadline = time.monotonic() + 10
+        while test_client.get("/readyz").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        yield test_client
+    assert_no_loop_stalls(server.loop_watchdog)
+
+
+@pytest.fixture
+def auth_headers(api):
+    response = api.post("/api/register", json={
+        "email": "tester@example.com",
+        "username": "tester",
+        "password": "TestPass123!"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class FakeLLM:
+    """Stands in for the AsyncOpenAI client and scores tools from the prompt table."""
+
+    def __init__(self, score=None, delay=0.0, fail=False):
+        self.calls = []
+        self.score = score or (lambda requirements, name: 50.0)
+        self.delay = delay
+        self.fail = fail
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.calls.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        table = prompt.split("\n\n")[1].splitlines()[2:]
+        names = [row.split("|")[0] for row in table]
+
+        def answer(requirements):
+            scores = {name: self.score(requirements, name) for name in names}
+            return {
+                "recommended_tools": sorted(scores, key=scores.get, reverse=True),
+                "reasoning": f"Scored {len(names)} tools",
+                "match_scores": scores,
+            }
+
+        if prompt.startswith("User requirements ("):
+            numbered = prompt.split("\n\n")[0].splitlines()[1:]
+            content = json.dumps({"results": [
+                dict(answer(line.split('"')[1]), requirement=number) for number, line in enumerate(numbered, 1)
+            ]})
+        else:
+            content = json.dumps(answer(prompt.split('"')[1]))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(server, "openai_client", Lazy("openai", lambda: llm))
+    monkeypatch.setattr(server, "llm_breaker", CircuitBreaker("test-openai"))
+    return llm
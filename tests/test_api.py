@@ -0,0 +1,319 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import server
+from counters import ToolCounters
+from health import CachedPing
+from loop_watchdog import LoopWatchdog
+
+
+def test_sample_data_loaded_on_startup(api):
+    tools = api.get("/api/tools").json()
+    assert len(tools) == 5
+    assert {"Development", "General AI", "Image Generation"} == set(api.get("/api/categories").json()["categories"])
+
+
+def test_tool_filters(api):
+    development = api.get("/api/tools", params={"category": "Development"}).json()
+    assert [t["name"] for t in development] == ["Cursor AI", "GitHub Copilot"]
+
+    discord = api.get("/api/tools", params={"platform": "Discord Bot"}).json()
+    assert [t["name"] for t in discord] == ["Midjourney"]
+
+    searched = api.get("/api/tools", params={"search": "coding"}).json()
+    assert {t["name"] for t in searched} == {"Cursor AI", "ChatGPT", "GitHub Copilot"}
+
+    assert len(api.get("/api/tools", params={"limit": 2}).json()) == 2
+
+
+def test_faceted_search(api, auth_headers, stores):
+    unfiltered = api.get("/api/tools/search", params={"limit": 0}).json()
+    assert unfiltered["tools"] == [] and unfiltered["total"] == 5
+    assert {b["value"]: b["count"] for b in unfiltered["facets"]["price_tier"]} == {"paid": 3, "freemium": 2}
+    assert unfiltered["facets"]["platforms"][0] == {"value": "Web", "count": 5}
+
+    web_dev = api.get("/api/tools/search", params={"category": "Development", "platform": "Web"}).json()
+    assert [t["name"] for t in web_dev["tools"]] == ["Cursor AI", "GitHub Copilot"]
+    assert web_dev["facets"]["category"] == [{"value": "Development", "count": 2}]
+
+    freemium = api.get("/api/tools/search", params={"price_tier": "freemium", "tag": "chatbot"}).json()
+    assert [t["name"] for t in freemium["tools"]] == ["ChatGPT"] and freemium["total"] == 1
+    assert api.get("/api/tools/search", params={"price_tier": "cheap"}).status_code == 400
+
+    # Unfiltered facets are computed once per catalog version
+    computed = []
+    original = stores.tools.facet_search
+
+    async def counting_facet_search(**kwargs):
+        computed.append(kwargs)
+        return await original(**kwargs)
+
+    stores.tools.facet_search = counting_facet_search
+    api.get("/api/categories")
+    api.get("/api/tools/search", params={"limit": 0})
+    assert computed == []
+    api.post("/api/tools", headers=auth_headers, json={
+        "name": "Free Tool", "description": "d", "category": "Testing",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    })
+    refreshed = api.get("/api/tools/search", params={"limit": 0}).json()
+    assert len(computed) == 1
+    assert {"value": "free", "count": 1} in refreshed["facets"]["price_tier"]
+
+
+def test_unfiltered_reads_do_no_database_work(api, auth_headers, stores, monkeypatch):
+    api.get("/api/tools/search", params={"limit": 0})
+
+    async def no_database(*args, **kwargs):
+        raise AssertionError("hot path hit the database")
+
+    with monkeypatch.context() as patched:
+        for method in ("catalog_version", "find", "facet_search", "all", "get"):
+            patched.setattr(stores.tools, method, no_database)
+        listing = api.get("/api/tools/search", params={"limit": 3}).json()
+        assert [t["name"] for t in listing["tools"]] == [t["name"] for t in api.get("/api/tools?limit=3").json()]
+        assert listing["total"] == 5
+
+    # A catalog write moves the in-process version, so the facet cache recomputes once
+    version = server.current_catalog_version()
+    api.post("/api/tools", headers=auth_headers, json={
+        "name": "Listed Tool", "description": "d", "category": "Testing",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    })
+    assert server.current_catalog_version() == version + 1
+    assert "Listed Tool" in [t["name"] for t in api.get("/api/tools").json()]
+    assert api.get("/api/tools/search", params={"limit": 0}).json()["total"] == 6
+
+
+def test_register_login_and_me(api, auth_headers):
+    assert api.post("/api/register", json={
+        "email": "tester@example.com", "username": "again", "password": "x"
+    }).status_code == 400
+    assert api.post("/api/login", json={"email": "tester@example.com", "password": "wrong"}).status_code == 401
+
+    login = api.post("/api/login", json={"email": "tester@example.com", "password": "TestPass123!"})
+    assert login.status_code == 200
+    assert api.get("/api/me", headers=auth_headers).json()["username"] == "tester"
+
+
+def test_create_and_delete_tool(api, auth_headers):
+    created = api.post("/api/tools", headers=auth_headers, json={
+        "name": "Test Tool", "description": "d", "category": "Testing",
+        "platforms": ["Web"], "features": ["f"], "pricing": "Free", "url": "https://example.com"
+    }).json()
+    assert api.get(f"/api/tools/{created['id']}").json()["name"] == "Test Tool"
+    assert "Testing" in api.get("/api/categories").json()["categories"]
+
+    assert api.delete(f"/api/tools/{created['id']}", headers=auth_headers).status_code == 200
+    assert api.get(f"/api/tools/{created['id']}").status_code == 404
+    assert api.delete(f"/api/tools/{created['id']}", headers=auth_headers).status_code == 404
+
+
+def test_favorites(api, auth_headers):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    api.post(f"/api/favorites/{tool_id}", headers=auth_headers)
+    api.post(f"/api/favorites/{tool_id}", headers=auth_headers)
+    assert [t["id"] for t in api.get("/api/favorites", headers=auth_headers).json()["tools"]] == [tool_id]
+
+    api.delete(f"/api/favorites/{tool_id}", headers=auth_headers)
+    assert api.get("/api/favorites", headers=auth_headers).json()["tools"] == []
+
+
+def test_favorites_sync_applies_diffs_and_detects_conflicts(api, auth_headers):
+    first, second, third = [t["id"] for t in api.get("/api/tools").json()[:3]]
+    assert api.get("/api/favorites", headers=auth_headers).json()["version"] == 0
+
+    response = api.put("/api/favorites", headers=auth_headers, json={"add": [first, second], "version": 0})
+    assert response.json() == {"favorites": [first, second], "version": 1}
+    response = api.put("/api/favorites", headers=auth_headers,
+                       json={"add": [third], "remove": [first], "version": 1})
+    assert response.json() == {"favorites": [second, third], "version": 2}
+
+    # A second tab still holding version 1 must not overwrite the newer set
+    stale = api.put("/api/favorites", headers=auth_headers, json={"favorites": [first], "version": 1})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["version"] == 2
+    assert stale.json()["detail"]["favorites"] == [second, third]
+
+    api.post(f"/api/favorites/{first}", headers=auth_headers)
+    response = api.put("/api/favorites", headers=auth_headers, json={"favorites": [third], "version": 3})
+    assert response.json() == {"favorites": [third], "version": 4}
+    assert api.put("/api/favorites", headers=auth_headers,
+                   json={"favorites": [first], "add": [second]}).status_code == 400
+
+
+def test_favorites_keep_their_order(api, auth_headers):
+    ids = [t["id"] for t in api.get("/api/tools").json()[:5]]
+    api.put("/api/favorites", headers=auth_headers, json={"favorites": [ids[2], ids[0], ids[1]]})
+    response = api.put("/api/favorites", headers=auth_headers,
+                       json={"add": [ids[4], ids[0], ids[3], ids[4]], "remove": [ids[1], ids[3]]})
+    # Existing favorites keep their place, new ones follow in the order given
+    assert response.json()["favorites"] == [ids[2], ids[0], ids[4]]
+    assert [t["id"] for t in api.get("/api/favorites", headers=auth_headers).json()["tools"]] == [ids[2], ids[0], ids[4]]
+
+
+def test_views_and_clicks_are_flushed_in_one_batch(api, stores):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    for _ in range(3):
+        api.get(f"/api/tools/{tool_id}")
+    assert api.post(f"/api/tools/{tool_id}/click").status_code == 204
+    assert api.post("/api/tools/missing/click").status_code == 404
+    assert api.get(f"/api/tools/{tool_id}").json()["views"] == 0
+
+    assert api.portal.call(server.tool_counters.flush) == 1
+    tool = api.get(f"/api/tools/{tool_id}").json()
+    assert (tool["views"], tool["clicks"]) == (4, 1)
+    # The in-memory listings follow the flushed counts
+    api.portal.call(server.tool_counters.flush)
+    listed = next(t for t in api.get("/api/tools").json() if t["id"] == tool_id)
+    searched = next(t for t in api.get("/api/tools/search").json()["tools"] if t["id"] == tool_id)
+    assert (listed["views"], listed["clicks"]) == (searched["views"], searched["clicks"]) == (5, 1)
+
+
+def test_tool_counters_stay_bounded_and_keep_counts_of_failed_flushes(stores):
+    class FlakyTools:
+        def __init__(self):
+            self.fail, self.written = True, {}
+
+        async def increment_counters(self, counts):
+            if self.fail:
+                raise ConnectionError("primary stepped down")
+            self.written.update(counts)
+            # The second tool's operation was rejected by the server
+            return ["b"]
+
+    tools = FlakyTools()
+    counters = ToolCounters(tools, max_pending=2)
+    assert counters.record("a", "views") and counters.record("b", "clicks", 2)
+    assert not counters.record("c", "views")
+    assert counters.record("a", "views")
+
+    async def scenario():
+        try:
+            await counters.flush()
+        except ConnectionError:
+            pass
+        assert len(counters) == 2
+        tools.fail = False
+        assert await counters.flush() == 1
+
+    asyncio.run(scenario())
+    assert tools.written["a"] == {"views": 2, "clicks": 0}
+    assert list(counters._pending) == ["b"] and counters._pending["b"]["clicks"] == 2
+
+
+def test_tool_counters_flush_early_to_bound_what_a_kill_loses():
+    class RecordingTools:
+        def __init__(self):
+            self.writes = []
+
+        async def increment_counters(self, counts):
+            self.writes.append(counts)
+            return []
+
+    tools = RecordingTools()
+    counters = ToolCounters(tools, interval=60, flush_events=5)
+
+    async def scenario():
+        runner = asyncio.create_task(counters.run())
+        for _ in range(4):
+            counters.record("a", "views")
+        await asyncio.sleep(0.01)
+        # Below the threshold nothing is written until the interval
+        assert tools.writes == [] and counters.pending_events == 4
+        counters.record("b", "clicks")
+        await asyncio.sleep(0.01)
+        assert tools.writes == [{"a": {"views": 4, "clicks": 0}, "b": {"views": 0, "clicks": 1}}]
+        assert counters.pending_events == 0
+        runner.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_review_updates_rating(api, auth_headers):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    response = api.post("/api/reviews", headers=auth_headers, json={"tool_id": tool_id, "rating": 4, "comment": "Good"})
+    assert response.status_code == 200
+    assert api.post("/api/reviews", headers=auth_headers, json={
+        "tool_id": tool_id, "rating": 5, "comment": "Again"
+    }).status_code == 400
+    assert api.post("/api/reviews", headers=auth_headers, json={
+        "tool_id": "missing", "rating": 5, "comment": "?"
+    }).status_code == 404
+
+    tool = api.get(f"/api/tools/{tool_id}").json()
+    assert tool["rating"] == 4.0
+    assert tool["review_count"] == 1
+    assert [r["comment"] for r in api.get(f"/api/tools/{tool_id}/reviews").json()] == ["Good"]
+
+
+def test_memory_store_platform_union_keeps_catalog_order(stores):
+    async def scenario():
+        await stores.tools.insert_many([
+            {"id": "a", "name": "A", "description": "", "category": "x", "platforms": ["Mobile"], "tags": []},
+            {"id": "b", "name": "B", "description": "", "category": "x", "platforms": ["Web"], "tags": []},
+            {"id": "c", "name": "C", "description": "", "category": "y", "platforms": ["Web", "Mobile"], "tags": []},
+        ])
+        return await stores.tools.find(platforms=["Web", "Mobile"])
+
+    assert [t["id"] for t in asyncio.run(scenario())] == ["a", "b", "c"]
+
+
+def test_health_probes(api, monkeypatch):
+    assert api.get("/healthz").json() == {"status": "alive"}
+    ready = api.get("/readyz")
+    assert ready.status_code == 200
+    assert ready.json()["checks"]["catalog"] == {"ok": True, "tools": 5, "error": None}
+    assert ready.json()["import_seconds"] > 0
+
+    pings = []
+
+    async def failing_ping():
+        pings.append(1)
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(server, "mongo_ping", CachedPing("mongo", failing_ping, ttl=60))
+    first = api.get("/readyz")
+    second = api.get("/readyz")
+    assert first.status_code == second.status_code == 503
+    assert second.json()["checks"]["mongo"] == {"ok": False, "error": "ConnectionError: mongo down", "cached": True}
+    assert len(pings) == 1
+
+    monkeypatch.setitem(server.startup_state, "catalog_loaded", False)
+    monkeypatch.setattr(server, "mongo_ping", None)
+    assert api.get("/readyz").status_code == 503
+
+
+def test_import_defers_heavy_dependencies():
+    backend = Path(__file__).resolve().parent.parent / "backend"
+    code = "import sys, server; print('openai' in sys.modules, server.pwd_context.built)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True,
+                            env={**os.environ, "STORAGE": "memory"}, check=True)
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_loop_watchdog_captures_the_blocking_stack():
+    def hash_synchronously():
+        time.sleep(0.3)
+
+    async def blocking_handler():
+        hash_synchronously()
+
+    async def scenario():
+        async with LoopWatchdog(threshold_ms=100, interval=0.02) as watchdog:
+            await asyncio.sleep(0.05)
+            assert not watchdog.stalls
+            await asyncio.create_task(blocking_handler(), name="register")
+            await asyncio.sleep(0.05)
+        return watchdog
+
+    watchdog = asyncio.run(scenario())
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert stall["task"] == "register"
+    assert "hash_synchronously" in stall["stack"]
+    assert stall["duration_ms"] >= 200
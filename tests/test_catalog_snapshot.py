@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime
+
+import server
+from catalog_snapshot import CatalogSnapshot, CatalogSnapshotManager, read_snapshot_version, write_snapshot
+
+
+def make_tools(count, prefix="Tool"):
+    return [{"id": f"{prefix.lower()}-{i}", "name": f"{prefix} {i}", "tags": ["x"], "rating": 4.0,
+             "created_at": datetime(2024, 1, 1)} for i in range(count)]
+
+
+def test_snapshot_round_trip_and_atomic_replace(tmp_path):
+    path = tmp_path / "catalog.snap"
+    write_snapshot(path, make_tools(500), catalog_version=3)
+    old = CatalogSnapshot(path)
+    assert (old.version, len(old)) == (3, 500)
+    assert old.get("tool-123")["name"] == "Tool 123"
+    assert old.get("tool-123")["created_at"] == "2024-01-01T00:00:00"
+    assert old.get("missing") is None
+    assert [tool["id"] for tool in old][:3] == ["tool-0", "tool-1", "tool-2"]
+
+    write_snapshot(path, make_tools(2, prefix="New"), catalog_version=4)
+    assert read_snapshot_version(path) == 4
+    # A worker still mapping the previous file keeps reading it until it swaps
+    assert old.get("tool-499")["name"] == "Tool 499"
+    assert [tool["name"] for tool in CatalogSnapshot(path)] == ["New 0", "New 1"]
+
+
+def test_one_worker_builds_and_the_rest_map_it(tmp_path):
+    path = tmp_path / "catalog.snap"
+    state = {"version": 1, "tools": make_tools(10)}
+    builds = []
+
+    async def fetch_version():
+        return state["version"]
+
+    async def fetch_tools():
+        builds.append(state["version"])
+        await asyncio.sleep(0.05)
+        return list(state["tools"])
+
+    async def scenario():
+        workers = [CatalogSnapshotManager(path, fetch_version, fetch_tools, poll_interval=0.05) for _ in range(4)]
+        snapshots = await asyncio.gather(*(worker.load() for worker in workers))
+        assert builds == [1]
+        assert {snapshot.version for snapshot in snapshots} == {1}
+
+        state["version"], state["tools"] = 2, make_tools(11)
+        tasks = [asyncio.create_task(worker.run()) for worker in workers]
+        await asyncio.sleep(0.3)
+        for task in tasks:
+            task.cancel()
+        assert builds == [1, 2]
+        assert {len(worker.snapshot) for worker in workers} == {11}
+
+    asyncio.run(scenario())
+
+
+def test_server_builds_indexes_from_snapshot(stores, monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    manager = CatalogSnapshotManager(tmp_path / "catalog.snap", stores.tools.catalog_version, stores.tools.all,
+                                     poll_interval=0.05, on_swap=server.on_snapshot_swap)
+    monkeypatch.setattr(server, "catalog_snapshots", manager)
+
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 5
+        while client.get("/readyz").json()["checks"]["catalog"].get("snapshot_version") is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        version = manager.snapshot.version
+        token = client.post("/api/register", json={
+            "email": "snap@example.com", "username": "snap", "password": "SnapPass123!"
+        }).json()["access_token"]
+        client.post("/api/tools", headers={"Authorization": f"Bearer {token}"}, json={
+            "name": "Snapshot Tool", "description": "d", "category": "Testing",
+            "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+        })
+        while manager.snapshot.version == version:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert manager.snapshot.version == version + 1
+        assert any(tool["name"] == "Snapshot Tool" for tool in manager.snapshot)
+        assert [s["name"] for s in client.get("/api/tools/suggest", params={"q": "snaps"}).json()["suggestions"]] == [
+            "Snapshot Tool"
+        ]
+
+        # Reviews do not bump the catalog version: the rating they set survives the next swap
+        tool_id = next(tool["id"] for tool in manager.snapshot if tool["name"] == "Snapshot Tool")
+        client.post("/api/reviews", headers={"Authorization": f"Bearer {token}"},
+                    json={"tool_id": tool_id, "rating": 2, "comment": "Meh"})
+        assert manager.snapshot.get(tool_id)["rating"] == 0
+        deadline = time.monotonic() + 5
+        while server.suggest_index.score(tool_id) != (2.0, 1):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        client.post("/api/tools", headers={"Authorization": f"Bearer {token}"}, json={
+            "name": "Another Tool", "description": "d", "category": "Testing",
+            "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+        })
+        while manager.snapshot.version == version + 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert server.suggest_index.score(tool_id) == (2.0, 1)
+        tool = client.get(f"/api/tools/{tool_id}").json()
+        assert (tool["name"], tool["rating"], tool["review_count"]) == ("Snapshot Tool", 2.0, 1)
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import server
+from invalidation import InvalidationBus, MemoryInvalidationLog
+from metrics import metrics
+
+
+def test_other_workers_apply_events_once_and_skip_their_own():
+    async def scenario():
+        log = MemoryInvalidationLog()
+        writer, reader = InvalidationBus(log, worker_id="a"), InvalidationBus(log, worker_id="b")
+        seen = {"a": [], "b": []}
+        writer.subscribe("catalog", lambda key, event: seen["a"].append(key))
+        reader.subscribe("catalog", lambda key, event: seen["b"].append(key))
+        await writer.start()
+        await reader.start()
+
+        await writer.publish("catalog", "tool-1")
+        await writer.publish("user", "user-1")
+        await writer.publish("catalog", "tool-2")
+        await reader.poll_once()
+        await writer.poll_once()
+        await reader.poll_once()
+        assert seen == {"a": [], "b": ["tool-1", "tool-2"]}
+        assert reader.version == writer.version == 3
+
+    applied = metrics.get_counter("invalidations_applied_total", topic="catalog")
+    asyncio.run(scenario())
+    assert metrics.get_counter("invalidations_applied_total", topic="catalog") == applied + 2
+    assert any(key.startswith("invalidation_lag_ms") for key in metrics.snapshot()["histograms"])
+
+
+def test_a_gap_that_never_fills_resets_local_state():
+    async def scenario():
+        log = MemoryInvalidationLog()
+        bus = InvalidationBus(log, worker_id="b", gap_timeout=0.05)
+        resets = []
+
+        async def reset():
+            resets.append(bus.version)
+
+        bus.on_reset(reset)
+        await bus.start()
+        # A publisher died between allocating version 1 and writing its event
+        log.allocate()
+        await log.append("catalog", "tool-2", "a")
+        await bus.poll_once()
+        assert bus.version == 0 and not resets
+        await asyncio.sleep(0.06)
+        await bus.poll_once()
+        assert resets == [2] and bus.version == 2
+
+    asyncio.run(scenario())
+
+
+class StreamingLog(MemoryInvalidationLog):
+    supports_change_streams = True
+
+    def __init__(self):
+        super().__init__()
+        self.stream = asyncio.Queue()
+
+    def watch(self):
+        log = self
+
+        class Stream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                return await log.stream.get()
+
+        return Stream()
+
+
+def test_a_quiet_change_stream_still_resets_after_a_gap():
+    async def scenario():
+        log = StreamingLog()
+        bus = InvalidationBus(log, worker_id="b", poll_interval=0.01, gap_timeout=0.05)
+        resets = []
+
+        async def reset():
+            resets.append(bus.version)
+
+        bus.on_reset(reset)
+        await bus.start()
+        runner = asyncio.create_task(bus.run())
+        await asyncio.sleep(0.02)
+        assert bus.mode == "change_stream"
+        log.allocate()
+        await log.stream.put(await log.append("catalog", "tool-2", "a"))
+        # No further events arrive: the timer notices the gap has timed out
+        deadline = time.monotonic() + 2
+        while not resets:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        runner.cancel()
+        assert resets == [2] and bus.version == 2
+
+    asyncio.run(scenario())
+
+
+def test_logs_without_change_streams_are_polled():
+    async def scenario():
+        bus = InvalidationBus(MemoryInvalidationLog(), worker_id="b", poll_interval=0.01)
+        await bus.start()
+        runner = asyncio.create_task(bus.run())
+        await asyncio.sleep(0.02)
+        runner.cancel()
+        assert bus.mode == "polling"
+
+    asyncio.run(scenario())
+
+
+def test_server_picks_up_tools_written_by_another_worker(api, stores):
+    tool = {"id": "remote-tool", "name": "Remote Writer", "description": "Written elsewhere", "category": "Writing",
+            "platforms": ["Web"], "pricing": "Free", "url": "https://example.com", "tags": ["remote"],
+            "rating": 4.0, "review_count": 0}
+    other_worker = InvalidationBus(server.invalidation_bus.log, worker_id="other")
+    api.portal.call(stores.tools.insert, tool)
+    api.portal.call(other_worker.publish, "catalog", "remote-tool")
+
+    deadline = time.monotonic() + 2
+    while not api.get("/api/tools/suggest", params={"q": "remo"}).json()["suggestions"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert api.get("/api/tools/suggest", params={"q": "remo"}).json()["suggestions"][0]["id"] == "remote-tool"
+
+
+def test_remote_deletes_leave_the_trending_set(api, stores):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    api.post(f"/api/tools/{tool_id}/click")
+    assert api.get("/api/tools/trending").json()[0]["id"] == tool_id
+    other_worker = InvalidationBus(server.invalidation_bus.log, worker_id="other")
+    api.portal.call(stores.tools.delete, tool_id)
+    api.portal.call(other_worker.publish, "catalog", tool_id)
+
+    deadline = time.monotonic() + 2
+    while tool_id in dict(server.trending_tools.top(server.TRENDING_K)):
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert tool_id not in [tool["id"] for tool in api.get("/api/tools/trending").json()]
@@ -0,0 +1,115 @@
+import json
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import server
+from metrics import MetricsRegistry
+from mongo_monitoring import (CommandCounter, PoolMetricsListener, begin_command_tracking, current_command_stats,
+                              end_command_tracking)
+from profiling import ProfilingMiddleware, list_profiles, load_profile
+
+
+def profiled_app(output_dir, **options):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(i * i for i in range(1000))}
+
+    app.add_middleware(ProfilingMiddleware, output_dir=output_dir, admin_token="secret", **options)
+    return app
+
+
+def test_profiles_only_flagged_requests_with_a_valid_token(tmp_path):
+    client = TestClient(profiled_app(tmp_path, max_profiles=2))
+    client.get("/work")
+    client.get("/work", headers={"X-Profile": "true", "X-Admin-Token": "wrong"})
+    assert list_profiles(tmp_path) == []
+
+    for _ in range(3):
+        assert client.get("/work", headers={"X-Profile": "true", "X-Admin-Token": "secret"}).status_code == 200
+    profiles = list_profiles(tmp_path)
+    # Pruned to max_profiles, newest first
+    assert len(profiles) == 2 and len(list(tmp_path.glob("*.prof"))) == 2
+    assert profiles[0]["id"] > profiles[1]["id"]
+    assert profiles[0]["path"] == "/work" and profiles[0]["status_code"] == 200
+    assert "top_functions" not in profiles[0]
+
+    profile = load_profile(tmp_path, profiles[0]["id"])
+    assert profile["route"] == "work"
+    assert "cumulative" in profile["stats"]
+    assert any("work" in row["function"] for row in profile["top_functions"])
+
+
+def test_sample_rate_profiles_without_headers(tmp_path):
+    client = TestClient(profiled_app(tmp_path, sample_rate=1.0))
+    client.get("/work")
+    assert len(list_profiles(tmp_path)) == 1
+
+
+def test_load_profile_stays_inside_the_profile_directory(tmp_path):
+    profiles, outside = tmp_path / "profiles", tmp_path / "secret"
+    profiles.mkdir()
+    outside.mkdir()
+    (outside / "leak.json").write_text(json.dumps({"id": "leak"}))
+    assert load_profile(profiles, "../secret/leak") is None
+    assert load_profile(profiles, "missing") is None
+    (profiles / "broken.json").write_text("{")
+    assert list_profiles(profiles) == []
+
+
+def test_admin_profile_endpoints(api, monkeypatch, tmp_path):
+    client = TestClient(profiled_app(tmp_path))
+    client.get("/work", headers={"X-Profile": "true", "X-Admin-Token": "secret"})
+    profile_id = list_profiles(tmp_path)[0]["id"]
+    monkeypatch.setattr(server, "PROFILE_DIR", tmp_path)
+
+    assert api.get("/api/admin/profiles").status_code == 403
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "admin")
+    assert api.get("/api/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+    headers = {"X-Admin-Token": "admin"}
+    listing = api.get("/api/admin/profiles", headers=headers).json()
+    assert [profile["id"] for profile in listing["profiles"]] == [profile_id]
+    assert api.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()["path"] == "/work"
+    assert api.get("/api/admin/profiles/..%2F..%2Fetc", headers=headers).status_code == 404
+
+
+def test_command_counter_attributes_commands_to_the_tracked_request():
+    counter = CommandCounter()
+    counter.succeeded(SimpleNamespace(duration_micros=500))
+    token = begin_command_tracking()
+    try:
+        counter.succeeded(SimpleNamespace(duration_micros=1500))
+        counter.failed(SimpleNamespace(duration_micros=500))
+        stats = current_command_stats()
+        assert (stats.count, stats.failures, stats.duration_ms) == (2, 1, 2.0)
+    finally:
+        end_command_tracking(token)
+    assert current_command_stats() is None
+
+
+def test_pool_listener_tracks_connections_and_checkouts():
+    registry = MetricsRegistry()
+    listener = PoolMetricsListener(registry)
+    address = ("db", 27017)
+    event = SimpleNamespace(address=address, reason="idle", options={"maxPoolSize": 5})
+    listener.pool_created(event)
+    listener.connection_created(event)
+    listener.connection_check_out_started(event)
+    assert registry.get_gauge("mongo_pool_wait_queue", address="db:27017") == 1
+    listener.connection_checked_out(event)
+    assert registry.get_gauge("mongo_pool_wait_queue", address="db:27017") == 0
+    assert registry.get_gauge("mongo_pool_in_use", address="db:27017") == 1
+    listener.connection_checked_in(event)
+    listener.connection_check_out_started(event)
+    listener.connection_check_out_failed(SimpleNamespace(address=address, reason="timeout"))
+    listener.connection_closed(event)
+
+    assert registry.get_gauge("mongo_pool_max_size", address="db:27017") == 5
+    assert registry.get_gauge("mongo_pool_in_use", address="db:27017") == 0
+    assert registry.get_gauge("mongo_pool_connections", address="db:27017") == 0
+    assert registry.get_counter("mongo_pool_checkout_failures_total", reason="timeout") == 1
+    assert registry.get_counter("mongo_pool_connections_closed_total", reason="idle") == 1
+    assert any(key.startswith("mongo_pool_checkout_wait_ms") for key in registry.snapshot()["histograms"])
@@ -0,0 +1,32 @@
+import json
+
+from prompting import encode_tools_table, estimate_tokens
+
+
+def _tool(i):
+    return {
+        "name": f"Tool {i}",
+        "description": "AI-powered coding assistant with intelligent code completion",
+        "category": "Development",
+        "platforms": ["Web", "Desktop"],
+        "features": ["Code completion", "Debugging support"],
+        "pricing": "Free | Pro",
+        "rating": 4.5,
+    }
+
+
+def test_table_respects_token_budget():
+    tools = [_tool(i) for i in range(100)]
+    table, included, used = encode_tools_table(tools, budget_tokens=500)
+    assert 0 < len(included) < len(tools)
+    assert used <= 500
+    assert len(table.splitlines()) == len(included) + 1
+    # Cell separators inside values must not break the column layout
+    assert all(line.count("|") == 6 for line in table.splitlines())
+
+
+def test_table_is_smaller_than_indented_json():
+    tools = [_tool(i) for i in range(20)]
+    table, included, _ = encode_tools_table(tools, budget_tokens=10_000)
+    assert len(included) == 20
+    assert estimate_tokens(table) < estimate_tokens(json.dumps(tools, indent=2)) * 0.7
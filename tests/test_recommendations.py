@@ -0,0 +1,388 @@
+import asyncio
+import random
+import time
+
+import numpy as np
+import pytest
+
+import server
+from circuit_breaker import CircuitBreaker
+from jobs import JobQueue, JobQueueFull
+from metrics import metrics
+from personalization import build_item_similarity
+from prompting import encode_tools_table, pack_requirements
+from ranking import shard_by_budget
+from semantic_cache import SemanticCache
+from storage import MemoryJobStore
+
+
+def _catalog(n):
+    return [
+        {"id": str(i), "name": f"Tool {i}", "description": "Synthetic tool used for ranking tests",
+         "category": "Development", "platforms": ["Web"], "features": ["A", "B"],
+         "pricing": "Free", "rating": 4.0 + (i % 10) / 10, "tags": []}
+        for i in range(n)
+    ]
+
+
+def test_small_catalog_uses_single_prompt(fake_llm):
+    result = asyncio.run(server.get_ai_recommendations("coding", _catalog(5)))
+    assert len(fake_llm.calls) == 1
+    assert len(result["match_scores"]) == 5
+
+
+def test_large_catalog_is_sharded_and_merged(fake_llm, monkeypatch):
+    # About 5,800 tokens of rows: four shards that each fit the budget
+    monkeypatch.setattr(server, "LLM_PROMPT_TOKEN_BUDGET", 1700)
+    fake_llm.score = lambda requirements, name: 99.0 if name == "Tool 137" else 40.0
+    fake_llm.delay = 0.05
+    result = asyncio.run(server.get_ai_recommendations("coding", _catalog(200)))
+
+    assert 1 < len(fake_llm.calls) <= server.LLM_MAX_SHARDS
+    # Every candidate is scored in exactly one shard, none is truncated from its prompt
+    assert sum(call.count("\nTool ") for call in fake_llm.calls) == 200
+    # The best tool of one shard survives the merge at the top
+    assert result["recommended_tools"][0] == "Tool 137"
+    assert len(result["match_scores"]) > 20
+
+
+def test_shards_run_in_bounded_waves_and_cuts_are_counted(fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "LLM_PROMPT_TOKEN_BUDGET", 400)
+    # 200 tools need about 17 shards of this size: 6 are allowed, 2 at a time
+    monkeypatch.setattr(server, "LLM_MAX_SHARDS", 6)
+    monkeypatch.setattr(server, "LLM_SHARD_CONCURRENCY", 2)
+    fake_llm.delay = 0.1
+    dropped = metrics.get_counter("llm_shard_tools_dropped_total")
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await server.get_ai_recommendations("coding", _catalog(200))
+        return loop.time() - started
+
+    elapsed = asyncio.run(timed())
+    assert len(fake_llm.calls) == 6
+    assert 0.1 * 3 <= elapsed < 0.1 * 4
+    scored = sum(call.count("\nTool ") for call in fake_llm.calls)
+    assert metrics.get_counter("llm_shard_tools_dropped_total") == dropped + 200 - scored
+
+
+def test_shards_fit_their_budget():
+    tools = _catalog(150)
+    shards = shard_by_budget(tools, budget_tokens=500, max_shards=100)
+    assert sum(len(shard) for shard in shards) == 150
+    for shard in shards:
+        assert len(encode_tools_table(shard, 500)[1]) == len(shard)
+    # Capped: the best-rated tools are kept
+    kept = [tool for shard in shard_by_budget(tools, 500, 2) for tool in shard]
+    ratings = sorted((tool["rating"] for tool in tools), reverse=True)
+    assert sorted((tool["rating"] for tool in kept), reverse=True) == ratings[:len(kept)]
+
+
+def test_rerank_pass_orders_finalists(fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "LLM_PROMPT_TOKEN_BUDGET", 400)
+    monkeypatch.setattr(server, "LLM_RERANK_TOP_N", 5)
+    fake_llm.score = lambda requirements, name: float(int(name.split()[1]) % 97)
+    result = asyncio.run(server.get_ai_recommendations("coding", _catalog(200)))
+    # Last call is the re-rank over the merged top 5
+    assert fake_llm.calls[-1].count("\nTool ") == 5
+    assert len(result["recommended_tools"]) > 5
+
+
+def test_llm_failure_falls_back_to_local_ranking(fake_llm):
+    fake_llm.fail = True
+    catalog = _catalog(3)
+    catalog[2]["description"] = "Image generation from text prompts"
+    result = asyncio.run(server.get_ai_recommendations("generate images", catalog))
+    assert result["fallback"] is True
+    assert result["recommended_tools"][0] == "Tool 2"
+
+
+def test_breaker_opens_and_short_circuits(fake_llm, monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(server, "llm_breaker", breaker)
+    fake_llm.fail = True
+    for _ in range(2):
+        asyncio.run(server.get_ai_recommendations("coding", _catalog(3)))
+    assert breaker.state == "open"
+
+    fake_llm.fail = False
+    result = asyncio.run(server.get_ai_recommendations("coding", _catalog(3)))
+    assert result["fallback"] is True
+    assert len(fake_llm.calls) == 2
+
+
+def test_breaker_half_open_probe_closes_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=1, slow_call_ms=100, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] = 11
+    assert breaker.allow_request()
+    # Only one probe at a time while half-open
+    assert not breaker.allow_request()
+    breaker.record_success(latency_ms=500)
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow_request()
+    breaker.record_success(latency_ms=50)
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_returns_local_ranking_and_caches_llm_answer(fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "LLM_HEDGE_DEADLINE_SECONDS", 0.05)
+    fake_llm.delay = 0.2
+
+    async def scenario():
+        hedged = await server.get_cached_ai_recommendations("coding", [], _catalog(3), 1)
+        await asyncio.sleep(0.3)
+        cached = await server.get_cached_ai_recommendations("coding", [], _catalog(3), 1)
+        return hedged, cached
+
+    hedged, cached = asyncio.run(scenario())
+    assert hedged["fallback"] is True
+    assert "fallback" not in cached
+    assert len(fake_llm.calls) == 1
+
+
+def test_recommendations_are_cached_per_catalog_version(api, auth_headers, fake_llm):
+    request = {"requirements": "AI for coding", "preferred_platforms": ["Web"]}
+    first = api.post("/api/recommendations", headers=auth_headers, json=request).json()
+    # Normalization makes trivially different phrasing share the cached answer
+    second = api.post("/api/recommendations", headers=auth_headers, json={
+        "requirements": "  ai for   CODING. ", "preferred_platforms": ["Web"]
+    }).json()
+    assert second == first
+    assert len(fake_llm.calls) == 1
+
+    api.post("/api/tools", headers=auth_headers, json={
+        "name": "New Tool", "description": "d", "category": "Development",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    })
+    api.post("/api/recommendations", headers=auth_headers, json=request)
+    assert len(fake_llm.calls) == 2
+    assert server.recommendation_cache.stats()["memory_hits"] == 1
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    from llm_cache import DiskResultCache, RecommendationCache
+
+    async def scenario():
+        first = RecommendationCache(DiskResultCache(tmp_path / "cache.sqlite3", 60), ttl_seconds=60)
+        await first.setup()
+        await first.set("key", {"recommended_tools": ["A"]})
+
+        restarted = RecommendationCache(DiskResultCache(tmp_path / "cache.sqlite3", 60), ttl_seconds=60)
+        await restarted.setup()
+        return await restarted.get("key"), restarted.stats()
+
+    value, stats = asyncio.run(scenario())
+    assert value == {"recommended_tools": ["A"]}
+    assert stats["persistent_hits"] == 1
+
+
+def test_warmer_precomputes_popular_queries(api, auth_headers, fake_llm):
+    for requirements in ["coding assistant", "Coding assistant", "image generation"]:
+        api.post("/api/recommendations", headers=auth_headers, json={"requirements": requirements})
+    assert len(fake_llm.calls) == 2
+
+    # A catalog change invalidates every cached answer; the warmer recomputes the head queries
+    api.post("/api/tools", headers=auth_headers, json={
+        "name": "New Tool", "description": "d", "category": "Development",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    })
+    computed = asyncio.run(server.recommendation_warmer.warm())
+    assert computed == 2
+    assert asyncio.run(server.query_stats.top(1))[0] == {"requirements": "coding assistant", "platforms": [], "count": 2}
+
+    api.post("/api/recommendations", headers=auth_headers, json={"requirements": "coding assistant"})
+    assert len(fake_llm.calls) == 4
+
+
+def test_semantic_cache_serves_paraphrases(api, auth_headers, fake_llm):
+    first = api.post("/api/recommendations", headers=auth_headers, json={"requirements": "AI for coding"}).json()
+    paraphrase = api.post("/api/recommendations", headers=auth_headers, json={
+        "requirements": "I need help writing code"
+    }).json()
+    assert paraphrase == first
+    assert len(fake_llm.calls) == 1
+
+    api.post("/api/recommendations", headers=auth_headers, json={"requirements": "image generation"})
+    # Same question scoped to a different platform filter is not a near-duplicate
+    api.post("/api/recommendations", headers=auth_headers, json={
+        "requirements": "coding AI tool", "preferred_platforms": ["Web"]
+    })
+    assert len(fake_llm.calls) == 3
+
+
+def test_semantic_cache_ring_buffer_evicts_oldest():
+    cache = SemanticCache(capacity=2, threshold=0.99)
+    cache.add("coding assistant", 1, {"n": 1})
+    cache.add("image generation", 1, {"n": 2})
+    cache.add("video editing", 1, {"n": 3})
+    assert cache.lookup("coding assistant", 1) is None
+    assert cache.lookup("image generation", 1)[0] == {"n": 2}
+    assert cache.lookup("video editing", 2) is None
+
+
+def test_semantic_cache_pruned_lookup_matches_a_full_scan():
+    rnd = random.Random(5)
+    vocab = ("write code blog post marketing social media captions business transcribe podcast audio video edit image "
+             "logo design summarize research papers email sales support legal contract music voice slides").split()
+    cache = SemanticCache(capacity=2000, threshold=0.8, block_rows=256)
+    for i in range(2000):
+        cache.add(" ".join(rnd.sample(vocab, rnd.randint(3, 8))), i % 2, {"i": i})
+    hits = 0
+    for _ in range(200):
+        indices, values = cache.vectorizer.sparse(" ".join(rnd.sample(vocab, rnd.randint(3, 8))))
+        scope = rnd.randint(0, 1)
+        full = cache.matrix[:cache.size] @ np.bincount(indices, weights=values, minlength=256).astype(np.float32)
+        full[cache.scopes[:cache.size] != scope] = -1.0
+        match = cache.best_match(indices, values, scope)
+        if full.max() >= cache.threshold:
+            hits += 1
+            assert match[1] == pytest.approx(float(full.max()), abs=1e-5)
+        else:
+            assert match is None
+    assert hits
+
+
+def test_recommendation_job_runs_in_background(api, auth_headers, fake_llm):
+    fake_llm.score = lambda requirements, name: 95.0 if name == "GitHub Copilot" else 40.0
+    response = api.post("/api/recommendations/jobs", json={"requirements": "pair programming"},
+                        headers=auth_headers)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] == "queued"
+
+    deadline = time.monotonic() + 5
+    while (job := api.get(f"/api/recommendations/jobs/{job_id}", headers=auth_headers).json())["status"] in (
+            "queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert job["status"] == "succeeded"
+    assert job["result"]["tools"][0]["name"] == "GitHub Copilot"
+    assert job["started_at"] and job["finished_at"]
+    assert api.get("/api/recommendations/jobs/missing", headers=auth_headers).status_code == 404
+
+
+def test_job_queue_is_bounded_and_records_expire():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def run(job):
+            await release.wait()
+            return {"requirements": job["request"]["requirements"]}
+
+        store = MemoryJobStore()
+        queue = JobQueue(store, run, workers=1, max_queued=1, ttl_seconds=0.2)
+        workers = queue.start()
+        first = await queue.submit("user-1", {"requirements": "first"})
+        await asyncio.sleep(0)  # the worker takes the first job
+        await queue.submit("user-1", {"requirements": "second"})
+        with pytest.raises(JobQueueFull):
+            await queue.submit("user-1", {"requirements": "third"})
+
+        assert (await queue.get(first["id"]))["status"] == "running"
+        assert await queue.get(first["id"], owner_id="someone-else") is None
+        release.set()
+        await queue.queue.join()
+        assert (await queue.get(first["id"]))["result"] == {"requirements": "first"}
+        await asyncio.sleep(0.25)
+        assert await queue.get(first["id"]) is None
+        for worker in workers:
+            worker.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_batch_packs_requirements_into_shared_prompts(api, auth_headers, fake_llm, monkeypatch):
+    monkeypatch.setattr(server, "LLM_BATCH_MAX_REQUIREMENTS", 3)
+    fake_llm.score = lambda requirements, name: 90.0 if name.split()[0].lower() in requirements else 30.0
+    items = [{"requirements": f"{name} for client {i}"} for i, name in enumerate(
+        ["chatgpt", "midjourney", "grammarly", "github", "dall-e", "chatgpt"])]
+    items.append({"requirements": "chatgpt for client 0"})
+    items.append({"requirements": "anything", "preferred_platforms": ["Nowhere"]})
+
+    response = api.post("/api/recommendations/batch", json={"items": items}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == len(items)
+    # 6 distinct requirements with candidates, 3 per prompt
+    assert len(fake_llm.calls) == 2
+    assert all(call.startswith("User requirements (") for call in fake_llm.calls)
+    assert results[1]["tools"][0]["name"] == "Midjourney"
+    assert results[6] == results[0]
+    assert results[7]["tools"] == []
+
+    # Answers are cached like single requests
+    single = api.post("/api/recommendations", json=items[2], headers=auth_headers).json()
+    assert single == results[2]
+    assert len(fake_llm.calls) == 2
+
+    # A repeated batch looks every distinct request up concurrently and makes no LLM call
+    in_flight, peak = 0, 0
+    cache_get = server.recommendation_cache.get
+
+    async def slow_get(key):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await cache_get(key)
+
+    monkeypatch.setattr(server.recommendation_cache, "get", slow_get)
+    assert api.post("/api/recommendations/batch", json={"items": items}, headers=auth_headers).json() == results
+    assert peak == 6 and len(fake_llm.calls) == 2
+
+
+def test_pack_requirements_respects_budget_and_size():
+    groups = pack_requirements(["a b c"] * 5, table_tokens=100, budget_tokens=1100,
+                               completion_tokens_per_item=300, max_per_prompt=4)
+    assert groups == [[0, 1, 2], [3, 4]]
+    assert pack_requirements(["x"] * 3, 100, 1000, 10, 2) == [[0, 1], [2]]
+
+
+def test_item_similarity_matches_brute_force_cosine():
+    pairs = [(f"u{i % 40}", f"t{(i * 7) % 13}") for i in range(300)] + [("u1", "t1"), ("u2", "t99")]
+    model = build_item_similarity(pairs, neighbors=100, chunk_pairs=20)
+    liked = {}
+    for user, tool in pairs:
+        liked.setdefault(user, set()).add(tool)
+    popularity = {}
+    for tools in liked.values():
+        for tool in tools:
+            popularity[tool] = popularity.get(tool, 0) + 1
+    for tool in ("t0", "t5", "t99"):
+        expected = {}
+        for tools in liked.values():
+            if tool in tools:
+                for other in tools - {tool}:
+                    expected[other] = expected.get(other, 0) + 1
+        expected = {other: count / (popularity[tool] * popularity[other]) ** 0.5 for other, count in expected.items()}
+        neighbours = dict(model.neighbors(tool))
+        assert neighbours.keys() == expected.keys()
+        assert all(abs(neighbours[other] - expected[other]) < 1e-6 for other in expected)
+    assert all(tool not in liked["u3"] for tool, _ in model.recommend("u3", limit=20))
+
+
+def test_for_me_recommends_tools_liked_together(api, auth_headers):
+    tools = {tool["name"]: tool["id"] for tool in api.get("/api/tools").json()}
+    for index, liked in enumerate([["ChatGPT", "Midjourney"], ["ChatGPT", "Midjourney"], ["ChatGPT", "Cursor AI"]]):
+        token = api.post("/api/register", json={
+            "email": f"fan{index}@example.com", "username": f"fan{index}", "password": "pw"
+        }).json()["access_token"]
+        for name in liked:
+            api.post(f"/api/favorites/{tools[name]}", headers={"Authorization": f"Bearer {token}"})
+
+    cold = api.get("/api/recommendations/for-me", headers=auth_headers).json()
+    assert cold["match_scores"] == {} and cold["tools"]
+
+    api.post(f"/api/favorites/{tools['ChatGPT']}", headers=auth_headers)
+    api.portal.call(server.item_similarity.rebuild)
+    personal = api.get("/api/recommendations/for-me", headers=auth_headers).json()
+    assert [tool["name"] for tool in personal["tools"]] == ["Midjourney", "Cursor AI"]
+    assert personal["match_scores"]["Midjourney"] > personal["match_scores"]["Cursor AI"]
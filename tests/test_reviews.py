@@ -0,0 +1,130 @@
+import asyncio
+import random
+from datetime import timedelta
+
+import httpx
+import pytest
+
+import server
+
+
+async def _register_reviewers(stores, count):
+    headers = []
+    for i in range(count):
+        user = server.User(email=f"reviewer{i}@example.com", username=f"reviewer{i}", hashed_password="x")
+        await stores.users.insert(user.dict())
+        token = server.create_access_token({"sub": user.email}, expires_delta=timedelta(minutes=5))
+        headers.append({"Authorization": f"Bearer {token}"})
+    return headers
+
+
+class YieldingStore:
+    """Gives up the event loop before and after every store call, the way a database round trip does.
+
+    Each call still applies atomically, like a single Mongo update, so only the
+    interleaving of concurrent requests between their calls changes.
+    """
+
+    def __init__(self, store, seed=0):
+        self.store = store
+        self.rng = random.Random(seed)
+
+    async def _yield(self):
+        for _ in range(self.rng.randint(0, 3)):
+            await asyncio.sleep(0)
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            await self._yield()
+            result = await attr(*args, **kwargs)
+            await self._yield()
+            return result
+        return call
+
+
+@pytest.mark.parametrize("round_trips", ["instant", "yielding"])
+def test_hundreds_of_concurrent_reviewers(stores, monkeypatch, round_trips):
+    reviewer_count = 300
+    if round_trips == "yielding":
+        monkeypatch.setattr(stores, "tools", YieldingStore(stores.tools, seed=1))
+        monkeypatch.setattr(stores, "reviews", YieldingStore(stores.reviews, seed=2))
+
+    async def scenario():
+        await server.init_sample_data()
+        tool_id = (await stores.tools.find(limit=1))[0]["id"]
+        headers = await _register_reviewers(stores, reviewer_count)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/reviews", headers=h, json={"tool_id": tool_id, "rating": i % 5 + 1, "comment": "ok"})
+                for i, h in enumerate(headers)
+            ))
+            # Every reviewer retries at once; the unique (user, tool) constraint must reject all of them
+            retries = await asyncio.gather(*(
+                client.post("/api/reviews", headers=h, json={"tool_id": tool_id, "rating": 5, "comment": "again"})
+                for h in headers
+            ))
+        await server.drain_review_followups()
+        return tool_id, responses, retries
+
+    tool_id, responses, retries = asyncio.run(scenario())
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.status_code == 400 for r in retries)
+
+    tool = asyncio.run(stores.tools.get(tool_id))
+    expected = sum(i % 5 + 1 for i in range(reviewer_count)) / reviewer_count
+    assert tool["review_count"] == reviewer_count
+    assert tool["rating"] == round(expected, 1)
+    assert len(asyncio.run(stores.reviews.find_by_tool(tool_id, 1000))) == reviewer_count
+
+    summary = asyncio.run(stores.reviews.summary(tool_id))
+    assert summary["count"] == reviewer_count
+    assert summary["histogram"] == {str(star): reviewer_count // 5 for star in range(1, 6)}
+    assert summary["mean"] == round(expected, 2)
+
+
+def test_review_for_missing_tool_leaves_no_review(api, auth_headers, stores):
+    response = api.post("/api/reviews", headers=auth_headers, json={"tool_id": "missing", "rating": 4, "comment": "?"})
+    assert response.status_code == 404
+    assert asyncio.run(stores.reviews.find_by_tool("missing")) == []
+
+
+def test_failed_rating_update_removes_the_review(api, auth_headers, stores, monkeypatch):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    apply_review = stores.tools.apply_review
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(stores.tools, "apply_review", unavailable)
+    with pytest.raises(ConnectionError):
+        api.post("/api/reviews", headers=auth_headers, json={"tool_id": tool_id, "rating": 2, "comment": "Lost"})
+    assert asyncio.run(stores.reviews.find_by_tool(tool_id)) == []
+
+    # Nothing half-written blocks the retry
+    monkeypatch.setattr(stores.tools, "apply_review", apply_review)
+    response = api.post("/api/reviews", headers=auth_headers, json={"tool_id": tool_id, "rating": 2, "comment": "Kept"})
+    assert response.status_code == 200
+    assert api.get(f"/api/tools/{tool_id}").json()["review_count"] == 1
+
+
+def test_review_summary_endpoint(api, auth_headers, stores):
+    tool_id = api.get("/api/tools").json()[0]["id"]
+    empty = api.get(f"/api/tools/{tool_id}/reviews/summary").json()
+    assert empty["count"] == 0 and empty["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+
+    created = api.post("/api/reviews", headers=auth_headers, json={"tool_id": tool_id, "rating": 4, "comment": "Good"})
+    # The summary is folded in after the response
+    api.portal.call(server.drain_review_followups)
+    summary = api.get(f"/api/tools/{tool_id}/reviews/summary").json()
+    assert summary["count"] == 1
+    assert summary["mean"] == 4.0
+    assert summary["histogram"]["4"] == 1
+    assert summary["latest_review_at"] == created.json()["created_at"]
+
+    assert api.post("/api/reviews", headers=auth_headers, json={"tool_id": tool_id, "rating": 6, "comment": "?"}).status_code == 422
+    assert api.get("/api/tools/missing/reviews/summary").status_code == 404
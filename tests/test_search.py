@@ -0,0 +1,212 @@
+import random
+
+import numpy as np
+import pytest
+
+import server
+from similar import SimilarTools, tool_vector_terms
+from suggest import SuggestIndex
+from trending import EVENT_WEIGHTS, TrendingTools
+
+
+def test_suggest_endpoint(api, auth_headers):
+    suggestions = api.get("/api/tools/suggest", params={"q": "Cop"}).json()["suggestions"]
+    assert [(s["name"], s["matched"]) for s in suggestions] == [("GitHub Copilot", "name")]
+
+    # "art" is a tag of both image tools, ranked by rating
+    art = api.get("/api/tools/suggest", params={"q": "ar"}).json()["suggestions"]
+    assert [s["name"] for s in art] == ["Midjourney", "DALL-E 3"]
+
+    dalle = art[1]["id"]
+    api.post("/api/reviews", headers=auth_headers, json={"tool_id": dalle, "rating": 5, "comment": "!"})
+    art = api.get("/api/tools/suggest", params={"q": "ar"}).json()["suggestions"]
+    assert [(s["name"], s["rating"]) for s in art] == [("DALL-E 3", 5.0), ("Midjourney", 4.9)]
+
+    created = api.post("/api/tools", headers=auth_headers, json={
+        "name": "Copy Wizard", "description": "d", "category": "Writing",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    }).json()
+    assert {s["name"] for s in api.get("/api/tools/suggest", params={"q": "cop"}).json()["suggestions"]} == {
+        "GitHub Copilot", "Copy Wizard"
+    }
+    api.delete(f"/api/tools/{created['id']}", headers=auth_headers)
+    assert [s["name"] for s in api.get("/api/tools/suggest", params={"q": "cop"}).json()["suggestions"]] == [
+        "GitHub Copilot"
+    ]
+    assert api.get("/api/tools/suggest", params={"q": "  "}).json()["suggestions"] == []
+
+
+def test_suggest_index_matches_brute_force_under_updates():
+    rng = random.Random(7)
+    words = ["alpha", "alpine", "beta", "bench", "code", "coder", "copy", "data", "delta"]
+    index = SuggestIndex(max_results=5)
+    tools = {}
+
+    def make_tool(i):
+        return {"id": str(i), "name": f"{rng.choice(words)} {rng.choice(words)} {i}", "category": rng.choice(words),
+                "tags": rng.sample(words, 2), "rating": round(rng.uniform(1, 5), 1), "review_count": rng.randint(0, 9)}
+
+    for i in range(200):
+        tools[str(i)] = make_tool(i)
+    index.build(tools.values())
+
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.5:
+            tool = rng.choice(list(tools.values()))
+            tool["rating"], tool["review_count"] = round(rng.uniform(1, 5), 1), rng.randint(0, 9)
+            index.update_score(tool["id"], tool["rating"], tool["review_count"])
+        elif action < 0.75:
+            tool = make_tool(200 + step)
+            tools[tool["id"]] = tool
+            index.add(tool)
+        else:
+            tool_id = rng.choice(list(tools))
+            del tools[tool_id]
+            index.remove(tool_id)
+
+        prefix = rng.choice(words)[:rng.randint(1, 4)]
+        expected = sorted(
+            (t for t in tools.values() if any(
+                term.startswith(prefix) for term in
+                [t["name"], t["category"], *t["tags"], *t["name"].split()]
+            )),
+            key=lambda t: (t["rating"], t["review_count"], t["name"]), reverse=True
+        )[:5]
+        assert [s["id"] for s in index.suggest(prefix, 5)] == [t["id"] for t in expected]
+
+
+def test_fuzzy_search_tolerates_typos(api, auth_headers):
+    def names(search, **params):
+        return [t["name"] for t in api.get("/api/tools", params={"search": search, **params}).json()]
+
+    assert names("midjurney") == ["Midjourney"]
+    assert names("co-pilot") == ["GitHub Copilot"]
+    assert names("copilot") == ["GitHub Copilot"]
+    assert names("midjurney", category="Development") == []
+
+    created = api.post("/api/tools", headers=auth_headers, json={
+        "name": "Loveable", "description": "App builder", "category": "Development",
+        "platforms": ["Web"], "features": [], "pricing": "Free", "url": "https://example.com"
+    }).json()
+    assert names("lovable") == ["Loveable"]
+    api.delete(f"/api/tools/{created['id']}", headers=auth_headers)
+    assert names("lovable") == []
+
+
+def test_bounded_edit_distance():
+    from fuzzy import bounded_edit_distance
+
+    assert bounded_edit_distance("lovable", "loveable", 2) == 1
+    assert bounded_edit_distance("kitten", "sitting", 3) == 3
+    assert bounded_edit_distance("kitten", "sitting", 2) == 3
+    assert bounded_edit_distance("abc", "abcdefg", 2) == 3
+
+
+def test_similar_tools_come_from_the_precomputed_table(api, auth_headers):
+    tools = {tool["name"]: tool["id"] for tool in api.get("/api/tools").json()}
+    # Built by the background refresher, outside the readiness gate
+    api.portal.call(server.similar_tools.rebuild)
+    similar = api.get(f"/api/tools/{tools['Cursor AI']}/similar").json()
+    assert similar[0]["name"] == "GitHub Copilot"
+    assert all(0 < tool["similarity"] <= 1 for tool in similar)
+    assert tools["Cursor AI"] not in [tool["id"] for tool in similar]
+    assert api.get("/api/tools/missing/similar").status_code == 404
+
+    created = api.post("/api/tools", headers=auth_headers, json={
+        "name": "Code Buddy", "description": "d", "category": "Development", "platforms": ["Web", "Desktop"],
+        "features": ["Code completion", "Debugging support"], "pricing": "Free", "url": "https://example.com",
+        "tags": ["coding", "development"]
+    }).json()
+    # Not in the table until the debounced rebuild
+    assert api.get(f"/api/tools/{created['id']}/similar").json() == []
+    api.portal.call(server.similar_tools.rebuild)
+    assert api.get(f"/api/tools/{created['id']}/similar").json()[0]["category"] == "Development"
+
+
+def test_similar_tools_table_ranks_by_cosine():
+    tools = [
+        {"id": "a", "category": "Video", "tags": ["editing"], "platforms": ["Web"], "features": ["Auto captions"]},
+        {"id": "b", "category": "Video", "tags": ["editing"], "platforms": ["Web"], "features": ["Auto captions"]},
+        {"id": "c", "category": "Video", "tags": ["music"], "platforms": ["Web"], "features": []},
+        {"id": "d", "category": "Audio", "tags": ["music"], "platforms": ["Mobile"], "features": []},
+        {"id": "e", "category": "Writing", "tags": ["blog"], "platforms": ["Mobile"], "features": []},
+    ]
+    table = SimilarTools(k=3, max_df=1.0, chunk_pairs=2)
+    table.build(tools)
+    assert [tool_id for tool_id, _ in table.similar("a")] == ["b", "c"]
+    assert table.similar("a")[0][1] == pytest.approx(1.0)
+    assert [tool_id for tool_id, _ in table.similar("e")] == ["d"]
+    assert table.similar("zzz") is None
+
+
+def test_similar_tools_table_matches_brute_force_cosine():
+    words = ["video", "audio", "chat", "code", "image", "voice", "music", "write", "search", "data"]
+    tools = [{"id": f"t{i}", "category": f"c{i % 4}", "tags": [words[i % 7], words[(i * 3) % 10]],
+              "platforms": ["Web"] if i % 2 else ["Mobile"], "features": [f"{words[i % 5]} {words[(i * 7) % 9]}"]}
+             for i in range(120)]
+    exact = SimilarTools(k=5, max_df=0.6, chunk_pairs=500)
+    exact.build(tools)
+    # Dense reference over the same vocabulary filter and weights
+    terms = [tool_vector_terms(tool) for tool in tools]
+    df = {}
+    for row in terms:
+        for term in row:
+            df[term] = df.get(term, 0) + 1
+    vocabulary = sorted(term for term, count in df.items() if 2 <= count <= 0.6 * len(tools))
+    vectors = np.array([[row.get(term, 0.0) * (np.log(len(tools) / df[term]) + 1) for term in vocabulary]
+                        for row in terms])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosine = vectors @ vectors.T
+    for i in range(len(tools)):
+        expected = sorted((-cosine[i, j] for j in range(len(tools)) if j != i))[:5]
+        assert [score for _, score in exact.similar(f"t{i}")] == pytest.approx([-s for s in expected if s < 0],
+                                                                                abs=1e-5)
+
+    # With candidates from short postings only, every kept score is still the exact cosine
+    pruned = SimilarTools(k=5, max_df=0.6, max_postings=20)
+    pruned.build(tools)
+    for i in range(len(tools)):
+        for tool_id, score in pruned.similar(f"t{i}"):
+            assert score == pytest.approx(cosine[i, int(tool_id[1:])], abs=1e-5)
+
+
+def test_trending_scores_match_a_brute_force_decayed_sum():
+    now = [0.0]
+    trending = TrendingTools(half_life=3600, k=5, clock=lambda: now[0])
+    rng = random.Random(7)
+    events = []
+    for _ in range(2000):
+        now[0] += rng.expovariate(1 / 30)
+        tool_id, event = f"tool-{rng.randrange(20)}", rng.choice(list(EVENT_WEIGHTS))
+        events.append((now[0], tool_id, event))
+        trending.record(tool_id, event)
+        if rng.random() < 0.01:
+            trending.remove(tool_id)
+            events = [e for e in events if e[1] != tool_id]
+
+    expected = {}
+    for at, tool_id, event in events:
+        expected[tool_id] = expected.get(tool_id, 0.0) + EVENT_WEIGHTS[event] * 0.5 ** ((now[0] - at) / 3600)
+    best = sorted(expected.items(), key=lambda item: -item[1])[:5]
+    top = trending.top(5)
+    assert [tool_id for tool_id, _ in top] == [tool_id for tool_id, _ in best]
+    for (_, score), (_, brute) in zip(top, best):
+        assert score == pytest.approx(brute, rel=1e-9)
+
+
+def test_trending_endpoint_ranks_recent_activity(api, auth_headers):
+    tools = api.get("/api/tools").json()
+    quiet, busy = tools[0]["id"], tools[-1]["id"]
+    # Declared before /tools/{tool_id}, so "trending" is not taken for a tool id
+    cold = api.get("/api/tools/trending", params={"limit": 3}).json()
+    assert len(cold) == 3 and all(tool["trend_score"] == 0 for tool in cold)
+
+    api.get(f"/api/tools/{quiet}")
+    api.post(f"/api/favorites/{busy}", headers=auth_headers)
+    api.post(f"/api/favorites/{busy}", headers=auth_headers)
+    api.post("/api/favorites/not-a-tool", headers=auth_headers)
+    trending = api.get("/api/tools/trending", params={"limit": 3}).json()
+    assert [tool["id"] for tool in trending[:2]] == [busy, quiet]
+    assert trending[0]["trend_score"] == pytest.approx(5, rel=1e-3)
+    assert trending[2]["trend_score"] == 0 and trending[2]["id"] not in (busy, quiet)